@@ -0,0 +1,150 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from metrics import ADMISSION_QUEUE, ADMISSION_REJECTIONS
+
+# Highest priority first; a waiting interactive request is always admitted before a bulk one
+PRIORITIES = ("interactive", "bulk")
+
+
+class AdmissionRejected(Exception):
+    """A request refused before inference; routes turn it into ``status_code`` with Retry-After."""
+    status_code = 503
+    reason = "rejected"
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFull(AdmissionRejected):
+    status_code = 429
+    reason = "queue_full"
+
+
+class DeadlineExceeded(AdmissionRejected):
+    status_code = 503
+    reason = "deadline"
+
+
+def deadline_after(budget_ms: Optional[float]) -> Optional[float]:
+    """Absolute ``time.perf_counter()`` deadline ``budget_ms`` from now; None or <= 0 means no deadline."""
+    if not budget_ms or budget_ms <= 0:
+        return None
+    return time.perf_counter() + budget_ms / 1000
+
+
+def check_deadline(deadline: Optional[float], what: str = "Request"):
+    if deadline is not None and time.perf_counter() >= deadline:
+        raise DeadlineExceeded(f"{what} deadline expired before inference")
+
+
+class AdmissionController:
+    """Per-model concurrency limit with bounded, prioritized wait queues.
+
+    At most ``max_concurrency`` requests hold a slot at once. Others wait in a queue per
+    priority class of at most ``max_queue`` requests; a released slot goes to the oldest
+    waiter of the highest priority. A request arriving at a full queue is rejected at once
+    (``QueueFull``) and a waiter whose deadline passes gives up its place
+    (``DeadlineExceeded``), so the backlog and the latency of admitted requests stay bounded.
+    """
+
+    def __init__(self, name: str, max_concurrency: int = 32, max_queue: int = 256, retry_after: int = 1):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.queued: Dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {QueueFull.reason: 0, DeadlineExceeded.reason: 0}
+        self._sequence = itertools.count()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "queued": dict(self.queued),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+    def reject(self, error: AdmissionRejected, priority: str) -> AdmissionRejected:
+        """Count a rejection of ``priority``'s request and give it this controller's Retry-After."""
+        error.retry_after = self.retry_after
+        self.rejected[error.reason] += 1
+        ADMISSION_REJECTIONS.labels(self.name, priority, error.reason).inc()
+        return error
+
+    def _set_queued(self, priority: str, delta: int):
+        self.queued[priority] += delta
+        ADMISSION_QUEUE.labels(self.name, priority).set(self.queued[priority])
+
+    def _release(self):
+        while self.waiters:
+            _, _, waiter = heapq.heappop(self.waiters)
+            if not waiter.done():
+                # The slot passes straight to the waiter; ``active`` is unchanged
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    async def _acquire(self, priority: str, deadline: Optional[float]):
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}, got '{priority}'")
+        try:
+            check_deadline(deadline)
+        except DeadlineExceeded as e:
+            raise self.reject(e, priority)
+        if self.active < self.max_concurrency and not self.waiters:
+            self.active += 1
+            return
+        if self.queued[priority] >= self.max_queue:
+            raise self.reject(QueueFull(f"'{self.name}' {priority} queue is full ({self.max_queue} waiting)"), priority)
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (PRIORITIES.index(priority), next(self._sequence), waiter)
+        heapq.heappush(self.waiters, entry)
+        self._set_queued(priority, 1)
+        try:
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot in the same instant; hand it on instead of leaking it
+                self._release()
+            else:
+                waiter.cancel()
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self.reject(DeadlineExceeded(
+                f"Request deadline expired after waiting for a '{self.name}' slot"
+            ), priority)
+        finally:
+            self._set_queued(priority, -1)
+
+    @asynccontextmanager
+    async def admit(self, priority: str = "interactive", deadline: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold one slot for the block, waiting in ``priority``'s queue until ``deadline`` if needed.
+
+        A ``DeadlineExceeded`` raised inside the block (the request expired in a batcher queue
+        or waiting for an executor thread) is counted as a rejection like one at admission.
+        """
+        await self._acquire(priority, deadline)
+        self.admitted += 1
+        try:
+            yield
+        except DeadlineExceeded as e:
+            raise self.reject(e, priority)
+        finally:
+            self._release()
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from admission import DeadlineExceeded
+from metrics import QUEUE_DEPTH
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item requests into batched model calls.
+
+    Callers ``await submit(item)``; a background task collects pending items
+    until either ``max_batch_size`` is reached or ``max_wait_ms`` has elapsed
+    since the first item arrived, runs ``batch_fn`` once over the whole batch
+    (on ``executor`` when given, an ``InstrumentedExecutor``) and resolves every
+    caller with its own row of the result. A failing batch is split and retried so only
+    the request whose input fails sees the error. Callers whose deadline has passed by the
+    time their batch is formed fail with ``DeadlineExceeded`` instead of being computed.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0, executor=None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.depth = QUEUE_DEPTH.labels(f"batcher_{name}")
+
+    def start(self):
+        if self.worker is None:
+            self.queue = asyncio.Queue()
+            self.worker = asyncio.create_task(self._run())
+            logging.info(f"Batcher '{self.name}' started (max_batch_size={self.max_batch_size}, "
+                         f"max_wait_ms={self.max_wait_ms}).")
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+            logging.info(f"Batcher '{self.name}' stopped.")
+
+    def pending(self) -> int:
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def submit(self, item: Any, deadline: Optional[float] = None) -> Tuple[Any, int, int]:
+        """Queue ``item`` and wait for its result; ``deadline`` is a ``time.perf_counter()`` value.
+
+        Returns ``(result, queue_time_ms, compute_time_ms)``.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future, time.perf_counter(), deadline))
+        self.depth.set(self.queue.qsize())
+        return await future
+
+    def _expire(self, batch: List[Tuple[Any, asyncio.Future, float, Optional[float]]]) -> List[Tuple]:
+        """Fail and drop the entries whose deadline has passed."""
+        now = time.perf_counter()
+        live = []
+        for entry in batch:
+            deadline = entry[3]
+            if deadline is not None and now >= deadline:
+                entry[1].set_exception(DeadlineExceeded(f"Request deadline expired in the '{self.name}' batch queue"))
+            else:
+                live.append(entry)
+        return live
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future, float, Optional[float]]]:
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        self.depth.set(self.queue.qsize())
+        return batch
+
+    async def _compute(self, items: List[Any]) -> List[Any]:
+        if self.executor is not None:
+            return await self.executor.run(self.batch_fn, items)
+        return await asyncio.get_running_loop().run_in_executor(None, self.batch_fn, items)
+
+    async def _resolve(self, batch: List[Tuple[Any, asyncio.Future, float, Optional[float]]]):
+        """Compute ``batch`` and resolve its futures.
+
+        When the batch call raises, it is retried in halves until the failing items are
+        alone, so one bad input fails only its own request and not the whole batch.
+        """
+        items = [item for item, _, _, _ in batch]
+        compute_start = time.perf_counter()
+        try:
+            results = await self._compute(items)
+        except Exception as e:
+            if len(batch) == 1:
+                logging.error(f"Batcher '{self.name}' item failed: {e}")
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            logging.warning(f"Batcher '{self.name}' batch of {len(items)} failed ({e}); "
+                            f"retrying in halves to isolate the failing input.")
+            middle = len(batch) // 2
+            for half in (batch[:middle], batch[middle:]):
+                half = self._expire([entry for entry in half if not entry[1].done()])
+                if half:
+                    await self._resolve(half)
+            return
+        compute_end = time.perf_counter()
+
+        compute_time = int((compute_end - compute_start) * 1000)
+        for (_, future, enqueued_at, _), result in zip(batch, results):
+            if not future.done():
+                queue_time = int((compute_start - enqueued_at) * 1000)
+                future.set_result((result, queue_time, compute_time))
+        if len(results) != len(batch):
+            # Callers without a row would otherwise wait until their deadline, or forever
+            logging.error(f"Batcher '{self.name}' got {len(results)} results for {len(batch)} items.")
+            error = RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items")
+            for _, future, _, _ in batch[len(results):]:
+                if not future.done():
+                    future.set_exception(error)
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            batch = self._expire([entry for entry in batch if not entry[1].cancelled()])
+            if batch:
+                await self._resolve(batch)
@@ -0,0 +1,471 @@
+"""Micro-benchmarks and load tests with machine-readable results.
+
+Usage:
+    python benchmark.py tiny-models models/tiny
+    python benchmark.py services [--model-dir models/tiny] [--lengths 16,128,384] [--batch-sizes 1,8,32]
+    python benchmark.py database [--rows 1000]
+    python benchmark.py serialization [--rows 100,1000]
+    python benchmark.py api [--url http://localhost:8000] [--concurrency 1,8,32] [--requests 1000]
+    python benchmark.py compare baseline.json candidate.json
+
+``services``, ``database``, ``serialization`` and ``api`` accept ``--output <file>``.
+
+``tiny-models`` writes randomly initialised BERT stand-ins for both models (same labels and
+tokenizer interface, a few hundred KB each) so ``services`` runs offline; pass ``--real`` to
+benchmark the served models instead. ``database`` needs ``BENCHMARK_DATABASE_URL`` pointing at
+a scratch database initialised with ``db_init.py``, and refuses to run against ``DATABASE_URL``;
+its rows are written with status ``benchmark`` and deleted afterwards, along with their input
+texts, and the hourly rollups are restored to what they held before the run. ``serialization`` compares, on
+synthetic rows, the cost per row of encoding a results page the way FastAPI does through the
+response models with the tuple-to-orjson path the results endpoints use, plus gzip/brotli
+compression of the page. ``api`` drives a running server;
+start it against the stand-ins with ``VECTARA_MODEL_ID=<dir>/vectara VECTARA_TOKENIZER_ID=<dir>/vectara
+GIBBERISH_MODEL_ID=<dir>/gibberish``.
+
+Every command prints one JSON document (or writes it to ``--output``) holding the git commit,
+the environment and the measurements, so runs from two commits can be diffed with ``compare``.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import string
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import cycle
+from typing import Any, Callable, Dict, List
+
+import torch
+
+from services import GibberishService, VectaraService, warmup_text
+
+TINY_GIBBERISH_LABELS = ("clean", "mild gibberish", "noise", "word salad")
+TINY_VECTARA_LABELS = ("hallucinated", "consistent")
+# Fields identifying a measurement across reports, as opposed to the measured values
+CASE_KEYS = ("model", "tokens", "batch_size", "operation", "rows", "concurrency")
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    index = min(len(sorted_samples) - 1, max(0, round(q / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+        "min_ms": round(ordered[0], 3),
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def time_calls(fn: Callable[[], Any], iterations: int, warmup: int = 2) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start_time) * 1000)
+    return samples
+
+
+def report(benchmark: str, parameters: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "benchmark": benchmark,
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+        },
+        "parameters": parameters,
+        "results": results,
+    }
+
+
+def build_tiny_models(output_dir: str) -> Dict[str, str]:
+    """Write tiny random-weight BERT classifiers standing in for both served models."""
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    os.makedirs(output_dir, exist_ok=True)
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += list(string.ascii_lowercase + string.digits + string.punctuation)
+    vocab += [f"##{c}" for c in string.ascii_lowercase + string.digits]
+    vocab_file = os.path.join(output_dir, "vocab.txt")
+    with open(vocab_file, "w") as f:
+        f.write("\n".join(vocab) + "\n")
+
+    paths = {}
+    torch.manual_seed(0)
+    for name, labels in (("gibberish", TINY_GIBBERISH_LABELS), ("vectara", TINY_VECTARA_LABELS)):
+        path = os.path.join(output_dir, name)
+        config = BertConfig(
+            vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+            intermediate_size=64, max_position_embeddings=512,
+            id2label=dict(enumerate(labels)), label2id={label: i for i, label in enumerate(labels)},
+        )
+        BertForSequenceClassification(config).save_pretrained(path)
+        BertTokenizerFast(vocab_file=vocab_file, model_max_length=512).save_pretrained(path)
+        paths[name] = path
+    logging.info(f"Tiny stand-in models written to {output_dir}.")
+    return paths
+
+
+def load_services(model_dir: str, real: bool):
+    if real:
+        load_kwargs = {
+            "cache_dir": os.environ.get("MODEL_CACHE_DIR"),
+            "local_files_only": os.environ.get("MODEL_LOCAL_FILES_ONLY", "false").lower() == "true",
+        }
+        return VectaraService(**load_kwargs), GibberishService(**load_kwargs)
+    if model_dir is None:
+        model_dir = tempfile.mkdtemp(prefix="tiny-models-")
+        build_tiny_models(model_dir)
+    vectara_path = os.path.join(model_dir, "vectara")
+    return (
+        VectaraService(model_id=vectara_path, tokenizer_id=vectara_path),
+        GibberishService(model_id=os.path.join(model_dir, "gibberish")),
+    )
+
+
+def bench_services(args) -> Dict[str, Any]:
+    vectara, gibberish = load_services(args.model_dir, args.real)
+    results = []
+    for length in args.lengths:
+        for batch_size in args.batch_sizes:
+            texts = [warmup_text(gibberish.tokenizer, min(length, gibberish.max_tokens - 2))] * batch_size
+            pairs = [(warmup_text(vectara.tokenizer, length), warmup_text(vectara.tokenizer, 16))] * batch_size
+            for model, fn in (
+                ("gibberish", lambda: gibberish.predict_batch(texts)),
+                ("vectara", lambda: vectara.predict_batch(pairs)),
+            ):
+                stats = summarize(time_calls(fn, args.iterations))
+                stats["items_per_second"] = round(batch_size * 1000 / stats["mean_ms"], 2)
+                results.append({"model": model, "tokens": length, "batch_size": batch_size, **stats})
+                logging.info(f"{model} tokens={length} batch={batch_size}: {stats['mean_ms']} ms")
+    return report("services", {
+        "real_models": args.real, "lengths": args.lengths, "batch_sizes": args.batch_sizes,
+        "iterations": args.iterations,
+    }, results)
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(words))
+
+
+def snapshot_rollups(db) -> Dict[str, List[tuple]]:
+    """Fold pending deltas and return every rollup row, for ``restore_rollups`` after a run."""
+    from psycopg2 import sql
+
+    from database import ROLLUP_DELTAS
+
+    db.fold_rollups()
+    snapshot = {}
+    with db.transaction(cursor_factory=None) as cursor:
+        for rollup in ROLLUP_DELTAS:
+            cursor.execute(sql.SQL("SELECT * FROM {}").format(sql.Identifier(rollup)))
+            snapshot[rollup] = cursor.fetchall()
+    return snapshot
+
+
+def restore_rollups(db, snapshot: Dict[str, List[tuple]]):
+    """Drop the deltas appended since ``snapshot`` and put the rollups back as they were."""
+    from psycopg2 import sql
+    from psycopg2.extras import execute_values
+
+    from database import ROLLUP_DELTAS
+
+    with db.transaction(cursor_factory=None) as cursor:
+        for rollup, delta in ROLLUP_DELTAS.items():
+            cursor.execute(sql.SQL("DELETE FROM {}").format(sql.Identifier(delta)))
+            cursor.execute(sql.SQL("DELETE FROM {}").format(sql.Identifier(rollup)))
+            if snapshot[rollup]:
+                execute_values(cursor, sql.SQL("INSERT INTO {} VALUES %s").format(sql.Identifier(rollup)),
+                               snapshot[rollup])
+
+
+def bench_database(args) -> Dict[str, Any]:
+    from database import DatabaseManager
+
+    db_url = os.environ.get("BENCHMARK_DATABASE_URL")
+    if not db_url or db_url == os.environ.get("DATABASE_URL"):
+        # Cleaning up rewrites the rollup tables, which would lose concurrent writers' deltas
+        raise SystemExit("The database benchmark needs BENCHMARK_DATABASE_URL set to a scratch database "
+                         "initialised with db_init.py, not the DATABASE_URL the API writes to")
+    db = DatabaseManager(db_url)
+    db.connect()
+    rollups = snapshot_rollups(db)
+    rng = random.Random(0)
+    probabilities = {key: 0.25 for key in GibberishService.PROB_KEYS}
+    vectara_rows = [
+        {"input_1": random_text(rng, 40), "input_2": random_text(rng, 8), "output_score": rng.random(),
+         "processing_time_ms": rng.randint(5, 50), "status": "benchmark"}
+        for _ in range(args.rows)
+    ]
+    gibberish_rows = [
+        {"input_text": random_text(rng, 12), "predicted_label": "clean", "probabilities": probabilities,
+         "processing_time_ms": rng.randint(5, 50), "status": "benchmark"}
+        for _ in range(args.rows)
+    ]
+
+    next_vectara_row = cycle(vectara_rows).__next__
+    next_gibberish_row = cycle(gibberish_rows).__next__
+
+    results = []
+    try:
+        iterations = min(args.rows, 200)
+        for name, fn, calls, rows_per_call in (
+            ("vectara_insert_single", lambda: db.save_vectara_result(**next_vectara_row()), iterations, 1),
+            ("gibberish_insert_single", lambda: db.save_gibberish_result(**next_gibberish_row()), iterations, 1),
+            ("vectara_insert_bulk", lambda: db.save_vectara_results(vectara_rows[:args.bulk_size]), 10, args.bulk_size),
+            ("gibberish_insert_bulk", lambda: db.save_gibberish_results(gibberish_rows[:args.bulk_size]), 10,
+             args.bulk_size),
+            ("vectara_results_page", lambda: db.get_vectara_results(limit=100), 50, 100),
+            ("gibberish_results_page", lambda: db.get_gibberish_results(limit=100), 50, 100),
+            ("vectara_results_page_raw", lambda: db.get_vectara_results(limit=100, raw=True), 50, 100),
+            ("gibberish_results_page_raw", lambda: db.get_gibberish_results(limit=100, raw=True), 50, 100),
+            ("vectara_stats", lambda: db.get_vectara_stats(), 20, 0),
+            ("gibberish_stats", lambda: db.get_gibberish_stats(), 20, 0),
+        ):
+            stats = summarize(time_calls(fn, calls, warmup=1))
+            if rows_per_call:
+                stats["rows_per_second"] = round(rows_per_call * 1000 / stats["mean_ms"], 2)
+            results.append({"operation": name, **stats})
+            logging.info(f"{name}: {stats['mean_ms']} ms")
+    finally:
+        with db.transaction() as cursor:
+            cursor.execute("DELETE FROM vectara_results WHERE status = 'benchmark'")
+            cursor.execute("DELETE FROM gibberish_results WHERE status = 'benchmark'")
+        restore_rollups(db, rollups)
+        db._prune_input_texts()
+        db.disconnect()
+    return report("database", {"rows": args.rows, "bulk_size": args.bulk_size}, results)
+
+
+def bench_serialization(args) -> Dict[str, Any]:
+    from pydantic import TypeAdapter
+
+    from database import GIBBERISH_COLUMNS, VECTARA_COLUMNS
+    from models import GibberishResultRow, VectaraResultRow
+    from serialization import brotli, compress, encode_rows
+
+    rng = random.Random(0)
+    timings = {"queue": 1.2, "tokenize": 0.8, "forward": 21.5, "postprocess": 0.1, "db_insert": 2.4}
+    row_factories = {
+        "vectara": (VECTARA_COLUMNS, VectaraResultRow, lambda index, timestamp: (
+            f"00000000-0000-4000-8000-{index:012d}", random_text(rng, 40), random_text(rng, 8), rng.random(),
+            timestamp, rng.randint(5, 50), "success", timings
+        )),
+        "gibberish": (GIBBERISH_COLUMNS, GibberishResultRow, lambda index, timestamp: (
+            f"00000000-0000-4000-8000-{index:012d}", random_text(rng, 12), "clean", 0.7, 0.1, 0.1, 0.1,
+            timestamp, rng.randint(5, 50), "success", timings, "transformer"
+        )),
+    }
+
+    results = []
+    for model, (columns, row_model, make_row) in row_factories.items():
+        adapter = TypeAdapter(List[row_model])
+        for rows_count in args.rows:
+            now = datetime.now()
+            rows = [make_row(index, now) for index in range(rows_count)]
+            dict_rows = [dict(zip(columns, row)) for row in rows]
+
+            def through_models():
+                # What FastAPI does with a response_model: validate, dump to JSON-able data, json.dumps
+                data = adapter.dump_python(adapter.validate_python(dict_rows), mode="json", exclude_unset=True)
+                return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+            body = encode_rows(columns, rows)
+            cases = [("encode_models", through_models), ("encode_orjson", lambda: encode_rows(columns, rows)),
+                     ("compress_gzip", lambda: compress(body, "gzip"))]
+            if brotli is not None:
+                cases.append(("compress_br", lambda: compress(body, "br")))
+            for operation, fn in cases:
+                stats = summarize(time_calls(fn, args.iterations))
+                stats["rows_per_second"] = round(rows_count * 1000 / stats["mean_ms"], 2)
+                stats["us_per_row"] = round(stats["mean_ms"] * 1000 / rows_count, 3)
+                stats["bytes"] = len(fn())
+                results.append({"model": model, "operation": operation, "rows": rows_count, **stats})
+                logging.info(f"{model} {operation} rows={rows_count}: {stats['us_per_row']} us/row, "
+                             f"{stats['bytes']} bytes")
+    return report("serialization", {"rows": args.rows, "iterations": args.iterations}, results)
+
+
+async def drive_api(url: str, concurrency: int, total_requests: int, timeout: float) -> Dict[str, Any]:
+    import httpx
+
+    rng = random.Random(0)
+    payloads = []
+    for _ in range(total_requests):
+        if rng.random() < 0.5:
+            payloads.append(("/api/predict/gibberish", {"input_text": random_text(rng, rng.randint(2, 40))}))
+        else:
+            payloads.append(("/api/predict/vectara", {
+                "input_1": random_text(rng, rng.randint(10, 80)), "input_2": random_text(rng, rng.randint(3, 15))
+            }))
+    queue: asyncio.Queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    latencies: Dict[str, List[float]] = {}
+    statuses: Dict[str, int] = {}
+
+    async def worker(client):
+        while not queue.empty():
+            path, body = queue.get_nowait()
+            start_time = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.setdefault(path, []).append((time.perf_counter() - start_time) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        start_time = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start_time
+
+    return {
+        "requests": total_requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "statuses": statuses,
+        "overall": summarize([sample for samples in latencies.values() for sample in samples]),
+        "endpoints": {path: summarize(samples) for path, samples in latencies.items()},
+    }
+
+
+def bench_api(args) -> Dict[str, Any]:
+    results = []
+    for concurrency in args.concurrency:
+        result = asyncio.run(drive_api(args.url, concurrency, args.requests, args.timeout))
+        logging.info(f"concurrency={concurrency}: {result['throughput_rps']} req/s, "
+                     f"p99 {result['overall']['p99_ms']} ms")
+        results.append({"concurrency": concurrency, **result})
+    return report("api", {"url": args.url, "requests": args.requests, "concurrency": args.concurrency}, results)
+
+
+def compare(baseline_path: str, candidate_path: str) -> List[Dict[str, Any]]:
+    """Relative change of every ``*_ms`` / ``*_per_second`` / ``*_rps`` metric between two reports."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+
+    def flatten(result: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+        values = {}
+        for key, value in result.items():
+            if isinstance(value, dict):
+                values.update(flatten(value, f"{prefix}{key}."))
+            elif isinstance(value, (int, float)) and key.endswith(("_ms", "_per_second", "_rps")):
+                values[prefix + key] = value
+        return values
+
+    def identity(result: Dict[str, Any]) -> str:
+        return ",".join(f"{key}={result[key]}" for key in CASE_KEYS if key in result)
+
+    baseline_results = {identity(r): flatten(r) for r in baseline["results"]}
+    changes = []
+    for result in candidate["results"]:
+        key = identity(result)
+        before = baseline_results.get(key)
+        if before is None:
+            continue
+        for metric, value in flatten(result).items():
+            if before.get(metric):
+                changes.append({
+                    "case": key, "metric": metric, "baseline": before[metric], "candidate": value,
+                    "change_pct": round((value - before[metric]) / before[metric] * 100, 1),
+                })
+    return changes
+
+
+def parse_ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description="Benchmarks for the prediction services, database and API.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    output_parser = argparse.ArgumentParser(add_help=False)
+    output_parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+
+    tiny_parser = subparsers.add_parser("tiny-models", help="Write tiny stand-in models for offline runs")
+    tiny_parser.add_argument("directory")
+
+    services_parser = subparsers.add_parser(
+        "services", parents=[output_parser], help="predict_batch latency by input length and batch size"
+    )
+    services_parser.add_argument("--model-dir", help="Directory from tiny-models (built in a temp dir if omitted)")
+    services_parser.add_argument("--real", action="store_true", help="Benchmark the served models instead")
+    services_parser.add_argument("--lengths", type=parse_ints, default=[16, 128, 384])
+    services_parser.add_argument("--batch-sizes", type=parse_ints, default=[1, 8, 32])
+    services_parser.add_argument("--iterations", type=int, default=20)
+
+    database_parser = subparsers.add_parser(
+        "database", parents=[output_parser], help="Insert and read paths against BENCHMARK_DATABASE_URL"
+    )
+    database_parser.add_argument("--rows", type=int, default=1000)
+    database_parser.add_argument("--bulk-size", type=int, default=500)
+
+    serialization_parser = subparsers.add_parser(
+        "serialization", parents=[output_parser], help="Per-row cost of encoding and compressing result pages"
+    )
+    serialization_parser.add_argument("--rows", type=parse_ints, default=[100, 1000])
+    serialization_parser.add_argument("--iterations", type=int, default=20)
+
+    api_parser = subparsers.add_parser(
+        "api", parents=[output_parser], help="Concurrent load against a running server"
+    )
+    api_parser.add_argument("--url", default="http://localhost:8000")
+    api_parser.add_argument("--concurrency", type=parse_ints, default=[1, 8, 32])
+    api_parser.add_argument("--requests", type=int, default=1000)
+    api_parser.add_argument("--timeout", type=float, default=30.0)
+
+    compare_parser = subparsers.add_parser("compare", help="Relative change between two JSON reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    if args.command == "tiny-models":
+        build_tiny_models(args.directory)
+        raise SystemExit(0)
+    if args.command == "compare":
+        for change in compare(args.baseline, args.candidate):
+            print(f"{change['case']:<45} {change['metric']:<28} {change['baseline']:>10} -> "
+                  f"{change['candidate']:>10}  {change['change_pct']:+.1f}%")
+        raise SystemExit(0)
+
+    result = {
+        "services": bench_services, "database": bench_database, "serialization": bench_serialization,
+        "api": bench_api,
+    }[args.command](args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
@@ -0,0 +1,98 @@
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, trimmed, internal whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model_id: str, revision: str, *parts: str) -> str:
+    """Content address of a model input: sha256 over model identity and normalized input parts."""
+    digest = hashlib.sha256()
+    for part in (model_id, revision, *(normalize_text(p) for p in parts)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """In-process LRU cache with a TTL, keyed by ``cache_key``.
+
+    ``max_size`` of 0 disables the cache entirely. Hits, misses and evictions are counted
+    both here, for ``/api/cache``, and in the Prometheus counters labelled with ``name``.
+    """
+
+    def __init__(self, name: str, max_size: int = 10000, ttl_seconds: float = 3600.0):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._hit_counter = CACHE_HITS.labels(name)
+        self._miss_counter = CACHE_MISSES.labels(name)
+        self._eviction_counter = CACHE_EVICTIONS.labels(name, "size")
+        self._expiration_counter = CACHE_EVICTIONS.labels(name, "ttl")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                self._miss_counter.inc()
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                self._expiration_counter.inc()
+                self._miss_counter.inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._hit_counter.inc()
+            return value
+
+    def put(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                self._eviction_counter.inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,100 +1,772 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import sql
+from psycopg2.extras import Json, RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+import base64
+import hashlib
+import json
 import logging
-from datetime import datetime
-from uuid import uuid4
-from typing import List, Dict, Any
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+import partitions
+
+VECTARA_COLUMNS = (
+    "prediction_id", "input_1", "input_2", "output_score", "timestamp",
+    "processing_time_ms", "status", "stage_timings_ms"
+)
+GIBBERISH_COLUMNS = (
+    "prediction_id", "input_text", "predicted_label", "prob_clean", "prob_mild_gibberish",
+    "prob_noise", "prob_word_salad", "timestamp", "processing_time_ms", "status", "stage_timings_ms",
+    "decided_by"
+)
+KEYSET_COLUMNS = ("timestamp", "prediction_id")
+RESULT_TABLES = ("vectara_results", "gibberish_results")
+# Input texts live once in input_texts, keyed by their SHA-256; results store <column>_hash
+TEXT_COLUMNS = {
+    "vectara_results": ("input_1", "input_2"),
+    "gibberish_results": ("input_text",),
+}
+STATS_BUCKETS = ("minute", "hour", "day")
+# Hourly rollup tables and the append-only tables their insert triggers write to
+ROLLUP_DELTAS = {
+    "vectara_results_hourly": "vectara_results_hourly_delta",
+    "gibberish_results_hourly": "gibberish_results_hourly_delta",
+}
+ROLLUP_FOLD_LOCK_KEY = "rollup_fold"
+# Moves every committed delta row into the rollup in one statement
+ROLLUP_FOLD = """
+    WITH moved AS (DELETE FROM {delta} RETURNING *)
+    INSERT INTO {rollup} AS r
+    SELECT bucket, label, sum(count), sum(score_sum), min(score_min), max(score_max),
+           sum(processing_time_sum), min(processing_time_min), max(processing_time_max)
+    FROM moved GROUP BY 1, 2
+    ON CONFLICT (bucket, label) DO UPDATE SET
+        count = r.count + EXCLUDED.count,
+        score_sum = r.score_sum + EXCLUDED.score_sum,
+        score_min = least(r.score_min, EXCLUDED.score_min),
+        score_max = greatest(r.score_max, EXCLUDED.score_max),
+        processing_time_sum = r.processing_time_sum + EXCLUDED.processing_time_sum,
+        processing_time_min = least(r.processing_time_min, EXCLUDED.processing_time_min),
+        processing_time_max = greatest(r.processing_time_max, EXCLUDED.processing_time_max)
+"""
+# Keys of input_texts examined per pruning transaction
+PRUNE_BATCH_SIZE = 1000
+UNREFERENCED_TEXT = """
+    NOT EXISTS (SELECT 1 FROM vectara_results WHERE input_1_hash = t.text_hash)
+    AND NOT EXISTS (SELECT 1 FROM vectara_results WHERE input_2_hash = t.text_hash)
+    AND NOT EXISTS (SELECT 1 FROM gibberish_results WHERE input_text_hash = t.text_hash)
+"""
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque pagination token pointing just past ``row``."""
+    payload = json.dumps([row["timestamp"].isoformat(), str(row["prediction_id"])])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    try:
+        timestamp, prediction_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return datetime.fromisoformat(timestamp), str(UUID(prediction_id))
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def text_hash(text: str) -> bytes:
+    """Key of ``text`` in ``input_texts``; matches ``sha256(convert_to(text, 'UTF8'))`` in SQL."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def select_columns(table: str, columns: List[str]) -> sql.Composed:
+    """Select list for ``columns`` of a results table, resolving text columns through ``input_texts``.
+
+    Texts are fetched with a correlated subquery per returned row rather than a join, so
+    a page query reads ``input_texts`` only for the rows on the page, and not at all when
+    ``fields`` leaves the texts out.
+    """
+    text_columns = TEXT_COLUMNS.get(table, ())
+    return sql.SQL(", ").join(
+        sql.SQL("(SELECT text FROM input_texts WHERE text_hash = {}) AS {}").format(
+            sql.Identifier(table, f"{column}_hash"), sql.Identifier(column)
+        ) if column in text_columns else sql.Identifier(column)
+        for column in columns
+    )
+
+
+def result_timestamp(row: Dict[str, Any]) -> datetime:
+    """When a result was produced: the ``timestamp`` stamped as it was queued (a datetime or,
+    from a spill file, an ISO string), or now for rows inserted right away."""
+    value = row.get("timestamp")
+    if value is None:
+        return datetime.now(timezone.utc)
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def json_or_null(value: Optional[Dict[str, Any]]) -> Optional[Json]:
+    """Adapt a dict for a JSONB column, keeping None as SQL NULL rather than JSON null."""
+    return Json(value) if value is not None else None
 
 
 class DatabaseManager():
-    def __init__(self, db_url: str):  
-        self.db_url = db_url  
-        self.conn = None
-        self.cursor = None
+    def __init__(self, db_url: str, min_size: int = 1, max_size: int = 10,
+                 acquire_timeout: float = 5.0, health_check_interval: float = 30.0):
+        self.db_url = db_url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.pool = None
+        self._slots = None
+        self._last_used: Dict[int, float] = {}
 
     def connect(self):
+        """Create the connection pool. Called once at application startup."""
+        if self.pool is not None:
+            return
         try:
-            self.conn = psycopg2.connect(self.db_url)  
-            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            logging.info("Database connected successfully.")
+            self.pool = ThreadedConnectionPool(self.min_size, self.max_size, self.db_url)
+            self._slots = threading.BoundedSemaphore(self.max_size)
+            logging.info(f"Database pool created (min={self.min_size}, max={self.max_size}).")
         except Exception as e:
             logging.error(f"Database connection error: {e}")
             raise
 
     def disconnect(self):
-        if self.cursor:
-            self.cursor.close()
-            logging.info("Cursor closed.")
-        if self.conn:
-            self.conn.close()
-            logging.info("Database connection closed.")
+        """Close every pooled connection. Called once at application shutdown."""
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+            self._last_used.clear()
+            logging.info("Database pool closed.")
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        idle_for = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out of the pool for the duration of the block.
+
+        Waits at most ``acquire_timeout`` seconds for a free slot and replaces
+        connections that fail the health check. After a database restart every pooled
+        connection is dead, so up to ``max_size + 1`` connections are tried: by then the
+        pool has run out of old ones and opens a new one.
+        """
+        if self.pool is None:
+            raise PoolError("Database pool is not initialized")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolError(f"Timed out after {self.acquire_timeout}s waiting for a database connection")
+        conn = None
+        try:
+            for _ in range(self.max_size + 1):
+                conn = self.pool.getconn()
+                if self._is_healthy(conn):
+                    break
+                logging.warning("Discarding unhealthy pooled database connection.")
+                self._last_used.pop(id(conn), None)
+                self.pool.putconn(conn, close=True)
+                conn = None
+            else:
+                raise psycopg2.OperationalError(
+                    f"No healthy database connection after {self.max_size + 1} attempts"
+                )
+            yield conn
+        finally:
+            if conn is not None:
+                if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                self._last_used[id(conn)] = time.monotonic()
+                self.pool.putconn(conn, close=bool(conn.closed))
+            self._slots.release()
+
+    @contextmanager
+    def transaction(self, cursor_factory=RealDictCursor):
+        """Yield a cursor (dict rows unless ``cursor_factory`` is None) on a pooled connection;
+        commit on success, roll back on error."""
+        with self.connection() as conn:
+            try:
+                with conn.cursor(cursor_factory=cursor_factory) as cursor:
+                    yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _save_texts(self, cursor, texts: List[str]):
+        """Store each distinct text once; texts already present cost an index probe and a row lock.
+
+        The never-true ``DO UPDATE ... WHERE false`` writes no new row version but still locks an
+        existing text until commit, so ``_prune_input_texts`` cannot delete a text that this
+        transaction is about to reference.
+        """
+        # Sorted so concurrent writers take the key locks in the same order
+        rows = sorted({text_hash(text): text for text in texts}.items())
+        execute_values(
+            cursor, "INSERT INTO input_texts (text_hash, text) VALUES %s "
+                    "ON CONFLICT (text_hash) DO UPDATE SET text = EXCLUDED.text WHERE false",
+            rows, page_size=1000
+        )
 
     def save_vectara_result(self, input_1: str, input_2: str, output_score: float,
-                          processing_time_ms: int, status: str) -> str:
+                          processing_time_ms: int, status: str,
+                          stage_timings_ms: Optional[Dict[str, float]] = None,
+                          timestamp: Optional[datetime] = None, model_variant: Optional[str] = None) -> str:
         prediction_id = str(uuid4()) # Convert UUID to string
         try:
             query = """
                 INSERT INTO vectara_results
-                (prediction_id, input_1, input_2, output_score, processing_time_ms, status)
-                VALUES (%s, %s, %s, %s, %s, %s)
+                (prediction_id, input_1_hash, input_2_hash, output_score, timestamp, processing_time_ms, status,
+                stage_timings_ms, model_variant)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING prediction_id
             """
-            self.cursor.execute(query, (prediction_id, input_1, input_2, output_score,
-                                      processing_time_ms, status))
-            self.conn.commit()
+            with self.transaction() as cursor:
+                self._save_texts(cursor, [input_1, input_2])
+                cursor.execute(query, (prediction_id, text_hash(input_1), text_hash(input_2), output_score,
+                                       timestamp or datetime.now(timezone.utc), processing_time_ms, status,
+                                       json_or_null(stage_timings_ms), model_variant))
             logging.info(f"Vectara result saved with prediction_id: {prediction_id}")
             return str(prediction_id)
         except Exception as e:
-            self.conn.rollback()
             logging.error(f"Error saving Vectara result: {e}")
             raise
 
     def save_gibberish_result(self, input_text: str, predicted_label: str,
                             probabilities: Dict[str, float], processing_time_ms: int,
-                            status: str) -> str:
+                            status: str, stage_timings_ms: Optional[Dict[str, float]] = None,
+                            decided_by: Optional[str] = None, timestamp: Optional[datetime] = None,
+                            model_variant: Optional[str] = None) -> str:
         prediction_id = str(uuid4()) # Convert UUID to string
         try:
             query = """
                 INSERT INTO gibberish_results
-                (prediction_id, input_text, predicted_label, prob_clean, prob_mild_gibberish,
-                prob_noise, prob_word_salad, processing_time_ms, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                (prediction_id, input_text_hash, predicted_label, prob_clean, prob_mild_gibberish,
+                prob_noise, prob_word_salad, timestamp, processing_time_ms, status, stage_timings_ms, decided_by,
+                model_variant)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING prediction_id
             """
-            self.cursor.execute(query, (prediction_id, input_text, predicted_label,
-                                      probabilities['prob_clean'], probabilities['prob_mild_gibberish'],
-                                        probabilities['prob_noise'], probabilities['prob_word_salad'],
-                                      processing_time_ms, status))
-            self.conn.commit()
+            with self.transaction() as cursor:
+                self._save_texts(cursor, [input_text])
+                cursor.execute(query, (prediction_id, text_hash(input_text), predicted_label,
+                                       probabilities['prob_clean'], probabilities['prob_mild_gibberish'],
+                                       probabilities['prob_noise'], probabilities['prob_word_salad'],
+                                       timestamp or datetime.now(timezone.utc), processing_time_ms, status,
+                                       json_or_null(stage_timings_ms), decided_by, model_variant))
             logging.info(f"Gibberish result saved with prediction_id: {prediction_id}")
             return str(prediction_id)
         except Exception as e:
-            self.conn.rollback()
             logging.error(f"Error saving Gibberish result: {e}")
             raise
 
-    def get_vectara_results(self, limit: int = 100) -> List[Dict[str, Any]]:
+    def save_vectara_results(self, results: List[Dict[str, Any]]) -> List[str]:
+        """Persist many Vectara results with one multi-row INSERT and a single commit.
+
+        Each entry carries the same fields as ``save_vectara_result`` keyword arguments and
+        may include a pre-assigned ``prediction_id`` and ``timestamp``. Rows already stored
+        are skipped, so a retried write-behind flush does not fail or duplicate them.
+        """
+        prediction_ids = [r.get('prediction_id') or str(uuid4()) for r in results]
+        try:
+            query = """
+                INSERT INTO vectara_results
+                (prediction_id, input_1_hash, input_2_hash, output_score, timestamp, processing_time_ms,
+                status, stage_timings_ms, model_variant)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+            """
+            rows = [
+                (prediction_id, text_hash(r['input_1']), text_hash(r['input_2']), r['output_score'],
+                 result_timestamp(r), r['processing_time_ms'], r['status'],
+                 json_or_null(r.get('stage_timings_ms')), r.get('model_variant'))
+                for prediction_id, r in zip(prediction_ids, results)
+            ]
+            with self.transaction() as cursor:
+                self._save_texts(cursor, [text for r in results for text in (r['input_1'], r['input_2'])])
+                execute_values(cursor, query, rows, page_size=1000)
+            logging.info(f"Saved {len(rows)} Vectara results.")
+            return prediction_ids
+        except Exception as e:
+            logging.error(f"Error saving Vectara results: {e}")
+            raise
+
+    def save_gibberish_results(self, results: List[Dict[str, Any]]) -> List[str]:
+        """Persist many Gibberish results with one multi-row INSERT and a single commit.
+
+        Each entry carries the same fields as ``save_gibberish_result`` keyword arguments and
+        may include a pre-assigned ``prediction_id`` and ``timestamp``. Rows already stored
+        are skipped, so a retried write-behind flush does not fail or duplicate them.
+        """
+        prediction_ids = [r.get('prediction_id') or str(uuid4()) for r in results]
+        try:
+            query = """
+                INSERT INTO gibberish_results
+                (prediction_id, input_text_hash, predicted_label, prob_clean, prob_mild_gibberish,
+                prob_noise, prob_word_salad, timestamp, processing_time_ms, status, stage_timings_ms,
+                decided_by, model_variant)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+            """
+            rows = [
+                (prediction_id, text_hash(r['input_text']), r['predicted_label'],
+                 r['probabilities']['prob_clean'], r['probabilities']['prob_mild_gibberish'],
+                 r['probabilities']['prob_noise'], r['probabilities']['prob_word_salad'],
+                 result_timestamp(r), r['processing_time_ms'], r['status'], json_or_null(r.get('stage_timings_ms')),
+                 r.get('decided_by'), r.get('model_variant'))
+                for prediction_id, r in zip(prediction_ids, results)
+            ]
+            with self.transaction() as cursor:
+                self._save_texts(cursor, [r['input_text'] for r in results])
+                execute_values(cursor, query, rows, page_size=1000)
+            logging.info(f"Saved {len(rows)} Gibberish results.")
+            return prediction_ids
+        except Exception as e:
+            logging.error(f"Error saving Gibberish results: {e}")
+            raise
+
+    def find_vectara_result(self, input_1: str, input_2: str, model_variant: str) -> Optional[Dict[str, Any]]:
+        """Most recent successful result for exactly this input pair computed by ``model_variant``, if any."""
         query = """
-            SELECT * FROM vectara_results
+            SELECT output_score FROM vectara_results
+            WHERE input_1_hash = %s AND input_2_hash = %s AND model_variant = %s AND status = 'success'
             ORDER BY timestamp DESC
-            LIMIT %s
+            LIMIT 1
         """
-        self.cursor.execute(query, (limit,))
-        results = self.cursor.fetchall()
-        logging.info(f"Retrieved {len(results)} Vectara results.")
-        return results
+        with self.transaction() as cursor:
+            cursor.execute(query, (text_hash(input_1), text_hash(input_2), model_variant))
+            return cursor.fetchone()
 
-    def get_gibberish_results(self, limit: int = 100) -> List[Dict[str, Any]]:
+    def find_gibberish_result(self, input_text: str, model_variant: str) -> Optional[Dict[str, Any]]:
+        """Most recent successful transformer result for exactly this text computed by ``model_variant``, if any."""
         query = """
-            SELECT * FROM gibberish_results
+            SELECT predicted_label, prob_clean, prob_mild_gibberish, prob_noise, prob_word_salad
+            FROM gibberish_results
+            WHERE input_text_hash = %s AND model_variant = %s AND status = 'success' AND decided_by = 'transformer'
             ORDER BY timestamp DESC
+            LIMIT 1
+        """
+        with self.transaction() as cursor:
+            cursor.execute(query, (text_hash(input_text), model_variant))
+            return cursor.fetchone()
+
+    def _get_results(self, table: str, columns: Tuple[str, ...], score_column: str, limit: int,
+                     cursor: Optional[Tuple[datetime, str]], start: Optional[datetime],
+                     end: Optional[datetime], status: Optional[str], min_score: Optional[float],
+                     max_score: Optional[float], fields: Optional[List[str]],
+                     extra_filters: Dict[str, Any], raw: bool) -> Any:
+        if fields:
+            unknown = set(fields) - set(columns)
+            if unknown:
+                raise ValueError(f"Unknown result fields: {', '.join(sorted(unknown))}")
+            # The keyset columns are always returned so the caller can build the next cursor
+            selected = [c for c in columns if c in fields or c in KEYSET_COLUMNS]
+        else:
+            selected = list(columns)
+
+        conditions = []
+        params: List[Any] = []
+        if cursor is not None:
+            conditions.append(sql.SQL("(timestamp, prediction_id) < (%s, %s)"))
+            params.extend(cursor)
+        if start is not None:
+            conditions.append(sql.SQL("timestamp >= %s"))
+            params.append(start)
+        if end is not None:
+            conditions.append(sql.SQL("timestamp < %s"))
+            params.append(end)
+        if status is not None:
+            conditions.append(sql.SQL("status = %s"))
+            params.append(status)
+        if min_score is not None:
+            conditions.append(sql.SQL("{} >= %s").format(sql.Identifier(score_column)))
+            params.append(min_score)
+        if max_score is not None:
+            conditions.append(sql.SQL("{} <= %s").format(sql.Identifier(score_column)))
+            params.append(max_score)
+        for column, value in extra_filters.items():
+            if value is not None:
+                conditions.append(sql.SQL("{} = %s").format(sql.Identifier(column)))
+                params.append(value)
+
+        query = sql.SQL("""
+            SELECT {columns} FROM {table}
+            {where}
+            ORDER BY timestamp DESC, prediction_id DESC
             LIMIT %s
+        """).format(
+            columns=select_columns(table, selected),
+            table=sql.Identifier(table),
+            where=sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL(""),
+        )
+        params.append(limit)
+        with self.transaction(cursor_factory=None) as db_cursor:
+            db_cursor.execute(query, params)
+            rows = db_cursor.fetchall()
+        if raw:
+            return selected, rows
+        return [dict(zip(selected, row)) for row in rows]
+
+    def get_vectara_results(self, limit: int = 100, cursor: Optional[Tuple[datetime, str]] = None,
+                            start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            status: Optional[str] = None, min_score: Optional[float] = None,
+                            max_score: Optional[float] = None, fields: Optional[List[str]] = None,
+                            raw: bool = False) -> Any:
+        """Newest-first page of Vectara results, continuing after ``cursor`` (timestamp, prediction_id).
+
+        Score filters apply to ``output_score``; ``fields`` restricts the returned columns.
+        Rows are dicts, or with ``raw`` a ``(columns, row tuples)`` pair for callers that
+        serialize rows themselves.
         """
-        self.cursor.execute(query, (limit,))
-        results = self.cursor.fetchall()
-        logging.info(f"Retrieved {len(results)} Gibberish results.")
+        results = self._get_results(
+            "vectara_results", VECTARA_COLUMNS, "output_score", limit, cursor, start, end,
+            status, min_score, max_score, fields, {}, raw
+        )
+        logging.info(f"Retrieved {len(results[1] if raw else results)} Vectara results.")
         return results
 
+    def get_gibberish_results(self, limit: int = 100, cursor: Optional[Tuple[datetime, str]] = None,
+                              start: Optional[datetime] = None, end: Optional[datetime] = None,
+                              status: Optional[str] = None, predicted_label: Optional[str] = None,
+                              min_score: Optional[float] = None, max_score: Optional[float] = None,
+                              fields: Optional[List[str]] = None, raw: bool = False) -> Any:
+        """Newest-first page of Gibberish results, continuing after ``cursor`` (timestamp, prediction_id).
+
+        Score filters apply to ``prob_clean``; ``fields`` restricts the returned columns.
+        Rows are dicts, or with ``raw`` a ``(columns, row tuples)`` pair for callers that
+        serialize rows themselves.
+        """
+        results = self._get_results(
+            "gibberish_results", GIBBERISH_COLUMNS, "prob_clean", limit, cursor, start, end,
+            status, min_score, max_score, fields, {"predicted_label": predicted_label}, raw
+        )
+        logging.info(f"Retrieved {len(results[1] if raw else results)} Gibberish results.")
+        return results
+
+
+    def _get_stats(self, table: str, score_column: str, label_expression: str,
+                   rollup_table: str, start: Optional[datetime], end: Optional[datetime],
+                   bucket: str, source: str) -> Dict[str, Any]:
+        if bucket not in STATS_BUCKETS:
+            raise ValueError(f"bucket must be one of: {', '.join(STATS_BUCKETS)}")
+        if source not in ("raw", "rollup"):
+            raise ValueError("source must be 'raw' or 'rollup'")
+        if source == "rollup" and bucket == "minute":
+            raise ValueError("Rollup statistics are kept per hour; use bucket=hour or bucket=day")
+
+        time_column = "timestamp" if source == "raw" else "bucket"
+        conditions = []
+        params: List[Any] = []
+        if start is not None:
+            conditions.append(sql.SQL("{} >= %s").format(sql.Identifier(time_column)))
+            params.append(start)
+        if end is not None:
+            conditions.append(sql.SQL("{} < %s").format(sql.Identifier(time_column)))
+            params.append(end)
+        where = sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL("")
+        score = sql.Identifier(score_column)
+
+        with self.transaction() as cursor:
+            if source == "raw":
+                cursor.execute(sql.SQL("""
+                    SELECT count(*) AS total,
+                           avg({score}) AS score_mean, min({score}) AS score_min, max({score}) AS score_max,
+                           percentile_cont(ARRAY[0.5, 0.9, 0.95, 0.99]) WITHIN GROUP (ORDER BY {score}) AS score_percentiles,
+                           avg(processing_time_ms) AS time_mean, min(processing_time_ms) AS time_min,
+                           max(processing_time_ms) AS time_max,
+                           percentile_cont(ARRAY[0.5, 0.9, 0.95, 0.99]) WITHIN GROUP (ORDER BY processing_time_ms) AS time_percentiles
+                    FROM {table} {where}
+                """).format(score=score, table=sql.Identifier(table), where=where), params)
+                overall = cursor.fetchone()
+                cursor.execute(sql.SQL("""
+                    SELECT {label} AS label, count(*) AS count
+                    FROM {table} {where}
+                    GROUP BY 1 ORDER BY 2 DESC
+                """).format(label=sql.SQL(label_expression), table=sql.Identifier(table), where=where), params)
+                labels = cursor.fetchall()
+                cursor.execute(sql.SQL("""
+                    SELECT date_trunc(%s, timestamp) AS bucket, count(*) AS count,
+                           avg({score}) AS mean_score, avg(processing_time_ms) AS mean_processing_time_ms
+                    FROM {table} {where}
+                    GROUP BY 1 ORDER BY 1
+                """).format(score=score, table=sql.Identifier(table), where=where), [bucket, *params])
+                histogram = cursor.fetchall()
+            else:
+                # Deltas not folded yet are counted too, so rollup stats are as current as raw ones
+                rollup = sql.SQL("(SELECT * FROM {} UNION ALL SELECT * FROM {}) AS combined").format(
+                    sql.Identifier(rollup_table), sql.Identifier(ROLLUP_DELTAS[rollup_table])
+                )
+                cursor.execute(sql.SQL("""
+                    SELECT coalesce(sum(count), 0) AS total,
+                           sum(score_sum) / nullif(sum(count), 0) AS score_mean,
+                           min(score_min) AS score_min, max(score_max) AS score_max,
+                           NULL AS score_percentiles,
+                           sum(processing_time_sum)::float / nullif(sum(count), 0) AS time_mean,
+                           min(processing_time_min) AS time_min, max(processing_time_max) AS time_max,
+                           NULL AS time_percentiles
+                    FROM {rollup} {where}
+                """).format(rollup=rollup, where=where), params)
+                overall = cursor.fetchone()
+                cursor.execute(sql.SQL("""
+                    SELECT label, sum(count) AS count
+                    FROM {rollup} {where}
+                    GROUP BY 1 ORDER BY 2 DESC
+                """).format(rollup=rollup, where=where), params)
+                labels = cursor.fetchall()
+                cursor.execute(sql.SQL("""
+                    SELECT date_trunc(%s, bucket) AS bucket, sum(count) AS count,
+                           sum(score_sum) / nullif(sum(count), 0) AS mean_score,
+                           sum(processing_time_sum)::float / nullif(sum(count), 0) AS mean_processing_time_ms
+                    FROM {rollup} {where}
+                    GROUP BY 1 ORDER BY 1
+                """).format(rollup=rollup, where=where), [bucket, *params])
+                histogram = cursor.fetchall()
+
+        def summary(prefix: str) -> Dict[str, Any]:
+            percentiles = overall[f"{prefix}_percentiles"] or [None] * 4
+            return {
+                "mean": overall[f"{prefix}_mean"],
+                "min": overall[f"{prefix}_min"],
+                "max": overall[f"{prefix}_max"],
+                "p50": percentiles[0], "p90": percentiles[1],
+                "p95": percentiles[2], "p99": percentiles[3],
+            }
+
+        return {
+            "total": overall["total"],
+            "score": summary("score"),
+            "processing_time_ms": summary("time"),
+            "labels": {row["label"]: row["count"] for row in labels},
+            "histogram": histogram,
+        }
+
+    def get_vectara_stats(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          bucket: str = "hour", source: str = "raw") -> Dict[str, Any]:
+        """Aggregate statistics over ``output_score``; labels split consistent/hallucinated at 0.5.
+
+        ``source="rollup"`` reads the hourly rollup table and its pending deltas instead of
+        scanning results, at the cost of percentiles.
+        """
+        return self._get_stats(
+            "vectara_results", "output_score",
+            "CASE WHEN output_score >= 0.5 THEN 'consistent' ELSE 'hallucinated' END",
+            "vectara_results_hourly", start, end, bucket, source
+        )
+
+    def get_gibberish_stats(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            bucket: str = "hour", source: str = "raw") -> Dict[str, Any]:
+        """Aggregate statistics over ``prob_clean`` with the ``predicted_label`` distribution.
+
+        ``source="rollup"`` reads the hourly rollup table and its pending deltas instead of
+        scanning results, at the cost of percentiles.
+        """
+        return self._get_stats(
+            "gibberish_results", "prob_clean", "predicted_label",
+            "gibberish_results_hourly", start, end, bucket, source
+        )
+
+
+    def _export_query(self, table: str, columns: Tuple[str, ...], start: Optional[datetime],
+                      end: Optional[datetime]) -> Tuple[sql.Composed, List[Any]]:
+        conditions = []
+        params: List[Any] = []
+        if start is not None:
+            conditions.append(sql.SQL("timestamp >= %s"))
+            params.append(start)
+        if end is not None:
+            conditions.append(sql.SQL("timestamp < %s"))
+            params.append(end)
+        query = sql.SQL("SELECT {columns} FROM {table} {where} ORDER BY timestamp, prediction_id").format(
+            columns=select_columns(table, list(columns)),
+            table=sql.Identifier(table),
+            where=sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL(""),
+        )
+        return query, params
+
+    def iter_result_batches(self, table: str, columns: Tuple[str, ...], start: Optional[datetime] = None,
+                            end: Optional[datetime] = None, batch_size: int = 1000) -> Iterator[List[Tuple]]:
+        """Stream a whole results table, oldest first, as lists of row tuples.
+
+        Uses a server-side (named) cursor so only ``batch_size`` rows are held in memory;
+        the pooled connection is kept until the generator is exhausted or closed.
+        """
+        query, params = self._export_query(table, columns, start, end)
+        with self.connection() as conn:
+            with conn.cursor(name=f"export_{uuid4().hex}") as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            conn.rollback()
+
+    def iter_copy_csv(self, table: str, columns: Tuple[str, ...], start: Optional[datetime] = None,
+                      end: Optional[datetime] = None, max_chunks: int = 64) -> Iterator[bytes]:
+        """Stream ``COPY ... TO STDOUT WITH CSV HEADER`` output as it is produced.
+
+        COPY runs in a helper thread writing into a bounded queue, so memory stays constant
+        and a slow reader throttles the server instead of buffering the table.
+        """
+        query, params = self._export_query(table, columns, start, end)
+        chunks: "queue.Queue" = queue.Queue(maxsize=max_chunks)
+        abandoned = threading.Event()
+        done = object()
+
+        class _QueueWriter:
+            def write(self, data):
+                while True:
+                    if abandoned.is_set():
+                        raise IOError("Export abandoned by client")
+                    try:
+                        chunks.put(data if isinstance(data, bytes) else data.encode(), timeout=0.5)
+                        return
+                    except queue.Full:
+                        continue
+
+        def produce():
+            try:
+                with self.connection() as conn:
+                    with conn.cursor() as cursor:
+                        select = cursor.mogrify(query, params).decode()
+                        cursor.copy_expert(f"COPY ({select}) TO STDOUT WITH CSV HEADER", _QueueWriter())
+                    conn.rollback()
+            except Exception as e:
+                if not abandoned.is_set():
+                    logging.error(f"COPY export of {table} failed: {e}")
+                    chunks.put(e)
+                return
+            chunks.put(done)
+
+        producer = threading.Thread(target=produce, name=f"copy-{table}", daemon=True)
+        producer.start()
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is done:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            abandoned.set()
+            producer.join(timeout=5)
+
+    def _prune_input_texts(self, batch_size: int = PRUNE_BATCH_SIZE) -> int:
+        """Delete texts no longer referenced by any result, e.g. after partitions were dropped.
+
+        Walks ``input_texts`` in key order with one short transaction per ``batch_size`` keys,
+        so no insert waits on more than one batch. Unreferenced texts of the batch are locked
+        with ``SKIP LOCKED``, passing over texts a writer currently holds (see ``_save_texts``),
+        and deleted by a second statement that re-checks the references with a fresh snapshot,
+        so a result committed in between keeps its text.
+        """
+        pruned = 0
+        after = b""
+        while True:
+            with self.transaction() as cursor:
+                cursor.execute(
+                    "SELECT text_hash FROM input_texts WHERE text_hash > %s ORDER BY text_hash OFFSET %s LIMIT 1",
+                    (after, batch_size - 1)
+                )
+                row = cursor.fetchone()
+                upto = bytes(row["text_hash"]) if row is not None else None
+                cursor.execute(f"""
+                    SELECT text_hash FROM input_texts t
+                    WHERE text_hash > %s {"AND text_hash <= %s" if upto is not None else ""}
+                      AND {UNREFERENCED_TEXT}
+                    FOR UPDATE SKIP LOCKED
+                """, (after, upto) if upto is not None else (after,))
+                candidates = [bytes(row["text_hash"]) for row in cursor.fetchall()]
+                if candidates:
+                    cursor.execute(
+                        f"DELETE FROM input_texts t WHERE text_hash = ANY(%s) AND {UNREFERENCED_TEXT}",
+                        (candidates,)
+                    )
+                    pruned += cursor.rowcount
+            if upto is None:
+                break
+            after = upto
+        logging.info(f"Pruned {pruned} unreferenced input texts.")
+        return pruned
+
+    def fold_rollups(self) -> int:
+        """Fold the deltas appended by the insert triggers into the hourly rollup tables.
+
+        Inserts only append to the delta tables, so concurrent writers never wait on the
+        rollup row of the current hour; this is the one place those rows are updated. Runs
+        under a transaction-scoped advisory lock, so only one worker folds at a time.
+        """
+        folded = 0
+        with self.transaction() as cursor:
+            cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s)) AS locked", (ROLLUP_FOLD_LOCK_KEY,))
+            if not cursor.fetchone()["locked"]:
+                return 0
+            for rollup, delta in ROLLUP_DELTAS.items():
+                cursor.execute(sql.SQL(ROLLUP_FOLD).format(rollup=sql.Identifier(rollup), delta=sql.Identifier(delta)))
+                folded += cursor.rowcount
+        return folded
+
+    def maintain_partitions(self, interval: str, premake: int, retention_days: int = 0,
+                            compact: bool = True) -> Dict[str, Any]:
+        """Create upcoming partitions of the results tables, drop expired ones and compact closed ones.
+
+        Tables that are not partitioned are skipped. Runs under a transaction-scoped advisory
+        lock, so when several workers call it at once only one does the work. Compaction runs
+        ``VACUUM (FREEZE, ANALYZE)`` once on each partition that no longer receives inserts, so
+        autovacuum never has to revisit it. Input texts only referenced by dropped partitions
+        are pruned afterwards.
+        """
+        report: Dict[str, Any] = {"created": [], "dropped": [], "compacted": []}
+        to_compact: List[str] = []
+        with self.transaction() as cursor:
+            cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s)) AS locked",
+                           (partitions.MAINTENANCE_LOCK_KEY,))
+            if not cursor.fetchone()["locked"]:
+                return report
+            for table in RESULT_TABLES:
+                if not partitions.is_partitioned(cursor, table):
+                    continue
+                created, dropped = partitions.maintain(cursor, table, interval, premake, retention_days)
+                report["created"].extend(created)
+                report["dropped"].extend(dropped)
+                if compact:
+                    to_compact.extend(partitions.closed_partitions_to_compact(cursor, table, interval))
+
+        # After the drop commits: dropping partitions locks the parent tables until commit
+        if report["dropped"]:
+            report["pruned_texts"] = self._prune_input_texts()
+
+        if to_compact:
+            # VACUUM cannot run inside a transaction block
+            with self.connection() as conn:
+                conn.autocommit = True
+                try:
+                    with conn.cursor() as cursor:
+                        for name in to_compact:
+                            cursor.execute(sql.SQL("VACUUM (FREEZE, ANALYZE) {}").format(sql.Identifier(name)))
+                            report["compacted"].append(name)
+                finally:
+                    conn.autocommit = False
+            logging.info(f"Compacted closed partitions: {', '.join(to_compact)}")
+        return report
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
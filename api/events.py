@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+import psycopg2
+
+NOTIFY_CHANNEL = "prediction_results"
+
+_PREVIEW_FIELDS = ("input_1", "input_2", "input_text")
+
+
+def prediction_event(model: str, row: Dict[str, Any], preview_chars: int = 200) -> Dict[str, Any]:
+    """Compact event for one stored result; input texts are cut to ``preview_chars``."""
+    event = {"model": model, "timestamp": datetime.now(timezone.utc).isoformat()}
+    for key, value in row.items():
+        if key in ("probabilities", "stage_timings_ms"):
+            continue
+        if key in _PREVIEW_FIELDS and isinstance(value, str):
+            value = value[:preview_chars]
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        event[key] = value
+    event.update(row.get("probabilities") or {})
+    return event
+
+
+def event_score(event: Dict[str, Any]) -> Optional[float]:
+    return event.get("output_score", event.get("prob_clean"))
+
+
+def event_label(event: Dict[str, Any]) -> Optional[str]:
+    if "predicted_label" in event:
+        return event["predicted_label"]
+    score = event.get("output_score")
+    if score is None:
+        return None
+    return "consistent" if score >= 0.5 else "hallucinated"
+
+
+class EventBroadcaster:
+    """Fans stored prediction results out to live subscribers (the SSE stream).
+
+    Each subscriber owns a bounded queue; ``publish`` never blocks the write path,
+    so a subscriber that falls more than ``subscriber_buffer`` events behind loses
+    the newest ones (counted in ``dropped``) instead of slowing everyone down.
+    A background task also emits one ``aggregate`` event per model every
+    ``aggregate_interval_ms`` with the count, mean/min/max score, mean processing time and
+    label counts of the results published since the previous one.
+    """
+
+    def __init__(self, subscriber_buffer: int = 1000, aggregate_interval_ms: float = 1000.0):
+        self.subscriber_buffer = subscriber_buffer
+        self.aggregate_interval_ms = aggregate_interval_ms
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.ticker: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped = 0
+        self._deltas: Dict[str, Dict[str, Any]] = {}
+
+    def start(self):
+        if self.ticker is None:
+            self.loop = asyncio.get_running_loop()
+            self.ticker = asyncio.create_task(self._run())
+            logging.info(f"Event broadcaster started (subscriber_buffer={self.subscriber_buffer}, "
+                         f"aggregate_interval_ms={self.aggregate_interval_ms}).")
+
+    async def stop(self):
+        if self.ticker is not None:
+            self.ticker.cancel()
+            try:
+                await self.ticker
+            except asyncio.CancelledError:
+                pass
+            self.ticker = None
+            self.loop = None
+            logging.info(f"Event broadcaster stopped (published={self.published}, dropped={self.dropped}).")
+
+    def stats(self) -> Dict[str, int]:
+        return {"subscribers": len(self.subscribers), "published": self.published, "dropped": self.dropped}
+
+    def _send(self, kind: str, event: Dict[str, Any]):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait((kind, event))
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def publish(self, event: Dict[str, Any]):
+        """Deliver a prediction event; must be called on the event loop."""
+        self.published += 1
+        delta = self._deltas.setdefault(event["model"], {
+            "count": 0, "score_sum": 0.0, "score_min": None, "score_max": None,
+            "processing_time_sum": 0, "labels": defaultdict(int)
+        })
+        score = event_score(event)
+        delta["count"] += 1
+        if score is not None:
+            delta["score_sum"] += score
+            delta["score_min"] = score if delta["score_min"] is None else min(delta["score_min"], score)
+            delta["score_max"] = score if delta["score_max"] is None else max(delta["score_max"], score)
+        delta["processing_time_sum"] += event.get("processing_time_ms") or 0
+        label = event_label(event)
+        if label is not None:
+            delta["labels"][label] += 1
+        self._send("prediction", event)
+
+    def publish_threadsafe(self, events: List[Dict[str, Any]]):
+        """Hand events over from a worker thread (database executor, LISTEN thread)."""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+        for event in events:
+            loop.call_soon_threadsafe(self.publish, event)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        """Register a subscriber queue of ``(kind, event)`` tuples for the duration of the block."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_buffer)
+        self.subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self.subscribers.discard(queue)
+
+    def _aggregates(self) -> List[Dict[str, Any]]:
+        deltas, self._deltas = self._deltas, {}
+        timestamp = datetime.now(timezone.utc).isoformat()
+        return [
+            {
+                "model": model,
+                "timestamp": timestamp,
+                "interval_ms": self.aggregate_interval_ms,
+                "count": delta["count"],
+                "mean_score": delta["score_sum"] / delta["count"],
+                "min_score": delta["score_min"],
+                "max_score": delta["score_max"],
+                "mean_processing_time_ms": delta["processing_time_sum"] / delta["count"],
+                "labels": dict(delta["labels"]),
+            }
+            for model, delta in deltas.items()
+        ]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.aggregate_interval_ms / 1000)
+            for aggregate in self._aggregates():
+                self._send("aggregate", aggregate)
+
+
+class NotifyListener:
+    """Feeds a broadcaster from PostgreSQL ``LISTEN`` instead of the local write path.
+
+    The insert triggers created by ``db_init.py`` (with ``EVENTS_SOURCE=notify``) send one
+    notification per stored row, so every worker process and every API instance sees
+    every result no matter which one wrote it. A dedicated autocommit connection is
+    polled from a daemon thread and re-established with backoff if it drops.
+    """
+
+    def __init__(self, db_url: str, broadcaster: EventBroadcaster, channel: str = NOTIFY_CHANNEL):
+        self.db_url = db_url
+        self.broadcaster = broadcaster
+        self.channel = channel
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+
+    def start(self):
+        if self.thread is None:
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name=f"listen-{self.channel}", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join(timeout=5)
+            self.thread = None
+
+    def _listen(self):
+        conn = psycopg2.connect(self.db_url)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+            logging.info(f"Listening for result notifications on '{self.channel}'.")
+            while not self.stopping.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                events = []
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        events.append(json.loads(notify.payload))
+                    except ValueError:
+                        logging.warning(f"Ignoring malformed notification on '{self.channel}'.")
+                self.broadcaster.publish_threadsafe(events)
+        finally:
+            conn.close()
+
+    def _run(self):
+        backoff = 1.0
+        while not self.stopping.is_set():
+            try:
+                self._listen()
+                backoff = 1.0
+            except Exception as e:
+                logging.error(f"Result notification listener failed, retrying in {backoff:.0f}s: {e}")
+                self.stopping.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
@@ -0,0 +1,85 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import torch
+
+from metrics import QUEUE_DEPTH
+
+
+def configure_torch_threads(num_threads: int, num_interop_threads: int = 0):
+    """Bound torch parallelism so several workers on one host don't oversubscribe cores.
+
+    Must run once per process before the first inference: torch only accepts the
+    inter-op thread count before any inter-op work has started. ``0`` keeps torch's default.
+    """
+    if num_threads > 0 and torch.get_num_threads() != num_threads:
+        torch.set_num_threads(num_threads)
+        logging.info(f"torch intra-op threads set to {num_threads}.")
+    if num_interop_threads > 0 and torch.get_num_interop_threads() != num_interop_threads:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+            logging.info(f"torch inter-op threads set to {num_interop_threads}.")
+        except RuntimeError as e:
+            logging.warning(f"Could not set torch inter-op threads: {e}")
+
+
+class InstrumentedExecutor:
+    """Thread pool that keeps blocking work off the event loop and reports its saturation.
+
+    ``queued`` counts submitted calls still waiting for a worker thread and
+    ``running`` counts calls currently executing.
+    """
+
+    def __init__(self, name: str, max_workers: int, initializer: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name, initializer=initializer
+        )
+        self.queued = 0
+        self.running = 0
+        self.depth = QUEUE_DEPTH.labels(f"executor_{name}")
+        self._lock = threading.Lock()
+
+    def _call(self, fn: Callable[..., Any]) -> Any:
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+            self.depth.set(self.queued)
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _done(self, future: Future):
+        # A call cancelled while still waiting (its caller gave up, or shutdown) never reaches _call
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+                self.depth.set(self.queued)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        call = functools.partial(fn, *args, **kwargs)
+        with self._lock:
+            future = self.executor.submit(self._call, call)
+            self.queued += 1
+            self.depth.set(self.queued)
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "queued": self.queued,
+            "running": self.running,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        logging.info(f"Executor '{self.name}' shut down.")
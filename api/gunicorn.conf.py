@@ -0,0 +1,42 @@
+"""Multi-process serving with model weights shared between workers.
+
+Usage:
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the master (``preload_app``) and the eager models are loaded
+there before any worker forks, so the weight tensors live in pages every worker maps
+copy-on-write instead of one private copy per worker. ``gc.freeze()`` moves everything
+loaded so far out of the collector's reach; otherwise the first collection in each worker
+writes to the headers of those objects and un-shares their pages.
+"""
+import gc
+import multiprocessing
+import os
+import tempfile
+
+# One worker per core; each worker gets a single intra-op thread unless told otherwise so
+# the workers don't oversubscribe the cores between them. Must be set before the app import.
+os.environ.setdefault("INFERENCE_TORCH_THREADS", "1")
+# Workers write metric samples here so /api/metrics can merge them; must be empty at start
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+
+
+def when_ready(server):
+    from routes import model_manager
+
+    model_manager.preload()
+    gc.freeze()
+    server.log.info(f"Preloaded models {model_manager.status()}; forking {server.num_workers} workers.")
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+EAGER = "eager"
+LAZY = "lazy"
+
+
+class ModelSlot:
+    """One model's lifecycle: load on startup (eager) or first use (lazy), then warm up."""
+
+    def __init__(self, name: str, factory: Callable[[], Any], load_mode: str = EAGER, warmup: bool = True,
+                 fork_safe: bool = True):
+        if load_mode not in (EAGER, LAZY):
+            raise ValueError(f"Model '{name}' load mode must be '{EAGER}' or '{LAZY}', got '{load_mode}'")
+        self.name = name
+        self.factory = factory
+        self.load_mode = load_mode
+        self.warmup = warmup
+        self.fork_safe = fork_safe
+        self.instance: Optional[Any] = None
+        self.state = "not_loaded"
+        self.error: Optional[str] = None
+        self.load_time_ms: Optional[int] = None
+        self.warmup_time_ms: Optional[int] = None
+        self.preloaded = False
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        if self.instance is None:
+            self.load()
+        return self.instance
+
+    def load(self, warmup: Optional[bool] = None):
+        """Load the model if needed and warm it up unless ``warmup`` is False.
+
+        A model preloaded without warm-up (see ``ModelManager.preload``) stays in the
+        ``loaded`` state until a later ``load()`` warms it up in the serving process.
+        """
+        warmup = self.warmup if warmup is None else warmup
+        with self._lock:
+            if self.state == "ready" or (self.state == "loaded" and not warmup):
+                return
+            self.state = "loading"
+            self.error = None
+            try:
+                instance = self.instance
+                if instance is None:
+                    logging.info(f"Loading model '{self.name}'...")
+                    start_time = time.perf_counter()
+                    instance = self.factory()
+                    self.load_time_ms = int((time.perf_counter() - start_time) * 1000)
+                if warmup and hasattr(instance, "warmup"):
+                    start_time = time.perf_counter()
+                    instance.warmup()
+                    self.warmup_time_ms = int((time.perf_counter() - start_time) * 1000)
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                logging.error(f"Loading model '{self.name}' failed: {e}")
+                raise
+            self.instance = instance
+            self.state = "ready" if warmup or not self.warmup else "loaded"
+            logging.info(f"Model '{self.name}' {self.state} (load {self.load_time_ms} ms, "
+                         f"warm-up {self.warmup_time_ms} ms).")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "load_mode": self.load_mode,
+            "preloaded": self.preloaded,
+            "state": self.state,
+            "load_time_ms": self.load_time_ms,
+            "warmup_time_ms": self.warmup_time_ms,
+            "error": self.error,
+        }
+
+
+class ModelManager:
+    """Registry of the models served by this process."""
+
+    def __init__(self):
+        self.slots: Dict[str, ModelSlot] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], load_mode: str = EAGER, warmup: bool = True,
+                 fork_safe: bool = True):
+        self.slots[name] = ModelSlot(name, factory, load_mode, warmup, fork_safe)
+
+    def get(self, name: str) -> Any:
+        """Return the loaded model, loading it first if needed. Blocking; call off the event loop."""
+        return self.slots[name].get()
+
+    def load_all(self, eager_only: bool = True):
+        for slot in self.slots.values():
+            if slot.load_mode == EAGER or not eager_only:
+                slot.load()
+
+    def preload(self):
+        """Load eager, fork-safe models without warming them up, before worker processes fork.
+
+        Called in the pre-fork master (see ``gunicorn.conf.py``) so every worker inherits the
+        weights copy-on-write instead of loading its own copy. Warm-up is left to the workers:
+        it allocates activation buffers per process and running torch kernels before ``fork``
+        can leave the child's intra-op thread pool unusable.
+        """
+        for slot in self.slots.values():
+            if slot.load_mode == EAGER and slot.fork_safe:
+                slot.load(warmup=False)
+                slot.preloaded = True
+
+    async def load_eager(self):
+        """Load eager models in the background so startup and liveness are not blocked on them."""
+        loop = asyncio.get_running_loop()
+        for slot in self.slots.values():
+            if slot.load_mode == EAGER and slot.state != "ready":
+                try:
+                    await loop.run_in_executor(None, slot.load)
+                except Exception:
+                    pass  # recorded on the slot and reported by readiness
+
+    def ready(self) -> bool:
+        """Eager models must be loaded; lazy models only must not have failed."""
+        return all(
+            slot.state == "ready" if slot.load_mode == EAGER else slot.state != "failed"
+            for slot in self.slots.values()
+        )
+
+    def status(self) -> Dict[str, Any]:
+        return {name: slot.status() for name, slot in self.slots.items()}
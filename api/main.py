@@ -1,11 +1,134 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from routes import router
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from metrics import REQUEST_LATENCY, REQUESTS, REQUEST_ERRORS, IN_FLIGHT
+from routes import (
+    router, db, model_manager, vectara_batcher, gibberish_batcher, inference_executor, bulk_executor,
+    db_executor, vectara_writer, gibberish_writer, event_broadcaster, notify_listener, MAX_REQUEST_BYTES,
+    RESULTS_PARTITION_INTERVAL, maintain_partitions_periodically, fold_rollups_periodically,
+    record_process_memory_periodically
+)
 import sys
 import os
+import time
 sys.path.append(os.getcwd())
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db.connect()
+    model_loading = asyncio.create_task(model_manager.load_eager())
+    event_broadcaster.start()
+    for writer in (vectara_writer, gibberish_writer):
+        if writer is not None:
+            # Starting now writes rows spilled by an earlier shutdown without waiting for traffic
+            writer.start()
+    if notify_listener is not None:
+        notify_listener.start()
+    partition_maintenance = None
+    if RESULTS_PARTITION_INTERVAL != "none":
+        partition_maintenance = asyncio.create_task(maintain_partitions_periodically())
+    rollup_folding = asyncio.create_task(fold_rollups_periodically())
+    memory_recording = asyncio.create_task(record_process_memory_periodically())
+    yield
+    model_loading.cancel()
+    rollup_folding.cancel()
+    memory_recording.cancel()
+    if partition_maintenance is not None:
+        partition_maintenance.cancel()
+    if notify_listener is not None:
+        notify_listener.stop()
+    await vectara_batcher.stop()
+    await gibberish_batcher.stop()
+    for writer in (vectara_writer, gibberish_writer):
+        if writer is not None:
+            await writer.stop()
+    await event_broadcaster.stop()
+    inference_executor.shutdown()
+    bulk_executor.shutdown()
+    db_executor.shutdown()
+    db.disconnect()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class LimitRequestSize:
+    """Refuse request bodies over ``max_bytes`` with 413, whether or not they declare a length.
+
+    A declared Content-Length is checked before anything is read. The body is also counted
+    as the app reads it, so a chunked request or one without the header is cut off at the
+    limit instead of being buffered whole before validation.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None:
+            try:
+                declared_length = int(content_length)
+            except ValueError:
+                response = JSONResponse(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    content={"detail": "Invalid Content-Length header"}
+                )
+                return await response(scope, receive, send)
+            if declared_length > self.max_bytes:
+                response = JSONResponse(
+                    status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                    content={"detail": f"Request body exceeds {self.max_bytes} bytes"}
+                )
+                return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Re-raised by FastAPI's body parsing and answered by its exception handler
+                    raise HTTPException(
+                        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                        detail=f"Request body exceeds {self.max_bytes} bytes"
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(LimitRequestSize, max_bytes=MAX_REQUEST_BYTES)
+
+
+# Registered last so it wraps the size limit and also counts 413s
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    IN_FLIGHT.inc()
+    start_time = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template (e.g. /export/{model}), set on the scope by routing, so labels stay bounded
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        REQUEST_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - start_time)
+        REQUESTS.labels(request.method, endpoint, str(status_code)).inc()
+        if status_code >= 500:
+            REQUEST_ERRORS.labels(request.method, endpoint).inc()
+        IN_FLIGHT.dec()
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,6 +136,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-app.include_router(router, prefix="/api")
\ No newline at end of file
+app.include_router(router, prefix="/api")
@@ -0,0 +1,79 @@
+import os
+from typing import Dict
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess, REGISTRY
+)
+
+# Seconds; wide enough for a single cached lookup up to a long bulk request
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds", "Total request latency per endpoint",
+    ["method", "endpoint"], buckets=LATENCY_BUCKETS
+)
+REQUESTS = Counter(
+    "api_requests_total", "Requests handled per endpoint and status code",
+    ["method", "endpoint", "status"]
+)
+REQUEST_ERRORS = Counter(
+    "api_request_errors_total", "Requests that failed with a 5xx status or an unhandled exception",
+    ["method", "endpoint"]
+)
+IN_FLIGHT = Gauge(
+    "api_requests_in_flight", "Requests currently being handled", multiprocess_mode="livesum"
+)
+STAGE_LATENCY = Histogram(
+    "inference_stage_duration_seconds",
+    "Time per processing stage (tokenize, forward, postprocess, db_insert) per model and batch",
+    ["model", "stage"], buckets=LATENCY_BUCKETS
+)
+QUEUE_DEPTH = Gauge(
+    "queue_depth", "Items waiting in a micro-batcher, executor or write-behind buffer",
+    ["queue"], multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE = Gauge(
+    "admission_queue_length", "Requests waiting for an inference slot per model and priority class",
+    ["model", "priority"], multiprocess_mode="livesum"
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Prediction requests refused before inference, by reason (queue_full: 429, deadline: 503)",
+    ["model", "priority", "reason"]
+)
+GIBBERISH_DECISIONS = Counter(
+    "gibberish_decisions_total",
+    "Gibberish results by the cascade stage that answered them (prefilter, cache or transformer)",
+    ["decided_by"]
+)
+CACHE_HITS = Counter("prediction_cache_hits_total", "Prediction cache lookups answered from the cache", ["cache"])
+CACHE_MISSES = Counter("prediction_cache_misses_total", "Prediction cache lookups that went to the model", ["cache"])
+CACHE_EVICTIONS = Counter(
+    "prediction_cache_evictions_total",
+    "Prediction cache entries removed, by reason (size: LRU eviction, ttl: expired on lookup)",
+    ["cache", "reason"]
+)
+# One sample per live worker (labelled by pid), refreshed by each worker on a timer
+PROCESS_MEMORY = Gauge(
+    "process_memory_bytes", "Resident memory of the serving process by kind (rss, pss, shared, private)",
+    ["kind"], multiprocess_mode="liveall"
+)
+
+
+def observe_stages(model: str, timings_ms: Dict[str, float]):
+    for stage, elapsed_ms in timings_ms.items():
+        STAGE_LATENCY.labels(model, stage).observe(elapsed_ms / 1000)
+
+
+def render() -> bytes:
+    """Exposition of every metric; aggregated over all workers when running multi-process.
+
+    Under gunicorn, ``PROMETHEUS_MULTIPROC_DIR`` is set before the app is imported, and each
+    worker writes its samples to files there which are merged at scrape time.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
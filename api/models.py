@@ -1,14 +1,40 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
+import os
 
-from typing import Optional
+from typing import Annotated, Dict, List, Literal, Optional
+
+# Rejected with 422 during validation, before anything is tokenized
+MAX_INPUT_CHARS = int(os.environ.get("MAX_INPUT_CHARS", "20000"))
+MAX_BATCH_INPUTS = int(os.environ.get("MAX_BATCH_INPUTS", "1000"))
+
+InputText = Annotated[str, Field(max_length=MAX_INPUT_CHARS)]
 
 class VectaraPredictionRequest(BaseModel):
-    input_1: str = Field(..., description="First input text for comparison")
-    input_2: str = Field(..., description="Second input text for comparison")
+    input_1: InputText = Field(..., description="First input text for comparison")
+    input_2: InputText = Field(..., description="Second input text for comparison")
 
 class GibberishPredictionRequest(BaseModel):
-    input_text: str = Field(..., description="Input text to analyze for gibberish")
+    input_text: InputText = Field(..., description="Input text to analyze for gibberish")
+
+class VectaraBatchPredictionRequest(BaseModel):
+    inputs: List[VectaraPredictionRequest] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_INPUTS, description="Premise/hypothesis pairs to score"
+    )
+
+class GibberishBatchPredictionRequest(BaseModel):
+    inputs: List[InputText] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_INPUTS, description="Input texts to analyze for gibberish"
+    )
+
+class VectaraPremiseRequest(BaseModel):
+    premise: InputText = Field(..., description="Source text every hypothesis is checked against")
+    hypotheses: List[InputText] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_INPUTS, description="Hypotheses (e.g. answer sentences) to score"
+    )
+    aggregation: Literal["min", "mean"] = Field(
+        "min", description="How hypothesis scores combine into aggregate_score"
+    )
 
 class VectaraResult(BaseModel):
     prediction_id: str
@@ -18,6 +44,10 @@ class VectaraResult(BaseModel):
     timestamp: datetime
     processing_time_ms: int
     status: str
+    queue_time_ms: Optional[int] = None
+    compute_time_ms: Optional[int] = None
+    cache_hit: Optional[bool] = None
+    stage_timings_ms: Optional[Dict[str, float]] = None
 
 class GibberishResult(BaseModel):
     prediction_id: str
@@ -30,5 +60,64 @@ class GibberishResult(BaseModel):
     timestamp: datetime
     processing_time_ms: int
     status: str
+    queue_time_ms: Optional[int] = None
+    compute_time_ms: Optional[int] = None
+    cache_hit: Optional[bool] = None
+    stage_timings_ms: Optional[Dict[str, float]] = None
+    decided_by: Optional[str] = None
+
+class VectaraPremiseResult(BaseModel):
+    premise_chunks: int
+    aggregation: str
+    aggregate_score: float
+    processing_time_ms: int
+    stage_timings_ms: Optional[Dict[str, float]] = None
+    results: List[VectaraResult]
+
+class VectaraResultRow(BaseModel):
+    """Stored Vectara result as returned by the results API; non-key columns may be projected away."""
+    prediction_id: str
+    timestamp: datetime
+    input_1: Optional[str] = None
+    input_2: Optional[str] = None
+    output_score: Optional[float] = None
+    processing_time_ms: Optional[int] = None
+    status: Optional[str] = None
+    stage_timings_ms: Optional[Dict[str, float]] = None
+
+class GibberishResultRow(BaseModel):
+    """Stored Gibberish result as returned by the results API; non-key columns may be projected away."""
+    prediction_id: str
+    timestamp: datetime
+    input_text: Optional[str] = None
+    predicted_label: Optional[str] = None
+    prob_clean: Optional[float] = None
+    prob_mild_gibberish: Optional[float] = None
+    prob_noise: Optional[float] = None
+    prob_word_salad: Optional[float] = None
+    processing_time_ms: Optional[int] = None
+    status: Optional[str] = None
+    stage_timings_ms: Optional[Dict[str, float]] = None
+    decided_by: Optional[str] = None
+
+class MetricSummary(BaseModel):
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+class StatsBucket(BaseModel):
+    bucket: datetime
+    count: int
+    mean_score: Optional[float] = None
+    mean_processing_time_ms: Optional[float] = None
 
-    
+class ResultStats(BaseModel):
+    total: int
+    score: MetricSummary
+    processing_time_ms: MetricSummary
+    labels: Dict[str, int]
+    histogram: List[StatsBucket]
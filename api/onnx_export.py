@@ -0,0 +1,108 @@
+"""Export the gibberish detector to ONNX and check it against the torch backend.
+
+Usage:
+    python onnx_export.py export --output models/gibberish-onnx
+    python onnx_export.py check --onnx-dir models/gibberish-onnx [--tolerance 1e-4]
+
+``export`` writes ``model.onnx`` (dynamic batch and sequence axes, graph-optimized offline by
+ONNX Runtime) together with the tokenizer and config, so the directory can be served with
+``GIBBERISH_BACKEND=onnx GIBBERISH_ONNX_DIR=<dir>`` without network access. ``check`` scores
+a fixed corpus with both backends and fails when any probability differs by more than the
+tolerance.
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+
+import torch
+
+from precision_check import GIBBERISH_CORPUS
+from services import GibberishService, ONNX_MODEL_FILENAME
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Positional (input_ids, attention_mask) -> logits wrapper, which is what the exporter traces."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export(output_dir: str, model_id: str = None, opset: int = 17, **load_kwargs):
+    import onnxruntime as ort
+
+    service = GibberishService(model_id=model_id, **load_kwargs)
+    os.makedirs(output_dir, exist_ok=True)
+    example = service.tokenizer(["warm up", "a slightly longer warm up text"], return_tensors="pt", padding=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = os.path.join(tmp, "raw.onnx")
+        torch.onnx.export(
+            _LogitsOnly(service.model).eval(),
+            (example["input_ids"], example["attention_mask"]),
+            raw_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=opset,
+            dynamo=False,
+        )
+        # Apply the portable graph optimizations once here instead of on every session start
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        options.optimized_model_filepath = os.path.join(output_dir, ONNX_MODEL_FILENAME)
+        ort.InferenceSession(raw_path, options, providers=["CPUExecutionProvider"])
+
+    service.tokenizer.save_pretrained(output_dir)
+    service.config.save_pretrained(output_dir)
+    logging.info(f"Exported {service.model_id} to {output_dir}.")
+
+
+def check(onnx_dir: str, model_id: str = None, **load_kwargs) -> dict:
+    reference = GibberishService(model_id=model_id, **load_kwargs)
+    candidate = GibberishService(backend='onnx', onnx_dir=onnx_dir)
+
+    expected = reference.predict_batch(GIBBERISH_CORPUS)
+    actual = candidate.predict_batch(GIBBERISH_CORPUS)
+    max_deviation = max(
+        abs(expected_probs[key] - actual_probs[key])
+        for (expected_probs, _), (actual_probs, _) in zip(expected, actual)
+        for key in GibberishService.PROB_KEYS
+    )
+    agreement = sum(e[1] == a[1] for e, a in zip(expected, actual)) / len(expected)
+    return {"samples": len(GIBBERISH_CORPUS), "max_abs_deviation": max_deviation, "label_agreement": agreement}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="ONNX export and parity check for the gibberish detector.")
+    parser.add_argument("--model-id", default=None, help="Model id or local path (defaults to the served model)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export and optimize the ONNX graph")
+    export_parser.add_argument("--output", required=True)
+    export_parser.add_argument("--opset", type=int, default=17)
+    check_parser = subparsers.add_parser("check", help="Compare ONNX Runtime outputs with torch")
+    check_parser.add_argument("--onnx-dir", required=True)
+    check_parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    load_kwargs = {
+        "cache_dir": os.environ.get("MODEL_CACHE_DIR"),
+        "local_files_only": os.environ.get("MODEL_LOCAL_FILES_ONLY", "false").lower() == "true",
+    }
+    if args.command == "export":
+        export(args.output, model_id=args.model_id, opset=args.opset, **load_kwargs)
+    else:
+        report = check(args.onnx_dir, model_id=args.model_id, **load_kwargs)
+        print(json.dumps(report, indent=2))
+        if report["max_abs_deviation"] > args.tolerance:
+            raise SystemExit(f"ONNX outputs deviate by {report['max_abs_deviation']:.2e} (tolerance {args.tolerance:.0e})")
@@ -0,0 +1,176 @@
+"""Range partitioning of the results tables by ``timestamp``.
+
+Each partition covers one ``day``, ``week`` (starting Monday) or ``month`` and is named
+``<table>_p<YYYYMMDD>`` after its first day, so partitions sort by age and their bounds
+can be recovered from the name. A ``<table>_default`` partition catches rows outside every
+range; maintenance creates partitions ahead of time so it normally stays empty. Rows it did
+catch are moved into the partition for their range when that partition is created.
+
+Every function takes an open cursor and leaves committing to the caller; they are shared
+by ``db_init.py`` and the API's periodic maintenance.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from psycopg2 import sql
+
+PARTITION_INTERVALS = ("day", "week", "month")
+# Taken for the duration of a maintenance transaction so several workers don't race
+MAINTENANCE_LOCK_KEY = "results_partition_maintenance"
+
+
+def check_interval(interval: str):
+    if interval not in PARTITION_INTERVALS:
+        raise ValueError(f"Partition interval must be one of: {', '.join(PARTITION_INTERVALS)}")
+
+
+def partition_start(interval: str, moment: datetime) -> datetime:
+    """Start (UTC midnight) of the partition containing ``moment``."""
+    day = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_start(interval: str, start: datetime) -> datetime:
+    if interval == "week":
+        return start + timedelta(weeks=1)
+    if interval == "month":
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m%d}"
+
+
+def is_partitioned(cursor, table: str) -> bool:
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", (table,))
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor, table: str) -> List[Tuple[str, datetime]]:
+    """``(name, start)`` of every range partition of ``table``, oldest first."""
+    cursor.execute("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+    """, (table,))
+    prefix = f"{table}_p"
+    partitions = []
+    for row in cursor.fetchall():
+        name = row[0] if isinstance(row, tuple) else row["relname"]
+        if name.startswith(prefix):
+            start = datetime.strptime(name[len(prefix):], "%Y%m%d").replace(tzinfo=timezone.utc)
+            partitions.append((name, start))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def default_has_rows(cursor, table: str, start: datetime, end: datetime) -> bool:
+    """Whether ``<table>_default`` holds rows in ``[start, end)``; False when it doesn't exist yet."""
+    default = f"{table}_default"
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL AS exists", (default,))
+    row = cursor.fetchone()
+    if not (row[0] if isinstance(row, tuple) else row["exists"]):
+        return False
+    cursor.execute(sql.SQL("SELECT 1 FROM {} WHERE timestamp >= %s AND timestamp < %s LIMIT 1").format(
+        sql.Identifier(default)
+    ), (start, end))
+    return cursor.fetchone() is not None
+
+
+def create_partition_from_default(cursor, table: str, name: str, start: datetime, end: datetime):
+    """Create partition ``name`` for ``[start, end)`` and move the default partition's rows of that range into it.
+
+    ``CREATE TABLE ... PARTITION OF`` fails while the default partition holds rows of the new
+    range, so the partition is built as a plain table, filled from the default partition and
+    then attached. The rows go straight to the partition, so the parent's insert triggers
+    (rollups, notifications) don't see them a second time.
+    """
+    default = sql.Identifier(f"{table}_default")
+    cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(
+        sql.Identifier(name), sql.Identifier(table)
+    ))
+    cursor.execute(sql.SQL("""
+        WITH moved AS (DELETE FROM {} WHERE timestamp >= %s AND timestamp < %s RETURNING *)
+        INSERT INTO {} SELECT * FROM moved
+    """).format(default, sql.Identifier(name)), (start, end))
+    moved = cursor.rowcount
+    cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)").format(
+        sql.Identifier(table), sql.Identifier(name)
+    ), (start, end))
+    logging.warning(f"Moved {moved} rows of {table} from the default partition into {name}.")
+
+
+def create_partitions(cursor, table: str, interval: str, first: datetime, last: datetime) -> List[str]:
+    """Create the partitions covering ``first`` through ``last`` and the default partition."""
+    check_interval(interval)
+    existing = {name for name, _ in list_partitions(cursor, table)}
+    created = []
+    start = partition_start(interval, first)
+    while start <= last:
+        end = next_start(interval, start)
+        name = partition_name(table, start)
+        if name not in existing:
+            if default_has_rows(cursor, table, start, end):
+                create_partition_from_default(cursor, table, name, start, end)
+            else:
+                cursor.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                    sql.Identifier(name), sql.Identifier(table)
+                ), (start, end))
+            created.append(name)
+        start = end
+    cursor.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} DEFAULT").format(
+        sql.Identifier(f"{table}_default"), sql.Identifier(table)
+    ))
+    return created
+
+
+def drop_expired_partitions(cursor, table: str, interval: str, retention_days: int,
+                            now: Optional[datetime] = None) -> List[str]:
+    """Drop partitions whose whole range is older than ``retention_days``.
+
+    Dropping a partition removes its rows and indexes without a DELETE, dead tuples or
+    vacuum work. The hourly rollups are kept, so ``/stats?source=rollup`` still covers
+    the dropped range.
+    """
+    check_interval(interval)
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    dropped = []
+    for name, start in list_partitions(cursor, table):
+        if next_start(interval, start) <= cutoff:
+            cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+            dropped.append(name)
+    return dropped
+
+
+def closed_partitions_to_compact(cursor, table: str, interval: str,
+                                 now: Optional[datetime] = None) -> List[str]:
+    """Partitions that no longer receive inserts and have never been vacuumed explicitly."""
+    check_interval(interval)
+    current = partition_start(interval, now or datetime.now(timezone.utc))
+    closed = [name for name, start in list_partitions(cursor, table) if start < current]
+    if not closed:
+        return []
+    cursor.execute(
+        "SELECT relname FROM pg_stat_user_tables WHERE relname = ANY(%s) AND last_vacuum IS NULL",
+        (closed,)
+    )
+    pending = {row[0] if isinstance(row, tuple) else row["relname"] for row in cursor.fetchall()}
+    return [name for name in closed if name in pending]
+
+
+def maintain(cursor, table: str, interval: str, premake: int, retention_days: int = 0,
+             now: Optional[datetime] = None) -> Tuple[List[str], List[str]]:
+    """Create the next ``premake`` partitions and drop expired ones; returns (created, dropped)."""
+    now = now or datetime.now(timezone.utc)
+    last = partition_start(interval, now)
+    for _ in range(premake):
+        last = next_start(interval, last)
+    created = create_partitions(cursor, table, interval, now, last)
+    dropped = drop_expired_partitions(cursor, table, interval, retention_days, now) if retention_days > 0 else []
+    if created or dropped:
+        logging.info(f"Partitions of {table}: created {created or 'none'}, dropped {dropped or 'none'}.")
+    return created, dropped
@@ -0,0 +1,134 @@
+"""Compare reduced-precision inference against fp32 on a fixed corpus.
+
+Usage:
+    python precision_check.py --precision int8 [--model gibberish|vectara|all] [--json]
+
+Loads each model twice (fp32 and the requested precision), scores the corpus below with
+both and reports the maximum absolute probability deviation and label agreement.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Any, Dict
+
+from services import GibberishService, VectaraService, PRECISIONS
+
+GIBBERISH_CORPUS = [
+    "The meeting has been moved to Thursday afternoon.",
+    "Please find the quarterly report attached to this email.",
+    "asdkjh qwelkj zxcmnb poiuyt",
+    "fjfjfjfj dkdkdkd slslsls",
+    "Banana telescope the purple quickly singing mountain.",
+    "Cat the on sat mat quickly blue.",
+    "I would like to book a table for two at seven.",
+    "Thx 4 the info, c u l8r",
+    "The mitochondria is the powerhouse of the cell.",
+    "xkcd lol omg wtf bbq",
+    "Our new product launches next spring in three markets.",
+    "Colorless green ideas sleep furiously.",
+    "",
+    "a",
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+    "The quick brown fox jumps over the lazy dog. " * 8,
+]
+
+VECTARA_CORPUS = [
+    ("The capital of France is Paris.", "Paris is the capital of France."),
+    ("The capital of France is Paris.", "The capital of France is Berlin."),
+    ("I am in California.", "I am in United States."),
+    ("I am in United States.", "I am in California."),
+    ("A man walks into a bar and buys a drink.", "A bloke swigs alcohol at a pub."),
+    ("A person on a horse jumps over a broken down airplane.", "A person is at a diner, ordering an omelette."),
+    ("Mark Wahlberg was a fan of Manny.", "Manny was a fan of Mark Wahlberg."),
+    ("The company reported revenue of $3.2 billion in 2023, up 12% from 2022.",
+     "Revenue grew by twelve percent year over year."),
+    ("The company reported revenue of $3.2 billion in 2023, up 12% from 2022.",
+     "Revenue declined in 2023."),
+    ("The meeting is scheduled for 3pm on Tuesday in room 204.", "The meeting is on Wednesday."),
+]
+
+
+def compare_gibberish(precision: str, **kwargs) -> Dict[str, Any]:
+    reference = GibberishService(precision='fp32', **kwargs)
+    candidate = GibberishService(precision=precision, **kwargs)
+
+    start_time = time.perf_counter()
+    expected = reference.predict_batch(GIBBERISH_CORPUS)
+    reference_ms = int((time.perf_counter() - start_time) * 1000)
+    start_time = time.perf_counter()
+    actual = candidate.predict_batch(GIBBERISH_CORPUS)
+    candidate_ms = int((time.perf_counter() - start_time) * 1000)
+
+    max_deviation = max(
+        abs(expected_probs[key] - actual_probs[key])
+        for (expected_probs, _), (actual_probs, _) in zip(expected, actual)
+        for key in GibberishService.PROB_KEYS
+    )
+    agreement = sum(e[1] == a[1] for e, a in zip(expected, actual)) / len(expected)
+    return {
+        "model": "gibberish",
+        "precision": precision,
+        "samples": len(GIBBERISH_CORPUS),
+        "max_abs_deviation": max_deviation,
+        "label_agreement": agreement,
+        "fp32_ms": reference_ms,
+        "candidate_ms": candidate_ms,
+    }
+
+
+def compare_vectara(precision: str, **kwargs) -> Dict[str, Any]:
+    reference = VectaraService(precision='fp32', **kwargs)
+    candidate = VectaraService(precision=precision, **kwargs)
+
+    start_time = time.perf_counter()
+    expected = reference.predict_batch(VECTARA_CORPUS)
+    reference_ms = int((time.perf_counter() - start_time) * 1000)
+    start_time = time.perf_counter()
+    actual = candidate.predict_batch(VECTARA_CORPUS)
+    candidate_ms = int((time.perf_counter() - start_time) * 1000)
+
+    max_deviation = max(abs(e - a) for e, a in zip(expected, actual))
+    agreement = sum((e >= 0.5) == (a >= 0.5) for e, a in zip(expected, actual)) / len(expected)
+    return {
+        "model": "vectara",
+        "precision": precision,
+        "samples": len(VECTARA_CORPUS),
+        "max_abs_deviation": max_deviation,
+        "label_agreement": agreement,
+        "fp32_ms": reference_ms,
+        "candidate_ms": candidate_ms,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Check reduced-precision inference against fp32.")
+    parser.add_argument("--precision", choices=[p for p in PRECISIONS if p != 'fp32'], default="int8")
+    parser.add_argument("--model", choices=["gibberish", "vectara", "all"], default="all")
+    parser.add_argument("--max-deviation", type=float, default=0.05,
+                        help="Exit non-zero when any probability moves further than this")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    load_kwargs = {
+        "cache_dir": os.environ.get("MODEL_CACHE_DIR"),
+        "local_files_only": os.environ.get("MODEL_LOCAL_FILES_ONLY", "false").lower() == "true",
+    }
+    reports = []
+    if args.model in ("gibberish", "all"):
+        reports.append(compare_gibberish(args.precision, **load_kwargs))
+    if args.model in ("vectara", "all"):
+        reports.append(compare_vectara(args.precision, **load_kwargs))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            print(f"{report['model']:<10} {report['precision']:<5} max deviation {report['max_abs_deviation']:.5f}  "
+                  f"label agreement {report['label_agreement']:.1%}  "
+                  f"fp32 {report['fp32_ms']} ms -> {report['candidate_ms']} ms")
+
+    if any(report["max_abs_deviation"] > args.max_deviation for report in reports):
+        raise SystemExit(1)
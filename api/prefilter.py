@@ -0,0 +1,321 @@
+"""Cheap pre-filter that answers plainly clean or plainly noisy inputs without the transformer.
+
+Usage:
+    python prefilter.py train --corpus corpus.txt --output models/prefilter.json
+    python prefilter.py evaluate --model models/prefilter.json --corpus heldout.txt [--json]
+
+The scorer combines a character trigram language model and word/word-pair dictionary
+coverage, both learned from the texts of a local corpus (one text per line) that the
+gibberish transformer labels clean, with a few shape features (letter and vowel ratios,
+length). Two logistic regressions over those features, fitted with NumPy against the
+transformer's labels, give a "clean" and a "noise" confidence. ``train`` pads the corpus
+with synthetic keyboard noise so the noise side has examples.
+
+At serving time (``GIBBERISH_PREFILTER_PATH``) a text is answered by the pre-filter when
+one confidence reaches its threshold and sent to the transformer otherwise. ``evaluate``
+reports, per threshold, the fraction of texts the pre-filter would answer and how often
+its answer matches the transformer's.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import re
+import string
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services import GibberishService
+
+MODEL_VERSION = 1
+WORD_PATTERN = re.compile(r"[a-z']+")
+VOWELS = set("aeiouy")
+KEYBOARD_ROWS = ("qwertyuiop", "asdfghjkl", "zxcvbnm")
+FEATURES = (
+    "char_logprob", "word_coverage", "bigram_coverage", "letter_ratio", "vowel_ratio", "log_words"
+)
+DEFAULT_THRESHOLDS = (0.8, 0.9, 0.95, 0.98, 0.99)
+
+
+def words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def char_trigrams(text: str) -> List[str]:
+    padded = f"^^{' '.join(text.lower().split())}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class Prefilter:
+    """Scores texts with a trained model file and decides the confident ones.
+
+    ``decide`` returns ``(probabilities, label)`` shaped like ``GibberishService`` output,
+    or None when the text should go to the transformer. The decided label gets the
+    scorer's confidence and the remainder is split evenly over the other labels.
+    """
+
+    def __init__(self, model: Dict[str, Any], clean_threshold: float = 0.95, noise_threshold: float = 0.95):
+        if model.get("version") != MODEL_VERSION:
+            raise ValueError(f"Unsupported pre-filter model version {model.get('version')}")
+        self.clean_threshold = clean_threshold
+        self.noise_threshold = noise_threshold
+        self.labels: List[str] = model["labels"]
+        self.clean_label: str = model["clean_label"]
+        self.noise_label: str = model["noise_label"]
+        self.trigrams: Dict[str, float] = model["trigrams"]
+        self.contexts: Dict[str, float] = model["contexts"]
+        self.unseen_logprob: float = model["unseen_logprob"]
+        self.vocabulary = set(model["vocabulary"])
+        self.bigrams = set(model["bigrams"])
+        self.mean = np.array(model["feature_mean"])
+        self.std = np.array(model["feature_std"])
+        self.weights = np.array([model["weights"]["clean"], model["weights"]["noise"]])
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "Prefilter":
+        with open(path) as model_file:
+            return cls(json.load(model_file), **kwargs)
+
+    def features(self, text: str) -> List[float]:
+        trigrams = char_trigrams(text)
+        char_logprob = sum(
+            self.trigrams.get(trigram, self.contexts.get(trigram[:2], self.unseen_logprob))
+            for trigram in trigrams
+        ) / len(trigrams)
+        tokens = words(text)
+        word_coverage = sum(token in self.vocabulary for token in tokens) / len(tokens) if tokens else 0.0
+        pairs = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        bigram_coverage = sum(pair in self.bigrams for pair in pairs) / len(pairs) if pairs else 0.0
+        visible = [c for c in text if not c.isspace()]
+        letters = [c for c in text.lower() if c.isalpha()]
+        letter_ratio = len(letters) / len(visible) if visible else 0.0
+        vowel_ratio = sum(c in VOWELS for c in letters) / len(letters) if letters else 0.0
+        return [char_logprob, word_coverage, bigram_coverage, letter_ratio, vowel_ratio, math.log1p(len(tokens))]
+
+    def score(self, text: str) -> Tuple[float, float]:
+        """(clean confidence, noise confidence), each in [0, 1]."""
+        x = (np.array(self.features(text)) - self.mean) / self.std
+        logits = self.weights[:, :-1] @ x + self.weights[:, -1]
+        clean, noise = 1.0 / (1.0 + np.exp(-logits))
+        return float(clean), float(noise)
+
+    def decide(self, text: str) -> Optional[Tuple[Dict[str, float], str]]:
+        if not text.strip():
+            return None
+        clean, noise = self.score(text)
+        if clean >= self.clean_threshold and clean >= noise:
+            return self.probabilities(self.clean_label, clean), self.clean_label
+        if noise >= self.noise_threshold:
+            return self.probabilities(self.noise_label, noise), self.noise_label
+        return None
+
+    def probabilities(self, label: str, confidence: float) -> Dict[str, float]:
+        rest = (1.0 - confidence) / (len(self.labels) - 1)
+        return {
+            key: confidence if name == label else rest
+            for key, name in zip(GibberishService.PROB_KEYS, self.labels)
+        }
+
+
+def keyboard_noise(rng: random.Random) -> str:
+    """Synthetic noise: keyboard mashing, random letters or repeated fragments."""
+    kind = rng.random()
+    if kind < 0.4:
+        row = rng.choice(KEYBOARD_ROWS)
+        chunks = ["".join(rng.choice(row) for _ in range(rng.randint(3, 9))) for _ in range(rng.randint(1, 6))]
+    elif kind < 0.8:
+        alphabet = string.ascii_lowercase + string.digits + ";,./"
+        chunks = ["".join(rng.choice(alphabet) for _ in range(rng.randint(2, 10))) for _ in range(rng.randint(1, 6))]
+    else:
+        fragment = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 4)))
+        chunks = [fragment * rng.randint(2, 4) for _ in range(rng.randint(1, 4))]
+    return " ".join(chunks)
+
+
+def train_language_model(texts: Sequence[str], smoothing: float = 0.1) -> Dict[str, Any]:
+    """Add-k smoothed character trigram log-probabilities; unseen trigrams fall back per context."""
+    trigram_counts: Counter = Counter()
+    context_counts: Counter = Counter()
+    alphabet = set()
+    for text in texts:
+        for trigram in char_trigrams(text):
+            trigram_counts[trigram] += 1
+            context_counts[trigram[:2]] += 1
+            alphabet.add(trigram[2])
+    size = len(alphabet) + 1
+    return {
+        "trigrams": {
+            trigram: round(math.log((count + smoothing) / (context_counts[trigram[:2]] + smoothing * size)), 4)
+            for trigram, count in trigram_counts.items()
+        },
+        "contexts": {
+            context: round(math.log(smoothing / (count + smoothing * size)), 4)
+            for context, count in context_counts.items()
+        },
+        "unseen_logprob": round(math.log(1.0 / size), 4),
+    }
+
+
+def fit_logistic(x: np.ndarray, y: np.ndarray, iterations: int = 2000, learning_rate: float = 0.5,
+                 l2: float = 1e-3) -> np.ndarray:
+    """Class-balanced L2 logistic regression by batch gradient descent; returns weights with the bias last."""
+    x = np.hstack([x, np.ones((len(x), 1))])
+    positives = max(y.sum(), 1.0)
+    negatives = max(len(y) - y.sum(), 1.0)
+    sample_weights = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * negatives))
+    weights = np.zeros(x.shape[1])
+    for _ in range(iterations):
+        predictions = 1.0 / (1.0 + np.exp(-(x @ weights)))
+        gradient = x.T @ ((predictions - y) * sample_weights) / len(y) + l2 * np.r_[weights[:-1], 0.0]
+        weights -= learning_rate * gradient
+    return weights
+
+
+def teacher_labels(service, texts: List[str], batch_size: int = 32) -> List[str]:
+    return [label for _, label, _, _ in service.predict_bulk(texts, batch_size=batch_size)]
+
+
+def train(texts: List[str], labels: List[str], label_names: List[str], wordlist: Sequence[str] = (),
+          max_bigrams: int = 200000, teacher: str = None) -> Dict[str, Any]:
+    clean_label, noise_label = label_names[0], label_names[2]
+    clean_texts = [text for text, label in zip(texts, labels) if label == clean_label]
+    if not clean_texts:
+        raise ValueError("The transformer labelled no corpus text clean; nothing to learn clean text from")
+
+    word_counts = Counter(word for text in clean_texts for word in words(text))
+    bigram_counts = Counter(
+        f"{a} {b}" for text in clean_texts for a, b in zip(words(text), words(text)[1:])
+    )
+    model = {
+        "version": MODEL_VERSION,
+        "teacher": teacher,
+        "labels": label_names,
+        "clean_label": clean_label,
+        "noise_label": noise_label,
+        **train_language_model(clean_texts),
+        "vocabulary": sorted(set(word_counts) | {word.lower() for word in wordlist}),
+        "bigrams": [bigram for bigram, _ in bigram_counts.most_common(max_bigrams)],
+        "feature_mean": [0.0] * len(FEATURES),
+        "feature_std": [1.0] * len(FEATURES),
+        "weights": {"clean": [0.0] * (len(FEATURES) + 1), "noise": [0.0] * (len(FEATURES) + 1)},
+    }
+
+    scorer = Prefilter(model)
+    x = np.array([scorer.features(text) for text in texts])
+    mean, std = x.mean(axis=0), x.std(axis=0)
+    std[std == 0] = 1.0
+    x = (x - mean) / std
+    y = np.array(labels)
+    model["feature_mean"] = mean.round(6).tolist()
+    model["feature_std"] = std.round(6).tolist()
+    model["weights"] = {
+        "clean": fit_logistic(x, (y == clean_label).astype(float)).round(6).tolist(),
+        "noise": fit_logistic(x, (y == noise_label).astype(float)).round(6).tolist(),
+    }
+    model["trained_on"] = {"texts": len(texts), **Counter(labels)}
+    return model
+
+
+def evaluate(model: Dict[str, Any], texts: List[str], labels: List[str],
+             thresholds: Sequence[float] = DEFAULT_THRESHOLDS) -> Dict[str, Any]:
+    """Per threshold: fraction of texts answered by the pre-filter and agreement with the transformer."""
+    scorer = Prefilter(model)
+    start_time = time.perf_counter()
+    scores = [scorer.score(text) for text in texts]
+    scoring_us = (time.perf_counter() - start_time) * 1e6 / len(texts)
+
+    rows = []
+    for threshold in thresholds:
+        scorer.clean_threshold = scorer.noise_threshold = threshold
+        decided = agreed = 0
+        for text, label, (clean, noise) in zip(texts, labels, scores):
+            if not text.strip():
+                continue
+            if clean >= threshold and clean >= noise:
+                answer = scorer.clean_label
+            elif noise >= threshold:
+                answer = scorer.noise_label
+            else:
+                continue
+            decided += 1
+            agreed += answer == label
+        rows.append({
+            "threshold": threshold,
+            "skipped_fraction": decided / len(texts),
+            # Agreement over the texts the pre-filter answers; the rest get the transformer's label
+            "decided_agreement": agreed / decided if decided else None,
+            "overall_agreement": (agreed + len(texts) - decided) / len(texts),
+        })
+    return {"samples": len(texts), "labels": dict(Counter(labels)), "prefilter_us_per_text": scoring_us,
+            "thresholds": rows}
+
+
+def read_corpus(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as corpus:
+        return [line.strip() for line in corpus if line.strip()]
+
+
+def load_teacher(model_id: str = None) -> GibberishService:
+    return GibberishService(
+        model_id=model_id,
+        cache_dir=os.environ.get("MODEL_CACHE_DIR"),
+        local_files_only=os.environ.get("MODEL_LOCAL_FILES_ONLY", "false").lower() == "true",
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Train or evaluate the gibberish pre-filter.")
+    parser.add_argument("--model-id", default=os.environ.get("GIBBERISH_MODEL_ID"),
+                        help="Gibberish transformer used as the teacher (default: the published model)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="Fit a pre-filter to the transformer's labels")
+    train_parser.add_argument("--corpus", required=True, help="Text file, one input per line")
+    train_parser.add_argument("--output", required=True)
+    train_parser.add_argument("--wordlist", help="Extra dictionary words, one per line")
+    train_parser.add_argument("--synthetic-noise", type=float, default=0.25,
+                              help="Synthetic keyboard-noise texts added, as a fraction of the corpus")
+    train_parser.add_argument("--seed", type=int, default=0)
+
+    evaluate_parser = commands.add_parser("evaluate", help="Compare pre-filter decisions with the transformer")
+    evaluate_parser.add_argument("--model", required=True, help="File written by train")
+    evaluate_parser.add_argument("--corpus", required=True, help="Text file, one input per line")
+    evaluate_parser.add_argument("--thresholds", default=",".join(map(str, DEFAULT_THRESHOLDS)))
+    evaluate_parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+
+    teacher = load_teacher(args.model_id)
+    label_names = [teacher.config.id2label[i] for i in range(len(teacher.config.id2label))]
+
+    if args.command == "train":
+        rng = random.Random(args.seed)
+        texts = read_corpus(args.corpus)
+        texts += [keyboard_noise(rng) for _ in range(int(len(texts) * args.synthetic_noise))]
+        wordlist = read_corpus(args.wordlist) if args.wordlist else []
+        model = train(texts, teacher_labels(teacher, texts), label_names, wordlist, teacher=teacher.model_id)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(model, output)
+        print(f"Trained on {model['trained_on']}; wrote {args.output}")
+    else:
+        with open(args.model) as model_file:
+            model = json.load(model_file)
+        texts = read_corpus(args.corpus)
+        report = evaluate(model, texts, teacher_labels(teacher, texts),
+                          [float(t) for t in args.thresholds.split(",")])
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(f"{report['samples']} texts, transformer labels {report['labels']}, "
+                  f"pre-filter {report['prefilter_us_per_text']:.1f} us/text")
+            for row in report["thresholds"]:
+                decided = row["decided_agreement"]
+                print(f"threshold {row['threshold']:<5} skipped {row['skipped_fraction']:6.1%}  "
+                      f"agreement on skipped {'-' if decided is None else f'{decided:6.1%}'}  "
+                      f"overall agreement {row['overall_agreement']:6.1%}")
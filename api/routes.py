@@ -1,27 +1,537 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+import asyncio
+from typing import Annotated, List, Dict, Any, Iterator, Literal, Optional, Tuple
 import logging
 from models import ( 
     VectaraPredictionRequest, GibberishPredictionRequest,
-    VectaraResult, GibberishResult
+    VectaraBatchPredictionRequest, GibberishBatchPredictionRequest, VectaraPremiseRequest,
+    VectaraResult, GibberishResult, VectaraPremiseResult, VectaraResultRow, GibberishResultRow, ResultStats
 )
-from services import VectaraService, GibberishService
-from database import DatabaseManager
+from services import VectaraService, GibberishService, fork_safe
+from lifecycle import ModelManager
+from database import (
+    DatabaseManager, encode_cursor, decode_cursor, VECTARA_COLUMNS, GIBBERISH_COLUMNS
+)
+from batching import MicroBatcher
+from admission import AdmissionController, AdmissionRejected, check_deadline, deadline_after
+from executors import InstrumentedExecutor, configure_torch_threads
+from cache import PredictionCache, cache_key
+from writer import ResultWriter, WriteBufferFull
+from memory import process_memory
+from events import EventBroadcaster, NotifyListener, prediction_event
+from serialization import encode_rows, encoded_page
+from prefilter import Prefilter
+from metrics import STAGE_LATENCY, PROCESS_MEMORY, GIBBERISH_DECISIONS, observe_stages, render
+from prometheus_client import CONTENT_TYPE_LATEST
 import sys
 import os
+import csv
+import io
 import json
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
 
 sys.path.append(os.getcwd())
 router = APIRouter()
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "5"))
+BULK_BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", "32"))
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get("ADMISSION_MAX_CONCURRENCY", "32"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "256"))
+ADMISSION_DEFAULT_DEADLINE_MS = float(os.environ.get("ADMISSION_DEFAULT_DEADLINE_MS", "0"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.environ.get("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "5"))
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "1"))
+BULK_INFERENCE_WORKERS = int(os.environ.get("BULK_INFERENCE_WORKERS", "1"))
+INFERENCE_TORCH_THREADS = int(os.environ.get("INFERENCE_TORCH_THREADS", "0"))
+INFERENCE_TORCH_INTEROP_THREADS = int(os.environ.get("INFERENCE_TORCH_INTEROP_THREADS", "0"))
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", "3600"))
+PREDICTION_CACHE_DB_LOOKUP = os.environ.get("PREDICTION_CACHE_DB_LOOKUP", "false").lower() == "true"
+RESULTS_MAX_PAGE_SIZE = int(os.environ.get("RESULTS_MAX_PAGE_SIZE", "1000"))
+RESULTS_COMPRESSION_MIN_BYTES = int(os.environ.get("RESULTS_COMPRESSION_MIN_BYTES", "1024"))
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR")
+MODEL_LOCAL_FILES_ONLY = os.environ.get("MODEL_LOCAL_FILES_ONLY", "false").lower() == "true"
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "true").lower() == "true"
+VECTARA_LOAD_MODE = os.environ.get("VECTARA_LOAD_MODE", "eager")
+VECTARA_MODEL_ID = os.environ.get("VECTARA_MODEL_ID", VectaraService.MODEL_ID)
+VECTARA_TOKENIZER_ID = os.environ.get("VECTARA_TOKENIZER_ID", VectaraService.TOKENIZER_ID)
+VECTARA_MODEL_REVISION = os.environ.get("VECTARA_MODEL_REVISION", "main")
+VECTARA_PRECISION = os.environ.get("VECTARA_PRECISION", "fp32")
+GIBBERISH_LOAD_MODE = os.environ.get("GIBBERISH_LOAD_MODE", "eager")
+GIBBERISH_MODEL_ID = os.environ.get("GIBBERISH_MODEL_ID", GibberishService.MODEL_ID)
+GIBBERISH_MODEL_REVISION = os.environ.get("GIBBERISH_MODEL_REVISION", "main")
+GIBBERISH_PRECISION = os.environ.get("GIBBERISH_PRECISION", "fp32")
+GIBBERISH_COMPILE_MODE = os.environ.get("GIBBERISH_COMPILE_MODE", "none")
+GIBBERISH_BACKEND = os.environ.get("GIBBERISH_BACKEND", "torch")
+GIBBERISH_PREFILTER_PATH = os.environ.get("GIBBERISH_PREFILTER_PATH")
+GIBBERISH_PREFILTER_CLEAN_THRESHOLD = float(os.environ.get("GIBBERISH_PREFILTER_CLEAN_THRESHOLD", "0.95"))
+GIBBERISH_PREFILTER_NOISE_THRESHOLD = float(os.environ.get("GIBBERISH_PREFILTER_NOISE_THRESHOLD", "0.95"))
+GIBBERISH_ONNX_DIR = os.environ.get("GIBBERISH_ONNX_DIR")
+ONNX_NUM_THREADS = int(os.environ.get("ONNX_NUM_THREADS", "0"))
+VECTARA_MAX_TOKENS = int(os.environ.get("VECTARA_MAX_TOKENS", "0"))
+GIBBERISH_MAX_TOKENS = int(os.environ.get("GIBBERISH_MAX_TOKENS", "0"))
+LONG_INPUT_MODE = os.environ.get("LONG_INPUT_MODE", "truncate")
+CHUNK_STRIDE_TOKENS = int(os.environ.get("CHUNK_STRIDE_TOKENS", "64"))
+VECTARA_CHUNK_AGGREGATION = os.environ.get("VECTARA_CHUNK_AGGREGATION", "max")
+GIBBERISH_CHUNK_AGGREGATION = os.environ.get("GIBBERISH_CHUNK_AGGREGATION", "weighted")
+MAX_REQUEST_BYTES = int(os.environ.get("MAX_REQUEST_BYTES", str(8 * 1024 * 1024)))
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_MAX_CONCURRENCY = int(os.environ.get("EXPORT_MAX_CONCURRENCY", "2"))
+EXPORT_RETRY_AFTER_SECONDS = int(os.environ.get("EXPORT_RETRY_AFTER_SECONDS", "30"))
+WRITE_BEHIND_ENABLED = os.environ.get("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+WRITE_BEHIND_MAX_BUFFER = int(os.environ.get("WRITE_BEHIND_MAX_BUFFER", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL_MS = float(os.environ.get("WRITE_BEHIND_FLUSH_INTERVAL_MS", "200"))
+WRITE_BEHIND_ENQUEUE_TIMEOUT = float(os.environ.get("WRITE_BEHIND_ENQUEUE_TIMEOUT", "1"))
+WRITE_BEHIND_SPILL_DIR = os.environ.get("WRITE_BEHIND_SPILL_DIR", "write_behind_spill")
+WRITE_BEHIND_RETRY_AFTER_SECONDS = int(os.environ.get("WRITE_BEHIND_RETRY_AFTER_SECONDS", "1"))
+RESULTS_PARTITION_INTERVAL = os.environ.get("RESULTS_PARTITION_INTERVAL", "none")
+RESULTS_PARTITION_PREMAKE = int(os.environ.get("RESULTS_PARTITION_PREMAKE", "7"))
+RESULTS_RETENTION_DAYS = int(os.environ.get("RESULTS_RETENTION_DAYS", "0"))
+PARTITION_MAINTENANCE_INTERVAL_SECONDS = float(os.environ.get("PARTITION_MAINTENANCE_INTERVAL_SECONDS", "3600"))
+ROLLUP_FOLD_INTERVAL_SECONDS = float(os.environ.get("ROLLUP_FOLD_INTERVAL_SECONDS", "60"))
+MEMORY_METRICS_INTERVAL_SECONDS = float(os.environ.get("MEMORY_METRICS_INTERVAL_SECONDS", "15"))
+EVENTS_SOURCE = os.environ.get("EVENTS_SOURCE", "local")
+EVENTS_SUBSCRIBER_BUFFER = int(os.environ.get("EVENTS_SUBSCRIBER_BUFFER", "1000"))
+EVENTS_AGGREGATE_INTERVAL_MS = float(os.environ.get("EVENTS_AGGREGATE_INTERVAL_MS", "1000"))
+EVENTS_KEEPALIVE_SECONDS = float(os.environ.get("EVENTS_KEEPALIVE_SECONDS", "15"))
+EVENTS_PREVIEW_CHARS = int(os.environ.get("EVENTS_PREVIEW_CHARS", "200"))
+
+
+db = DatabaseManager(
+    DATABASE_URL,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    acquire_timeout=DB_POOL_TIMEOUT
+)
+
+configure_torch_threads(INFERENCE_TORCH_THREADS, INFERENCE_TORCH_INTEROP_THREADS)
+
+inference_executor = InstrumentedExecutor("inference", INFERENCE_WORKERS)
+# Bulk and premise requests run on their own threads, so a long bulk job admitted ahead of
+# interactive requests does not hold the micro-batches behind it in the inference queue
+bulk_executor = InstrumentedExecutor("bulk", BULK_INFERENCE_WORKERS)
+db_executor = InstrumentedExecutor("database", DB_POOL_MAX_SIZE)
+
+model_manager = ModelManager()
+model_manager.register(
+    "vectara",
+    lambda: VectaraService(
+        model_id=VECTARA_MODEL_ID, tokenizer_id=VECTARA_TOKENIZER_ID,
+        revision=VECTARA_MODEL_REVISION, cache_dir=MODEL_CACHE_DIR, local_files_only=MODEL_LOCAL_FILES_ONLY,
+        precision=VECTARA_PRECISION, max_tokens=VECTARA_MAX_TOKENS, long_input_mode=LONG_INPUT_MODE,
+        chunk_stride=CHUNK_STRIDE_TOKENS, chunk_aggregation=VECTARA_CHUNK_AGGREGATION
+    ),
+    load_mode=VECTARA_LOAD_MODE, warmup=MODEL_WARMUP,
+    fork_safe=fork_safe(precision=VECTARA_PRECISION)
+)
+model_manager.register(
+    "gibberish",
+    lambda: GibberishService(
+        model_id=GIBBERISH_MODEL_ID,
+        revision=GIBBERISH_MODEL_REVISION, cache_dir=MODEL_CACHE_DIR, local_files_only=MODEL_LOCAL_FILES_ONLY,
+        precision=GIBBERISH_PRECISION, compile_mode=GIBBERISH_COMPILE_MODE,
+        backend=GIBBERISH_BACKEND, onnx_dir=GIBBERISH_ONNX_DIR, onnx_num_threads=ONNX_NUM_THREADS,
+        max_tokens=GIBBERISH_MAX_TOKENS, long_input_mode=LONG_INPUT_MODE,
+        chunk_stride=CHUNK_STRIDE_TOKENS, chunk_aggregation=GIBBERISH_CHUNK_AGGREGATION
+    ),
+    load_mode=GIBBERISH_LOAD_MODE, warmup=MODEL_WARMUP,
+    fork_safe=fork_safe(GIBBERISH_BACKEND, GIBBERISH_PRECISION, GIBBERISH_COMPILE_MODE)
+)
+
+
+# Cheap first stage of the gibberish cascade; None sends every input to the transformer
+gibberish_prefilter = Prefilter.load(
+    GIBBERISH_PREFILTER_PATH,
+    clean_threshold=GIBBERISH_PREFILTER_CLEAN_THRESHOLD, noise_threshold=GIBBERISH_PREFILTER_NOISE_THRESHOLD
+) if GIBBERISH_PREFILTER_PATH else None
+
+
+def vectara_service() -> VectaraService:
+    return model_manager.get("vectara")
+
+
+def gibberish_service() -> GibberishService:
+    return model_manager.get("gibberish")
+
+
+def timed_batch(model: str, predict_batch):
+    """Batch function returning each row with its batch's stage timings, which are also observed."""
+    def run(items):
+        timings: Dict[str, float] = {}
+        predictions = predict_batch(items, timings)
+        observe_stages(model, timings)
+        return [(prediction, timings) for prediction in predictions]
+    return run
+
+
+def timed_insert(model: str, save_fn):
+    """Wrap a save function so each call is observed as the model's db_insert stage."""
+    def insert(*args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return save_fn(*args, **kwargs)
+        finally:
+            STAGE_LATENCY.labels(model, "db_insert").observe(time.perf_counter() - start_time)
+    return insert
+
+
+def published(model: str, save_fn, many: bool = False):
+    """Wrap a save function so every row it stores is pushed to live event subscribers.
+
+    Events are published only after the insert commits. With ``EVENTS_SOURCE=notify`` the
+    database triggers publish instead, and this returns ``save_fn`` unchanged.
+    """
+    if EVENTS_SOURCE == "notify":
+        return save_fn
+
+    def save(*args, **kwargs):
+        result = save_fn(*args, **kwargs)
+        if many:
+            rows, prediction_ids = args[0], result
+        else:
+            rows, prediction_ids = [kwargs], [result]
+        event_broadcaster.publish_threadsafe([
+            prediction_event(model, {"prediction_id": prediction_id, **row}, EVENTS_PREVIEW_CHARS)
+            for prediction_id, row in zip(prediction_ids, rows)
+        ])
+        return result
+    return save
+
+
+def observe_bulk_stages(model: str, computed: List[Tuple]):
+    # Rows of one tensor batch share a timings dict; observe each batch once
+    for timings in {id(row[-1]): row[-1] for row in computed}.values():
+        observe_stages(model, timings)
+
+
+def stage_timings(queue_time: float, timings: Dict[str, float]) -> Dict[str, float]:
+    """Per-row stage breakdown stored with the result, in milliseconds."""
+    return {"queue": round(queue_time, 3), **{stage: round(ms, 3) for stage, ms in timings.items()}}
+
+
+# Per-model admission control in front of inference; interactive requests go ahead of bulk ones
+vectara_admission = AdmissionController(
+    "vectara", max_concurrency=ADMISSION_MAX_CONCURRENCY, max_queue=ADMISSION_MAX_QUEUE,
+    retry_after=ADMISSION_RETRY_AFTER_SECONDS
+)
+gibberish_admission = AdmissionController(
+    "gibberish", max_concurrency=ADMISSION_MAX_CONCURRENCY, max_queue=ADMISSION_MAX_QUEUE,
+    retry_after=ADMISSION_RETRY_AFTER_SECONDS
+)
+
+PriorityHeader = Annotated[Optional[Literal["interactive", "bulk"]], Header(
+    description="Admission priority class; defaults to interactive for single predictions and bulk for batches"
+)]
+DeadlineHeader = Annotated[Optional[float], Header(
+    gt=0, description="Milliseconds the client will wait; the request is dropped with 503 once they have passed "
+                      "without reaching inference (default ADMISSION_DEFAULT_DEADLINE_MS)"
+)]
+
+ADMISSION_RESPONSES = {
+    status.HTTP_429_TOO_MANY_REQUESTS: {
+        "description": "The model's wait queue for this priority class is full; retry after Retry-After seconds",
+        "content": {"application/json": {"example": {"detail": "'vectara' bulk queue is full (256 waiting)"}}},
+    },
+    status.HTTP_503_SERVICE_UNAVAILABLE: {
+        "description": "The request deadline expired before inference; retry after Retry-After seconds",
+        "content": {"application/json": {"example": {"detail": "Request deadline expired before inference"}}},
+    },
+}
+
+
+def request_deadline(budget_ms: Optional[float]) -> Optional[float]:
+    return deadline_after(budget_ms or ADMISSION_DEFAULT_DEADLINE_MS)
+
+
+def within_deadline(deadline: Optional[float], fn, *args, **kwargs):
+    """Run ``fn`` unless ``deadline`` passed while it waited for an executor thread."""
+    check_deadline(deadline)
+    return fn(*args, **kwargs)
+
+
+def rejection(e: AdmissionRejected, model: str) -> HTTPException:
+    logging.warning(f"{model} request rejected ({e.reason}): {e}")
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+vectara_batcher = MicroBatcher(
+    "vectara", timed_batch("vectara", lambda pairs, timings: vectara_service().predict_batch(pairs, timings)),
+    max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS,
+    executor=inference_executor
+)
+gibberish_batcher = MicroBatcher(
+    "gibberish",
+    timed_batch("gibberish", lambda input_texts, timings: gibberish_service().predict_batch(input_texts, timings)),
+    max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS,
+    executor=inference_executor
+)
+
+event_broadcaster = EventBroadcaster(
+    subscriber_buffer=EVENTS_SUBSCRIBER_BUFFER, aggregate_interval_ms=EVENTS_AGGREGATE_INTERVAL_MS
+)
+notify_listener = NotifyListener(DATABASE_URL, event_broadcaster) if EVENTS_SOURCE == "notify" else None
+
+save_vectara_result = published("vectara", timed_insert("vectara", db.save_vectara_result))
+save_vectara_results = published("vectara", timed_insert("vectara", db.save_vectara_results), many=True)
+save_gibberish_result = published("gibberish", timed_insert("gibberish", db.save_gibberish_result))
+save_gibberish_results = published("gibberish", timed_insert("gibberish", db.save_gibberish_results), many=True)
+
+vectara_writer = ResultWriter(
+    "vectara", save_vectara_results,
+    max_buffer=WRITE_BEHIND_MAX_BUFFER, batch_size=WRITE_BEHIND_BATCH_SIZE,
+    flush_interval_ms=WRITE_BEHIND_FLUSH_INTERVAL_MS, enqueue_timeout=WRITE_BEHIND_ENQUEUE_TIMEOUT,
+    executor=db_executor, spill_dir=WRITE_BEHIND_SPILL_DIR
+) if WRITE_BEHIND_ENABLED else None
+gibberish_writer = ResultWriter(
+    "gibberish", save_gibberish_results,
+    max_buffer=WRITE_BEHIND_MAX_BUFFER, batch_size=WRITE_BEHIND_BATCH_SIZE,
+    flush_interval_ms=WRITE_BEHIND_FLUSH_INTERVAL_MS, enqueue_timeout=WRITE_BEHIND_ENQUEUE_TIMEOUT,
+    executor=db_executor, spill_dir=WRITE_BEHIND_SPILL_DIR
+) if WRITE_BEHIND_ENABLED else None
+
+vectara_cache = PredictionCache("vectara", PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_SECONDS)
+gibberish_cache = PredictionCache("gibberish", PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_SECONDS)
+
+
+# Everything besides the input that changes a model's output is part of its cache key
+VECTARA_VARIANT = (
+    f"{VECTARA_MODEL_REVISION}/{VECTARA_PRECISION}/"
+    f"{LONG_INPUT_MODE}:{VECTARA_MAX_TOKENS}:{CHUNK_STRIDE_TOKENS}:{VECTARA_CHUNK_AGGREGATION}"
+)
+GIBBERISH_VARIANT = (
+    f"{GIBBERISH_MODEL_REVISION}/{GIBBERISH_PRECISION}/{GIBBERISH_BACKEND}/"
+    f"{LONG_INPUT_MODE}:{GIBBERISH_MAX_TOKENS}:{CHUNK_STRIDE_TOKENS}:{GIBBERISH_CHUNK_AGGREGATION}"
+)
+
+# Stored with each result, so the results-table lookup only reuses rows computed the same way
+VECTARA_RESULT_VARIANT = f"{VECTARA_MODEL_ID}@{VECTARA_VARIANT}"
+GIBBERISH_RESULT_VARIANT = f"{GIBBERISH_MODEL_ID}@{GIBBERISH_VARIANT}"
+
+
+def vectara_cache_key(input_1: str, input_2: str) -> str:
+    return cache_key(VECTARA_MODEL_ID, VECTARA_VARIANT, input_1, input_2)
+
+
+def gibberish_cache_key(input_text: str) -> str:
+    return cache_key(GIBBERISH_MODEL_ID, GIBBERISH_VARIANT, input_text)
+
+
+async def score_vectara(
+    input_1: str, input_2: str, deadline: Optional[float] = None
+) -> Tuple[float, int, int, bool, Optional[Dict[str, float]]]:
+    """Cache-aware Vectara scoring.
 
+    Returns (score, queue_time_ms, compute_time_ms, cache_hit, stage_timings_ms); cache hits
+    have no stage timings.
+    """
+    key = vectara_cache_key(input_1, input_2)
+    score = vectara_cache.get(key)
+    if score is not None:
+        return score, 0, 0, True, None
+    if PREDICTION_CACHE_DB_LOOKUP:
+        row = await db_executor.run(db.find_vectara_result, input_1, input_2, VECTARA_RESULT_VARIANT)
+        if row is not None:
+            vectara_cache.put(key, row["output_score"])
+            return row["output_score"], 0, 0, True, None
 
-db = DatabaseManager(DATABASE_URL)
+    (score, timings), queue_time, compute_time = await vectara_batcher.submit((input_1, input_2), deadline)
+    vectara_cache.put(key, score)
+    return score, queue_time, compute_time, False, stage_timings(queue_time, timings)
 
-vectara_service = VectaraService()
-gibberish_service = GibberishService()
+
+def prefilter_gibberish(input_text: str) -> Tuple[Optional[Tuple[Dict[str, float], str]], float]:
+    """Run the cascade's first stage; returns (decision or None, elapsed ms)."""
+    start_time = time.perf_counter()
+    decision = gibberish_prefilter.decide(input_text)
+    elapsed = time.perf_counter() - start_time
+    STAGE_LATENCY.labels("gibberish", "prefilter").observe(elapsed)
+    return decision, elapsed * 1000
+
+
+async def score_gibberish(
+    input_text: str, deadline: Optional[float] = None
+) -> Tuple[Tuple[Dict[str, float], str], int, int, bool, Optional[Dict[str, float]], str]:
+    """Cache-aware gibberish classification through the pre-filter cascade.
+
+    Returns ((probabilities, label), queue_time_ms, compute_time_ms, cache_hit, stage_timings_ms,
+    decided_by). Stages run pre-filter, cache, transformer: texts the pre-filter is confident
+    about never reach the cache or the transformer; cache hits have no stage timings.
+    """
+    prefilter_timings: Dict[str, float] = {}
+    if gibberish_prefilter is not None:
+        decision, elapsed_ms = prefilter_gibberish(input_text)
+        if decision is not None:
+            GIBBERISH_DECISIONS.labels("prefilter").inc()
+            return decision, 0, int(elapsed_ms), False, {"prefilter": round(elapsed_ms, 3)}, "prefilter"
+        prefilter_timings["prefilter"] = round(elapsed_ms, 3)
+
+    key = gibberish_cache_key(input_text)
+    prediction = gibberish_cache.get(key)
+    if prediction is not None:
+        GIBBERISH_DECISIONS.labels("cache").inc()
+        return prediction, 0, 0, True, None, "transformer"
+    if PREDICTION_CACHE_DB_LOOKUP:
+        row = await db_executor.run(db.find_gibberish_result, input_text, GIBBERISH_RESULT_VARIANT)
+        if row is not None:
+            prediction = ({key_: row[key_] for key_ in GibberishService.PROB_KEYS}, row["predicted_label"])
+            GIBBERISH_DECISIONS.labels("cache").inc()
+            gibberish_cache.put(key, prediction)
+            return prediction, 0, 0, True, None, "transformer"
+
+    (prediction, timings), queue_time, compute_time = await gibberish_batcher.submit(input_text, deadline)
+    GIBBERISH_DECISIONS.labels("transformer").inc()
+    gibberish_cache.put(key, prediction)
+    return (
+        prediction, queue_time, compute_time, False,
+        {**prefilter_timings, **stage_timings(queue_time, timings)}, "transformer"
+    )
+
+
+def prefilter_gibberish_bulk(input_texts: List[str]) -> Tuple[List[Optional[Tuple[Dict[str, float], str]]], float]:
+    """Run the cascade's first stage over a batch; returns (decision or None per text, elapsed ms)."""
+    start_time = time.perf_counter()
+    decisions = [gibberish_prefilter.decide(input_text) for input_text in input_texts]
+    return decisions, (time.perf_counter() - start_time) * 1000
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def results_page(request: Request, columns: List[str], rows: List[Tuple], limit: int) -> Response:
+    """Serialize a results page directly from row tuples, bypassing response-model validation.
+
+    Adds the ``X-Next-Cursor`` of a full page, compresses by ``Accept-Encoding`` and answers
+    ``304`` when ``If-None-Match`` carries the page's ETag.
+    """
+    headers = {}
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(dict(zip(columns, rows[-1])))
+    status_code, body, headers = encoded_page(
+        encode_rows(columns, rows), headers, request.headers.get("accept-encoding"),
+        request.headers.get("if-none-match"), RESULTS_COMPRESSION_MIN_BYTES
+    )
+    if body is None:
+        return Response(status_code=status_code, headers=headers)
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+EXPORT_TABLES = {
+    "vectara": ("vectara_results", VECTARA_COLUMNS),
+    "gibberish": ("gibberish_results", GIBBERISH_COLUMNS),
+}
+
+
+# Each running export holds a pooled connection (and, for COPY, a helper thread) until it ends
+export_slots = threading.BoundedSemaphore(EXPORT_MAX_CONCURRENCY)
+
+
+class ExportResponse(StreamingResponse):
+    """Streams an export and, however the response ends, closes ``source`` and frees the slot.
+
+    ``source`` is the database generator behind the body; closing it returns its pooled
+    connection right away when the client disconnects mid-stream, instead of whenever the
+    abandoned generator is garbage collected.
+    """
+
+    def __init__(self, content: Iterator, source: Iterator, slot: threading.BoundedSemaphore, **kwargs):
+        super().__init__(content, **kwargs)
+        self.source = source
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                self.source.close()
+            finally:
+                self.slot.release()
+
+
+def ndjson_lines(columns: Tuple[str, ...], batches: Iterator[List[Tuple]]) -> Iterator[str]:
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+
+
+def csv_lines(columns: Tuple[str, ...], batches: Iterator[List[Tuple]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        # JSONB columns come back as dicts; write them as JSON rather than Python reprs
+        writer.writerows([json.dumps(v) if isinstance(v, dict) else v for v in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def persist_result(writer: ResultWriter, save_fn, result: Dict[str, Any]) -> str:
+    """Store one result, through the write-behind buffer when enabled.
+
+    ``result`` carries the ``timestamp`` the route returns to the client. In write-behind
+    mode the prediction_id is assigned here, so the id returned to the client is the one the
+    background flush eventually stores, and a row written late (after retries, or replayed
+    from a spill file) keeps its prediction time.
+    """
+    if writer is None:
+        return await db_executor.run(save_fn, **result)
+    prediction_id = str(uuid4())
+    await writer.enqueue({"prediction_id": prediction_id, **result, "timestamp": result["timestamp"].isoformat()})
+    return prediction_id
+
+async def maintain_partitions_periodically():
+    """Keep partitions created ahead of the clock and drop expired ones, until cancelled."""
+    while True:
+        try:
+            await db_executor.run(
+                db.maintain_partitions, RESULTS_PARTITION_INTERVAL,
+                RESULTS_PARTITION_PREMAKE, RESULTS_RETENTION_DAYS
+            )
+        except Exception as e:
+            logging.error(f"Partition maintenance failed: {e}")
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+
+async def fold_rollups_periodically():
+    """Fold the rollup deltas appended on insert into the hourly rollups, until cancelled."""
+    while True:
+        try:
+            await db_executor.run(db.fold_rollups)
+        except Exception as e:
+            logging.error(f"Rollup fold failed: {e}")
+        await asyncio.sleep(ROLLUP_FOLD_INTERVAL_SECONDS)
+
+def record_process_memory():
+    memory = process_memory()
+    for kind in ("rss", "pss", "shared", "private"):
+        if f"{kind}_bytes" in memory:
+            PROCESS_MEMORY.labels(kind).set(memory[f"{kind}_bytes"])
+
+async def record_process_memory_periodically():
+    """Refresh this worker's memory gauges, until cancelled.
+
+    Every worker runs this, so each has a current sample on /metrics whichever worker
+    serves the scrape.
+    """
+    while True:
+        try:
+            record_process_memory()
+        except Exception as e:
+            logging.error(f"Recording process memory failed: {e}")
+        await asyncio.sleep(MEMORY_METRICS_INTERVAL_SECONDS)
 
 @router.post(
     "/predict/vectara",
@@ -34,7 +544,8 @@ gibberish_service = GibberishService()
     It then saves the inputs and the resulting score to the database.
     """, 
     tags=["Predictions"], 
-    responses={ 
+    responses={
+        **ADMISSION_RESPONSES,
         status.HTTP_200_OK: {
             "description": "Successful prediction",
             "content": {
@@ -46,6 +557,8 @@ gibberish_service = GibberishService()
                         "output_score": 0.95,
                         "timestamp": "2024-01-01T12:00:00",
                         "processing_time_ms": 50,
+                        "queue_time_ms": 3,
+                        "compute_time_ms": 47,
                         "status": "success"
                     }
                 }
@@ -61,33 +574,50 @@ gibberish_service = GibberishService()
         },
     },
 )
-async def predict_vectara(request: VectaraPredictionRequest):
+async def predict_vectara(request: VectaraPredictionRequest, x_priority: PriorityHeader = None,
+                          x_request_deadline_ms: DeadlineHeader = None):
     try:
-        db.connect()
-        score, processing_time = vectara_service.predict(request.input_1, request.input_2)
-
-        prediction_id = db.save_vectara_result(
-            input_1=request.input_1,
-            input_2=request.input_2,
-            output_score=score,
-            processing_time_ms=processing_time,
-            status="success"
-        )
+        deadline = request_deadline(x_request_deadline_ms)
+        async with vectara_admission.admit(x_priority or "interactive", deadline):
+            score, queue_time, compute_time, cache_hit, timings = await score_vectara(
+                request.input_1, request.input_2, deadline
+            )
+        processing_time = queue_time + compute_time
+
+        timestamp = datetime.now(timezone.utc)
+        prediction_id = await persist_result(vectara_writer, save_vectara_result, {
+            "input_1": request.input_1,
+            "input_2": request.input_2,
+            "output_score": score,
+            "timestamp": timestamp,
+            "processing_time_ms": processing_time,
+            "status": "success",
+            "stage_timings_ms": timings,
+            "model_variant": VECTARA_RESULT_VARIANT
+        })
 
         return {
             "prediction_id": prediction_id,
             "input_1": request.input_1,
             "input_2": request.input_2,
             "output_score": score,
-            "timestamp": datetime.now(),
+            "timestamp": timestamp,
             "processing_time_ms": processing_time,
+            "queue_time_ms": queue_time,
+            "compute_time_ms": compute_time,
+            "cache_hit": cache_hit,
+            "stage_timings_ms": timings,
             "status": "success"
         }
+    except AdmissionRejected as e:
+        raise rejection(e, "Vectara")
+    except WriteBufferFull as e:
+        logging.warning(f"Vectara result not accepted: {e}")
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(WRITE_BEHIND_RETRY_AFTER_SECONDS)})
     except Exception as e:
         logging.error(f"Vectara prediction error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.disconnect()
 
 @router.post(
     "/predict/gibberish",
@@ -101,6 +631,7 @@ async def predict_vectara(request: VectaraPredictionRequest):
     """, 
     tags=["Predictions"], 
     responses={
+        **ADMISSION_RESPONSES,
         status.HTTP_200_OK: {
             "description": "Successful gibberish prediction",
             "content": {
@@ -113,6 +644,8 @@ async def predict_vectara(request: VectaraPredictionRequest):
                         "not_gibberish_probability": 0.9,
                         "timestamp": "2024-01-01T12:01:00",
                         "processing_time_ms": 30,
+                        "queue_time_ms": 4,
+                        "compute_time_ms": 26,
                         "status": "success"
                     }
                 }
@@ -128,44 +661,368 @@ async def predict_vectara(request: VectaraPredictionRequest):
         },
     },
 )
-async def predict_gibberish(request: GibberishPredictionRequest):
+async def predict_gibberish(request: GibberishPredictionRequest, x_priority: PriorityHeader = None,
+                            x_request_deadline_ms: DeadlineHeader = None):
     try:
-        db.connect()
-        probabilities, predicted_label, processing_time = gibberish_service.predict(
-            request.input_text
-        )
+        deadline = request_deadline(x_request_deadline_ms)
+        async with gibberish_admission.admit(x_priority or "interactive", deadline):
+            (
+                (probabilities, predicted_label), queue_time, compute_time, cache_hit, timings, decided_by
+            ) = await score_gibberish(request.input_text, deadline)
+        processing_time = queue_time + compute_time
 
-        prediction_id = db.save_gibberish_result(
-            input_text=request.input_text,
-            predicted_label=predicted_label,
-            probabilities=probabilities,
-            processing_time_ms=processing_time,
-            status="success"
-        )
+        timestamp = datetime.now(timezone.utc)
+        prediction_id = await persist_result(gibberish_writer, save_gibberish_result, {
+            "input_text": request.input_text,
+            "predicted_label": predicted_label,
+            "probabilities": probabilities,
+            "timestamp": timestamp,
+            "processing_time_ms": processing_time,
+            "status": "success",
+            "stage_timings_ms": timings,
+            "decided_by": decided_by,
+            "model_variant": GIBBERISH_RESULT_VARIANT
+        })
 
         return {
             "prediction_id": prediction_id,
             "input_text": request.input_text,
             "predicted_label": predicted_label,
             **probabilities,
-            "timestamp": datetime.now(),
+            "timestamp": timestamp,
             "processing_time_ms": processing_time,
+            "queue_time_ms": queue_time,
+            "compute_time_ms": compute_time,
+            "cache_hit": cache_hit,
+            "stage_timings_ms": timings,
+            "decided_by": decided_by,
             "status": "success"
         }
+    except AdmissionRejected as e:
+        raise rejection(e, "Gibberish")
+    except WriteBufferFull as e:
+        logging.warning(f"Gibberish result not accepted: {e}")
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(WRITE_BEHIND_RETRY_AFTER_SECONDS)})
     except Exception as e:
         logging.error(f"Gibberish prediction error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.disconnect()
+
+@router.post(
+    "/predict/vectara/batch",
+    response_model=List[VectaraResult],
+    summary="Predict Vectara Scores in Bulk",
+    description="""
+    Predicts Vectara scores for a list of premise/hypothesis pairs.
+
+    Inputs are sorted by length and scored in tensor batches to minimize padding, and all
+    results are persisted with a single multi-row insert. Results are returned in input order.
+    """,
+    tags=["Predictions"],
+    responses={
+        **ADMISSION_RESPONSES,
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {
+            "description": "Internal server error during bulk prediction",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Database connection error or Vectara service failure"}
+                }
+            },
+        },
+    },
+)
+async def predict_vectara_batch(request: VectaraBatchPredictionRequest, x_priority: PriorityHeader = None,
+                                x_request_deadline_ms: DeadlineHeader = None):
+    try:
+        deadline = request_deadline(x_request_deadline_ms)
+        pairs = [(item.input_1, item.input_2) for item in request.inputs]
+        keys = [vectara_cache_key(input_1, input_2) for input_1, input_2 in pairs]
+        predictions: List[Any] = [None] * len(pairs)
+        for index, key in enumerate(keys):
+            score = vectara_cache.get(key)
+            if score is not None:
+                predictions[index] = (score, 0, True, None)
+
+        misses = [index for index, prediction in enumerate(predictions) if prediction is None]
+        if misses:
+            async with vectara_admission.admit(x_priority or "bulk", deadline):
+                computed = await bulk_executor.run(
+                    within_deadline, deadline, lambda: vectara_service().predict_bulk(
+                        [pairs[index] for index in misses], batch_size=BULK_BATCH_SIZE
+                    )
+                )
+            observe_bulk_stages("vectara", computed)
+            for index, (score, processing_time, timings) in zip(misses, computed):
+                vectara_cache.put(keys[index], score)
+                predictions[index] = (score, processing_time, False, stage_timings(0, timings))
+
+        timestamp = datetime.now(timezone.utc)
+        results = [
+            {
+                "input_1": input_1,
+                "input_2": input_2,
+                "output_score": score,
+                "timestamp": timestamp,
+                "processing_time_ms": processing_time,
+                "status": "success",
+                "stage_timings_ms": timings,
+                "model_variant": VECTARA_RESULT_VARIANT
+            }
+            for (input_1, input_2), (score, processing_time, _, timings) in zip(pairs, predictions)
+        ]
+        prediction_ids = await db_executor.run(save_vectara_results, results)
+
+        return [
+            {"prediction_id": prediction_id, "cache_hit": cache_hit, **result}
+            for prediction_id, result, (_, _, cache_hit, _) in zip(prediction_ids, results, predictions)
+        ]
+    except AdmissionRejected as e:
+        raise rejection(e, "Vectara batch")
+    except Exception as e:
+        logging.error(f"Vectara batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post(
+    "/predict/vectara/premise",
+    response_model=VectaraPremiseResult,
+    summary="Score Many Hypotheses Against One Premise",
+    description="""
+    Scores every hypothesis (e.g. each sentence of a generated answer) against the same premise.
+
+    The premise is tokenized once and, when too long for the model, cut or split into
+    overlapping chunks as `LONG_INPUT_MODE` says; every (chunk, hypothesis) pair is scored in
+    batched forward passes and each hypothesis gets the `VECTARA_CHUNK_AGGREGATION` of its
+    chunk scores. Hypotheses already scored against this premise come from the prediction
+    cache; `premise_chunks` is 0 when all of them do. `aggregate_score`
+    combines the hypothesis scores with `aggregation`: `min` (the answer is as consistent as
+    its least supported sentence) or `mean`. Each hypothesis is stored as a Vectara result.
+    """,
+    tags=["Predictions"],
+    responses={
+        **ADMISSION_RESPONSES,
+        status.HTTP_200_OK: {
+            "description": "Per-hypothesis scores and their aggregate",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "premise_chunks": 1,
+                        "aggregation": "min",
+                        "aggregate_score": 0.12,
+                        "processing_time_ms": 85,
+                        "stage_timings_ms": {"tokenize": 1.2, "forward": 82.9, "postprocess": 0.1},
+                        "results": [
+                            {
+                                "prediction_id": "0f6c5a9e-3a51-4b4c-9a6f-2f1d1c1e8b7a",
+                                "input_1": "The capital of France is Paris.",
+                                "input_2": "Paris is in France.",
+                                "output_score": 0.97,
+                                "timestamp": "2024-01-01T12:00:00",
+                                "processing_time_ms": 85,
+                                "status": "success"
+                            },
+                            {
+                                "prediction_id": "5b0e3d8c-7c21-4f0e-8d3e-6a4b2c9f1e0d",
+                                "input_1": "The capital of France is Paris.",
+                                "input_2": "Paris has ten million bridges.",
+                                "output_score": 0.12,
+                                "timestamp": "2024-01-01T12:00:00",
+                                "processing_time_ms": 85,
+                                "status": "success"
+                            }
+                        ]
+                    }
+                }
+            },
+        },
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {
+            "description": "Internal server error during premise scoring",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Database connection error or Vectara service failure"}
+                }
+            },
+        },
+    },
+)
+async def predict_vectara_premise(request: VectaraPremiseRequest, x_priority: PriorityHeader = None,
+                                  x_request_deadline_ms: DeadlineHeader = None):
+    try:
+        deadline = request_deadline(x_request_deadline_ms)
+        keys = [vectara_cache_key(request.premise, hypothesis) for hypothesis in request.hypotheses]
+        scores: List[Any] = [vectara_cache.get(key) for key in keys]
+        misses = [index for index, score in enumerate(scores) if score is None]
+        premise_chunks = 0
+        timings: Dict[str, float] = {}
+        start_time = time.perf_counter()
+        if misses:
+            async with vectara_admission.admit(x_priority or "bulk", deadline):
+                computed, premise_chunks = await bulk_executor.run(
+                    within_deadline, deadline, lambda: vectara_service().predict_premise(
+                        request.premise, [request.hypotheses[index] for index in misses],
+                        batch_size=BULK_BATCH_SIZE, timings=timings
+                    )
+                )
+            for index, score in zip(misses, computed):
+                vectara_cache.put(keys[index], score)
+                scores[index] = score
+        processing_time = int((time.perf_counter() - start_time) * 1000)
+        observe_stages("vectara", timings)
+        timings = stage_timings(0, timings)
+
+        computed_indices = set(misses)
+        timestamp = datetime.now(timezone.utc)
+        results = [
+            {
+                "input_1": request.premise,
+                "input_2": hypothesis,
+                "output_score": score,
+                "timestamp": timestamp,
+                "processing_time_ms": processing_time if index in computed_indices else 0,
+                "status": "success",
+                "stage_timings_ms": timings if index in computed_indices else None,
+                "model_variant": VECTARA_RESULT_VARIANT
+            }
+            for index, (hypothesis, score) in enumerate(zip(request.hypotheses, scores))
+        ]
+        prediction_ids = await db_executor.run(save_vectara_results, results)
+
+        aggregate_score = min(scores) if request.aggregation == "min" else sum(scores) / len(scores)
+        return {
+            "premise_chunks": premise_chunks,
+            "aggregation": request.aggregation,
+            "aggregate_score": aggregate_score,
+            "processing_time_ms": processing_time,
+            "stage_timings_ms": timings,
+            "results": [
+                {"prediction_id": prediction_id, "cache_hit": index not in computed_indices, **result}
+                for index, (prediction_id, result) in enumerate(zip(prediction_ids, results))
+            ]
+        }
+    except AdmissionRejected as e:
+        raise rejection(e, "Vectara premise")
+    except Exception as e:
+        logging.error(f"Vectara premise prediction error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post(
+    "/predict/gibberish/batch",
+    response_model=List[GibberishResult],
+    summary="Predict Gibberish Text in Bulk",
+    description="""
+    Predicts gibberish labels for a list of input texts.
+
+    Inputs are sorted by length and classified in tensor batches to minimize padding, and all
+    results are persisted with a single multi-row insert. Results are returned in input order.
+    """,
+    tags=["Predictions"],
+    responses={
+        **ADMISSION_RESPONSES,
+        status.HTTP_500_INTERNAL_SERVER_ERROR: {
+            "description": "Internal server error during bulk gibberish prediction",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Error processing text with Gibberish service"}
+                }
+            },
+        },
+    },
+)
+async def predict_gibberish_batch(request: GibberishBatchPredictionRequest, x_priority: PriorityHeader = None,
+                                  x_request_deadline_ms: DeadlineHeader = None):
+    try:
+        deadline = request_deadline(x_request_deadline_ms)
+        keys = [gibberish_cache_key(input_text) for input_text in request.inputs]
+        predictions: List[Any] = [None] * len(request.inputs)
+        # Same stage order as score_gibberish: pre-filter, cache, transformer
+        prefilter_timings: Dict[str, float] = {}
+        if gibberish_prefilter is not None:
+            decisions, elapsed_ms = await bulk_executor.run(prefilter_gibberish_bulk, request.inputs)
+            # Rows decided here share one timings dict, as rows of a tensor batch do
+            prefilter_timings = {"prefilter": round(elapsed_ms, 3)}
+            observe_stages("gibberish", prefilter_timings)
+            for index, decision in enumerate(decisions):
+                if decision is not None:
+                    predictions[index] = (*decision, int(elapsed_ms), False, prefilter_timings, "prefilter")
+                    GIBBERISH_DECISIONS.labels("prefilter").inc()
+
+        for index, key in enumerate(keys):
+            if predictions[index] is None:
+                cached = gibberish_cache.get(key)
+                if cached is not None:
+                    predictions[index] = (*cached, 0, True, None, "transformer")
+                    GIBBERISH_DECISIONS.labels("cache").inc()
+
+        misses = [index for index, prediction in enumerate(predictions) if prediction is None]
+        if misses:
+            async with gibberish_admission.admit(x_priority or "bulk", deadline):
+                computed = await bulk_executor.run(
+                    within_deadline, deadline, lambda: gibberish_service().predict_bulk(
+                        [request.inputs[index] for index in misses], batch_size=BULK_BATCH_SIZE
+                    )
+                )
+            observe_bulk_stages("gibberish", computed)
+            for index, (probabilities, predicted_label, processing_time, timings) in zip(misses, computed):
+                gibberish_cache.put(keys[index], (probabilities, predicted_label))
+                predictions[index] = (
+                    probabilities, predicted_label, processing_time, False,
+                    {**prefilter_timings, **stage_timings(0, timings)}, "transformer"
+                )
+            GIBBERISH_DECISIONS.labels("transformer").inc(len(misses))
+
+        timestamp = datetime.now(timezone.utc)
+        results = [
+            {
+                "input_text": input_text,
+                "predicted_label": predicted_label,
+                "probabilities": probabilities,
+                "timestamp": timestamp,
+                "processing_time_ms": processing_time,
+                "status": "success",
+                "stage_timings_ms": timings,
+                "decided_by": decided_by,
+                "model_variant": GIBBERISH_RESULT_VARIANT
+            }
+            for input_text, (probabilities, predicted_label, processing_time, _, timings, decided_by)
+            in zip(request.inputs, predictions)
+        ]
+        prediction_ids = await db_executor.run(save_gibberish_results, results)
+
+        return [
+            {
+                "prediction_id": prediction_id,
+                "input_text": result["input_text"],
+                "predicted_label": result["predicted_label"],
+                **result["probabilities"],
+                "timestamp": timestamp,
+                "processing_time_ms": result["processing_time_ms"],
+                "cache_hit": cache_hit,
+                "stage_timings_ms": result["stage_timings_ms"],
+                "decided_by": result["decided_by"],
+                "status": "success"
+            }
+            for prediction_id, result, (_, _, _, cache_hit, _, _) in zip(prediction_ids, results, predictions)
+        ]
+    except AdmissionRejected as e:
+        raise rejection(e, "Gibberish batch")
+    except Exception as e:
+        logging.error(f"Gibberish batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get(
     "/results/vectara",
-    response_model=List[VectaraResult],
+    response_model=List[VectaraResultRow],
+    response_model_exclude_unset=True,
     summary="Get Vectara Prediction Results", 
     description="""
-    Retrieves a list of all Vectara prediction results from the database.
+    Retrieves a page of Vectara prediction results from the database, newest first.
+
+    Results can be filtered by time range, status and score range, and `fields` limits the
+    returned columns (e.g. `fields=output_score,processing_time_ms` skips the input texts).
+    When more rows are available the `X-Next-Cursor` response header carries the cursor
+    for the next page.
 
-    This endpoint fetches all stored Vectara prediction results, including inputs, scores, timestamps, and processing times.
+    Pages are gzip- or brotli-compressed when the client accepts it and carry an `ETag`;
+    sending it back in `If-None-Match` returns `304 Not Modified` while the page is unchanged.
     """, 
     tags=["Results"], 
     responses={
@@ -196,6 +1053,9 @@ async def predict_gibberish(request: GibberishPredictionRequest):
                 }
             },
         },
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "The page is unchanged since the ETag sent in If-None-Match",
+        },
         status.HTTP_500_INTERNAL_SERVER_ERROR: {
             "description": "Internal server error while fetching Vectara results",
             "content": {
@@ -206,24 +1066,46 @@ async def predict_gibberish(request: GibberishPredictionRequest):
         },
     },
 )
-async def get_vectara_results():
+async def get_vectara_results(
+    request: Request,
+    limit: int = Query(100, ge=1, le=RESULTS_MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    start: Optional[datetime] = Query(None, description="Only results at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only results before this time"),
+    status_filter: Optional[str] = Query(None, alias="status", description="Only results with this status"),
+    min_score: Optional[float] = Query(None, description="Minimum output_score"),
+    max_score: Optional[float] = Query(None, description="Maximum output_score"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+):
     try:
-        db.connect()
-        return db.get_vectara_results()
+        columns, rows = await db_executor.run(
+            db.get_vectara_results, limit=limit,
+            cursor=decode_cursor(cursor) if cursor else None,
+            start=start, end=end, status=status_filter,
+            min_score=min_score, max_score=max_score, fields=parse_fields(fields), raw=True
+        )
+        return results_page(request, columns, rows, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error fetching Vectara results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.disconnect()
 
 @router.get(
     "/results/gibberish",
-    response_model=List[GibberishResult],
+    response_model=List[GibberishResultRow],
+    response_model_exclude_unset=True,
     summary="Get Gibberish Prediction Results", 
     description="""
-    Retrieves a list of all Gibberish prediction results from the database.
+    Retrieves a page of Gibberish prediction results from the database, newest first.
 
-    This endpoint fetches all stored Gibberish prediction results, including inputs, predicted labels, probabilities, timestamps, and processing times.
+    Results can be filtered by time range, status, predicted label and `prob_clean` range, and
+    `fields` limits the returned columns (e.g. `fields=predicted_label,prob_clean` skips the input
+    text). When more rows are available the `X-Next-Cursor` response header carries the cursor
+    for the next page.
+
+    Pages are gzip- or brotli-compressed when the client accepts it and carry an `ETag`;
+    sending it back in `If-None-Match` returns `304 Not Modified` while the page is unchanged.
     """, 
     tags=["Results"], 
     responses={
@@ -256,6 +1138,9 @@ async def get_vectara_results():
                 }
             },
         },
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "The page is unchanged since the ETag sent in If-None-Match",
+        },
         status.HTTP_500_INTERNAL_SERVER_ERROR: {
             "description": "Internal server error while fetching Gibberish results",
             "content": {
@@ -266,12 +1151,270 @@ async def get_vectara_results():
         },
     },
 )
-async def get_gibberish_results():
+async def get_gibberish_results(
+    request: Request,
+    limit: int = Query(100, ge=1, le=RESULTS_MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    start: Optional[datetime] = Query(None, description="Only results at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only results before this time"),
+    status_filter: Optional[str] = Query(None, alias="status", description="Only results with this status"),
+    predicted_label: Optional[str] = Query(None, description="Only results with this predicted label"),
+    min_score: Optional[float] = Query(None, description="Minimum prob_clean"),
+    max_score: Optional[float] = Query(None, description="Maximum prob_clean"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+):
     try:
-        db.connect()
-        return db.get_gibberish_results()
+        columns, rows = await db_executor.run(
+            db.get_gibberish_results, limit=limit,
+            cursor=decode_cursor(cursor) if cursor else None,
+            start=start, end=end, status=status_filter, predicted_label=predicted_label,
+            min_score=min_score, max_score=max_score, fields=parse_fields(fields), raw=True
+        )
+        return results_page(request, columns, rows, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error fetching Gibberish results: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.disconnect()
\ No newline at end of file
+
+@router.get(
+    "/stats/vectara",
+    response_model=ResultStats,
+    summary="Get Vectara Result Statistics",
+    description="""
+    Aggregates Vectara results in the database: total count, mean/min/max and percentiles of
+    `output_score` and `processing_time_ms`, the consistent/hallucinated split at 0.5 and a
+    time-bucketed histogram.
+
+    `source=rollup` answers from the hourly rollup table and the deltas appended on insert, so the cost does
+    not grow with the number of stored results; percentiles are only available from `source=raw`.
+    """,
+    tags=["Results"],
+)
+async def get_vectara_stats(
+    start: Optional[datetime] = Query(None, description="Only results at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only results before this time"),
+    bucket: str = Query("hour", description="Histogram bucket: minute, hour or day"),
+    source: str = Query("raw", description="raw or rollup"),
+):
+    try:
+        return await db_executor.run(db.get_vectara_stats, start=start, end=end, bucket=bucket, source=source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Error computing Vectara stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get(
+    "/stats/gibberish",
+    response_model=ResultStats,
+    summary="Get Gibberish Result Statistics",
+    description="""
+    Aggregates Gibberish results in the database: total count, mean/min/max and percentiles of
+    `prob_clean` and `processing_time_ms`, the predicted label distribution and a time-bucketed
+    histogram.
+
+    `source=rollup` answers from the hourly rollup table and the deltas appended on insert, so the cost does
+    not grow with the number of stored results; percentiles are only available from `source=raw`.
+    """,
+    tags=["Results"],
+)
+async def get_gibberish_stats(
+    start: Optional[datetime] = Query(None, description="Only results at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only results before this time"),
+    bucket: str = Query("hour", description="Histogram bucket: minute, hour or day"),
+    source: str = Query("raw", description="raw or rollup"),
+):
+    try:
+        return await db_executor.run(db.get_gibberish_stats, start=start, end=end, bucket=bucket, source=source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Error computing Gibberish stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get(
+    "/export/{model}",
+    summary="Export Prediction Results",
+    description="""
+    Streams every stored result of `model` (`vectara` or `gibberish`), oldest first, optionally
+    limited to a `start`/`end` time range.
+
+    `format=ndjson` (default) and `format=csv` read through a server-side cursor in batches;
+    `format=copy` streams PostgreSQL `COPY ... TO STDOUT` CSV output directly. Memory use is
+    constant regardless of table size.
+
+    At most `EXPORT_MAX_CONCURRENCY` exports run at once; further requests get `429` with
+    `Retry-After`.
+    """,
+    tags=["Results"],
+)
+async def export_results(
+    model: str,
+    export_format: str = Query("ndjson", alias="format", description="ndjson, csv or copy"),
+    start: Optional[datetime] = Query(None, description="Only results at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only results before this time"),
+):
+    if model not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{model}'")
+    if export_format not in ("ndjson", "csv", "copy"):
+        raise HTTPException(status_code=400, detail="format must be one of: ndjson, csv, copy")
+    if not export_slots.acquire(blocking=False):
+        raise HTTPException(status_code=429, detail=f"At most {EXPORT_MAX_CONCURRENCY} exports may run at once",
+                            headers={"Retry-After": str(EXPORT_RETRY_AFTER_SECONDS)})
+    table, columns = EXPORT_TABLES[model]
+    filename = f"{table}.{'ndjson' if export_format == 'ndjson' else 'csv'}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if export_format == "copy":
+        source = db.iter_copy_csv(table, columns, start, end)
+        return ExportResponse(source, source, export_slots, media_type="text/csv", headers=headers)
+    source = db.iter_result_batches(table, columns, start, end, batch_size=EXPORT_BATCH_SIZE)
+    if export_format == "ndjson":
+        return ExportResponse(ndjson_lines(columns, source), source, export_slots,
+                              media_type="application/x-ndjson", headers=headers)
+    return ExportResponse(csv_lines(columns, source), source, export_slots, media_type="text/csv", headers=headers)
+
+@router.get(
+    "/events/stream",
+    summary="Live Prediction Results",
+    description="""
+    Server-Sent Events stream of results as they are stored, replacing polling of the results
+    endpoints. Each stored result arrives as an `event: prediction` message carrying the result
+    row (input texts cut to a preview); every `EVENTS_AGGREGATE_INTERVAL_MS` an
+    `event: aggregate` message per model reports the count, mean/min/max score, mean processing time
+    and label counts of the results since the previous one. `model` restricts the stream to
+    `vectara` or `gibberish`. A comment line is sent when the stream has been idle for
+    `EVENTS_KEEPALIVE_SECONDS` so proxies keep the connection open.
+    """,
+    tags=["Results"],
+)
+async def stream_events(
+    model: Optional[str] = Query(None, description="vectara or gibberish; both when omitted"),
+):
+    if model is not None and model not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{model}'")
+    event_broadcaster.start()
+
+    async def messages():
+        async with event_broadcaster.subscribe() as queue:
+            # Browsers reconnect after this many milliseconds if the connection drops
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    kind, event = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if model is None or event["model"] == model:
+                    yield f"event: {kind}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        messages(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get(
+    "/health/live",
+    summary="Liveness Probe",
+    description="""
+    Returns 200 as soon as the process is serving requests, without waiting for models to load.
+    """,
+    tags=["Health"],
+)
+async def health_live():
+    return {"status": "ok"}
+
+@router.get(
+    "/health/ready",
+    summary="Readiness Probe",
+    description="""
+    Returns 200 once every eagerly loaded model is loaded and warmed up (lazily loaded models
+    only need to not have failed), 503 otherwise. The body reports each model's load mode,
+    state, load time and warm-up time.
+    """,
+    tags=["Health"],
+)
+async def health_ready(response: Response):
+    ready = model_manager.ready()
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": "ready" if ready else "not_ready", "models": model_manager.status()}
+
+@router.get(
+    "/executors",
+    summary="Get Executor Saturation",
+    description="""
+    Reports queue depth and active workers for the inference, bulk and database executors,
+    the number of requests waiting in each micro-batcher and, in write-behind mode,
+    the backlog of each result writer, and the live event stream's subscribers and
+    dropped events, and each model's admission slots, queues and rejections.
+    """,
+    tags=["Monitoring"],
+)
+async def get_executor_stats():
+    return {
+        "executors": [inference_executor.stats(), bulk_executor.stats(), db_executor.stats()],
+        "batchers": {
+            vectara_batcher.name: vectara_batcher.pending(),
+            gibberish_batcher.name: gibberish_batcher.pending(),
+        },
+        "writers": {
+            writer.name: {
+                "pending": writer.pending(), "written": writer.written, "spilled": writer.spilled,
+                "rejected": writer.rejected, "dropped": writer.dropped,
+            }
+            for writer in (vectara_writer, gibberish_writer) if writer is not None
+        },
+        "events": event_broadcaster.stats(),
+        "admission": {
+            admission.name: admission.stats() for admission in (vectara_admission, gibberish_admission)
+        },
+    }
+
+@router.get(
+    "/memory",
+    summary="Get Worker Memory",
+    description="""
+    Reports the memory of the worker process that served the request: resident set size
+    split into pages shared with other processes (model weights preloaded before fork)
+    and private pages, plus the proportional set size. Each model's entry shows whether
+    it was preloaded in the master or loaded by this worker.
+    """,
+    tags=["Monitoring"],
+)
+async def get_memory_stats():
+    return {
+        "memory": process_memory(),
+        "models": {name: slot["preloaded"] for name, slot in model_manager.status().items()},
+    }
+
+@router.get(
+    "/metrics",
+    summary="Prometheus Metrics",
+    description="""
+    Prometheus text exposition: request latency histograms, request and error counters and
+    in-flight requests per endpoint; per-model histograms of the tokenize, forward,
+    postprocess and db_insert stages; queue depth of the micro-batchers, executors and
+    write-behind buffers; and the resident, shared and private memory of each worker,
+    labelled by pid. Under gunicorn the samples of all workers are merged.
+    """,
+    tags=["Monitoring"],
+)
+async def get_metrics():
+    # Queue depths are kept current by the batchers, executors and writers themselves, so the
+    # merged value is right for every worker, not just the one serving the scrape; the same
+    # goes for memory, which every worker records on a timer
+    return Response(render(), media_type=CONTENT_TYPE_LATEST)
+
+@router.get(
+    "/cache",
+    summary="Get Prediction Cache Statistics",
+    description="""
+    Reports size, hit, miss, eviction and expiration counters for the Vectara and Gibberish
+    prediction caches.
+    """,
+    tags=["Monitoring"],
+)
+async def get_cache_stats():
+    return [vectara_cache.stats(), gibberish_cache.stats()]
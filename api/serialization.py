@@ -0,0 +1,84 @@
+"""Fast JSON encoding, compression and ETags for result pages.
+
+Result rows come straight from a tuple cursor and are encoded by orjson without a pydantic
+round trip. Bodies are compressed with brotli (when the ``brotli`` package is installed) or
+gzip, whichever the client prefers, and tagged with a weak ETag of the uncompressed body so a
+client revalidating an unchanged page gets ``304 Not Modified``.
+"""
+import gzip
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fast settings: result pages are generated per request, not cached compressed
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def encode_rows(columns: Sequence[str], rows: List[Tuple]) -> bytes:
+    """JSON array of row objects; datetimes as ISO 8601 with ``Z`` for UTC, as pydantic writes them."""
+    return orjson.dumps([dict(zip(columns, row)) for row in rows], option=orjson.OPT_UTC_Z)
+
+
+def etag(body: bytes) -> str:
+    """Weak validator of the uncompressed body, so it stays the same whatever the content coding."""
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """Whether an ``If-None-Match`` header covers ``tag`` (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or tag.removeprefix("W/") in candidates
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    encodings = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, parameters = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        parameter = parameters.strip()
+        if parameter.startswith("q="):
+            try:
+                quality = float(parameter[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """``br`` or ``gzip`` by client preference (brotli on ties), or None for identity."""
+    encodings = accepted_encodings(accept_encoding)
+    wildcard = encodings.get("*", 0.0)
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    best = max(supported, key=lambda name: encodings.get(name, wildcard))
+    return best if encodings.get(best, wildcard) > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def encoded_page(body: bytes, headers: Dict[str, str], accept_encoding: Optional[str],
+                 if_none_match: Optional[str], min_compress_bytes: int) -> Tuple[int, Optional[bytes], Dict[str, Any]]:
+    """Status, body (None for 304) and headers of a JSON page for the given request headers."""
+    headers = {**headers, "ETag": etag(body), "Vary": "Accept-Encoding"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return 304, None, headers
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= min_compress_bytes else None
+    if encoding is not None:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return 200, body, headers
@@ -1,65 +1,552 @@
+import logging
+import os
 import time
-from typing import Dict, Tuple, Any
-from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple, Any
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer, pipeline
 import torch
 import torch.nn.functional as F
 
+def length_sorted_batches(items: List[Any], key, batch_size: int):
+    """Yield (indices, items) batches ordered by ``key`` so each batch pads to similar lengths."""
+    order = sorted(range(len(items)), key=lambda i: key(items[i]))
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        yield indices, [items[i] for i in indices]
+
+WARMUP_LENGTHS = (16, 128, 384)
+PRECISIONS = ('fp32', 'int8', 'bf16')
+COMPILE_MODES = ('none', 'torchscript', 'compile')
+BACKENDS = ('torch', 'onnx')
+ONNX_MODEL_FILENAME = 'model.onnx'
+LONG_INPUT_MODES = ('truncate', 'chunk')
+CHUNK_AGGREGATIONS = ('max', 'mean', 'weighted')
+DEFAULT_MAX_TOKENS = 512
+MIN_BUCKET_TOKENS = 16
+MIN_PREMISE_TOKENS = 32
+
+
+def max_input_tokens(tokenizer, config, requested: int = 0) -> int:
+    """Longest token sequence fed to the model: ``requested`` (or 512) bounded by what the model supports."""
+    limits = [requested or DEFAULT_MAX_TOKENS, tokenizer.model_max_length]
+    if getattr(config, 'max_position_embeddings', None):
+        limits.append(config.max_position_embeddings)
+    return min(limits)
+
+
+def length_buckets(lengths: List[int]) -> List[List[int]]:
+    """Group row indices by token length rounded up to a power of two.
+
+    Each bucket is padded and run on its own, so one long input in a batch no longer
+    pads every short input to its length.
+    """
+    buckets: Dict[int, List[int]] = {}
+    for index, length in enumerate(lengths):
+        buckets.setdefault(max(MIN_BUCKET_TOKENS, 1 << (length - 1).bit_length()), []).append(index)
+    return [buckets[bucket] for bucket in sorted(buckets)]
+
+
+def token_windows(ids: List[int], size: int, stride: int) -> List[List[int]]:
+    """Split token ids into windows of ``size`` tokens, consecutive windows overlapping by ``stride``.
+
+    The overlap is capped at half a window so short windows still advance.
+    """
+    step = size - min(stride, size // 2)
+    windows = []
+    for start in range(0, max(len(ids), 1), step):
+        windows.append(ids[start:start + size])
+        if start + size >= len(ids):
+            break
+    return windows
+
+
+def aggregate_chunks(values: List[float], weights: List[int], aggregation: str) -> float:
+    """Combine per-chunk scores with ``max``, ``mean`` or a token-length ``weighted`` mean."""
+    if aggregation == 'max':
+        return max(values)
+    if aggregation == 'weighted':
+        return sum(v * w for v, w in zip(values, weights)) / sum(weights)
+    return sum(values) / len(values)
+
+
+@contextmanager
+def timed(timings: Optional[Dict[str, float]], stage: str):
+    """Add the block's wall time in ms (monotonic clock) to ``timings[stage]`` when timings are collected."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start_time) * 1000
+
+
+def check_long_input_options(long_input_mode: str, chunk_aggregation: str, chunk_stride: int, max_tokens: int):
+    if long_input_mode not in LONG_INPUT_MODES:
+        raise ValueError(f"long_input_mode must be one of {', '.join(LONG_INPUT_MODES)}, got '{long_input_mode}'")
+    if chunk_aggregation not in CHUNK_AGGREGATIONS:
+        raise ValueError(f"chunk_aggregation must be one of {', '.join(CHUNK_AGGREGATIONS)}, got '{chunk_aggregation}'")
+    if not 0 <= chunk_stride <= max_tokens // 2:
+        raise ValueError(f"chunk_stride must be between 0 and {max_tokens // 2} for {max_tokens} max tokens")
+
+
+def apply_precision(model: torch.nn.Module, precision: str) -> torch.nn.Module:
+    """Convert a loaded fp32 model to the requested inference precision.
+
+    ``int8`` dynamically quantizes every ``nn.Linear`` (weights stored as int8, activations
+    quantized on the fly), ``bf16`` casts all weights to bfloat16.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {', '.join(PRECISIONS)}, got '{precision}'")
+    if precision == 'int8':
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if precision == 'bf16':
+        capability = torch.backends.cpu.get_cpu_capability()
+        if not capability.startswith('AVX512'):
+            logging.warning(f"CPU capability {capability} has no native bf16 support; bf16 inference will be emulated.")
+        return model.to(torch.bfloat16)
+    return model
+
+
+def fork_safe(backend: str = 'torch', precision: str = 'fp32', compile_mode: str = 'none') -> bool:
+    """Whether loading a model with these settings leaves the process safe to fork.
+
+    Loading fp32 weights only reads them into memory. Quantizing (int8) or casting (bf16)
+    them and TorchScript tracing run torch kernels, which start the intra-op thread pool a
+    forked child cannot use, and ONNX Runtime sessions own native thread pools. torch.compile
+    only wraps the model; compilation happens on its first call, in the worker.
+    """
+    return backend == 'torch' and precision == 'fp32' and compile_mode in ('none', 'compile')
+
+
+def warmup_text(tokenizer, num_tokens: int) -> str:
+    """Representative English-like filler that tokenizes to ``num_tokens`` tokens."""
+    words = "the quick brown fox jumps over the lazy dog while the model warms up".split()
+    text = " ".join(words[i % len(words)] for i in range(num_tokens))
+    input_ids = tokenizer(text, add_special_tokens=False)["input_ids"][:num_tokens]
+    return tokenizer.decode(input_ids)
+
 class VectaraService:
-    def __init__(self):
-        self.tokenizer = AutoTokenizer.from_pretrained('google/flan-t5-base')
+    MODEL_ID = 'vectara/hallucination_evaluation_model'
+    TOKENIZER_ID = 'google/flan-t5-base'
+    PROMPT = "<pad> Determine if the hypothesis is true given the premise?\n\nPremise: {text1}\n\nHypothesis: {text2}"
+
+    def __init__(self, revision: str = 'main', cache_dir: str = None, local_files_only: bool = False,
+                 precision: str = 'fp32', model_id: str = None, tokenizer_id: str = None,
+                 max_tokens: int = 0, long_input_mode: str = 'truncate', chunk_stride: int = 64,
+                 chunk_aggregation: str = 'max'):
+        self.model_id = model_id or self.MODEL_ID
+        self.revision = revision
+        self.precision = precision
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            tokenizer_id or self.TOKENIZER_ID, cache_dir=cache_dir, local_files_only=local_files_only
+        )
+        model = AutoModelForSequenceClassification.from_pretrained(
+            self.model_id, revision=revision, cache_dir=cache_dir,
+            local_files_only=local_files_only, trust_remote_code=True
+        )
         self.classifier = pipeline(
             "text-classification",
-            model='vectara/hallucination_evaluation_model',
+            model=apply_precision(model, precision),
             tokenizer=self.tokenizer,
             trust_remote_code=True
         )
+        self.max_tokens = max_input_tokens(self.tokenizer, model.config, max_tokens)
+        check_long_input_options(long_input_mode, chunk_aggregation, chunk_stride, self.max_tokens)
+        self.long_input_mode = long_input_mode
+        self.chunk_stride = chunk_stride
+        self.chunk_aggregation = chunk_aggregation
+        # Tokens taken by the prompt template itself, special tokens included
+        self.prompt_tokens = len(self.tokenizer(self.PROMPT.format(text1="", text2=""))["input_ids"])
+        # The template's pieces as token ids, so prompts can be assembled from already tokenized texts
+        prefix, rest = self.PROMPT.split("{text1}")
+        middle = rest.split("{text2}")[0]
+        self.prefix_ids = self.tokenizer(prefix.rstrip(" "), add_special_tokens=False)["input_ids"]
+        self.middle_ids = self.tokenizer(middle.rstrip(" "), add_special_tokens=False)["input_ids"]
+        probe = self.tokenizer("a", add_special_tokens=False)["input_ids"]
+        framed = self.tokenizer("a")["input_ids"]
+        start = next(i for i in range(len(framed)) if framed[i:i + len(probe)] == probe)
+        self.leading_ids, self.trailing_ids = framed[:start], framed[start + len(probe):]
+
+    def warmup(self, lengths: Tuple[int, ...] = WARMUP_LENGTHS):
+        """Run representative sequence lengths once so the first real request doesn't pay allocator warm-up."""
+        for length in lengths:
+            self.predict_batch([
+                (warmup_text(self.tokenizer, length), warmup_text(self.tokenizer, max(length // 8, 4)))
+            ])
 
     def predict(self, input_1: str, input_2: str) -> Tuple[float, int]:
-        start_time = time.time()
-        prompt = "<pad> Determine if the hypothesis is true given the premise?\n\nPremise: {text1}\n\nHypothesis: {text2}"
-        input_pairs = [prompt.format(text1=input_1, text2=input_2)]
-        
+        start_time = time.perf_counter()
+        consistent_score = self.predict_batch([(input_1, input_2)])[0]
+        processing_time = int((time.perf_counter() - start_time) * 1000)
+        return consistent_score, processing_time
+
+    def premise_id_windows(self, premise_ids: List[int], budget: int, long_input_mode: str) -> List[List[int]]:
+        """Premise token ids cut to ``budget`` (``truncate``) or split into overlapping windows of it (``chunk``)."""
+        if len(premise_ids) <= budget:
+            return [premise_ids]
+        if long_input_mode == 'chunk':
+            return token_windows(premise_ids, budget, self.chunk_stride)
+        return [premise_ids[:budget]]
+
+    def split_premise(self, input_1: str, premise_ids: List[int], budget: int,
+                      long_input_mode: str) -> List[Tuple[str, int]]:
+        """Premise text(s) of at most ``budget`` tokens each, with their token counts."""
+        if len(premise_ids) <= budget:
+            return [(input_1, len(premise_ids))]
+        return [
+            (self.tokenizer.decode(window), len(window))
+            for window in self.premise_id_windows(premise_ids, budget, long_input_mode)
+        ]
+
+    def premise_windows(self, input_1: str, input_2: str) -> List[Tuple[str, int]]:
+        """Premise text(s) to pair with the hypothesis so each prompt fits ``max_tokens``, with prompt lengths.
+
+        A premise that fits is used as is. Otherwise it is cut to the token budget left after
+        the template and hypothesis (``truncate``) or split into overlapping windows of that
+        budget (``chunk``).
+        """
+        fixed_tokens = self.prompt_tokens + len(self.tokenizer(input_2, add_special_tokens=False)["input_ids"])
+        premise_ids = self.tokenizer(input_1, add_special_tokens=False)["input_ids"]
+        budget = max(self.max_tokens - fixed_tokens, MIN_PREMISE_TOKENS)
+        return [
+            (window, fixed_tokens + length)
+            for window, length in self.split_premise(input_1, premise_ids, budget, self.long_input_mode)
+        ]
+
+    def score_prompts(self, prompts: List[str], lengths: List[int], timings: Optional[Dict[str, float]] = None,
+                      batch_size: int = 0) -> List[float]:
+        """'consistent' probability of each prompt, one padded forward pass per length bucket.
+
+        With ``batch_size``, large buckets are split into passes of at most that many prompts.
+        """
+        scores: List[Any] = [None] * len(prompts)
+        for bucket in length_buckets(lengths):
+            step = batch_size or len(bucket)
+            for start in range(0, len(bucket), step):
+                indices = bucket[start:start + step]
+                with timed(timings, "forward"), torch.inference_mode():
+                    # Truncation only bites when the hypothesis alone exceeds max_tokens
+                    full_scores = self.classifier(
+                        [prompts[i] for i in indices], top_k=None, batch_size=len(indices),
+                        truncation=True, max_length=self.max_tokens
+                    )
+                for index, score_for_both_labels in zip(indices, full_scores):
+                    scores[index] = self.consistent_score(score_for_both_labels)
+        return scores
+
+    @staticmethod
+    def consistent_score(score_for_both_labels: List[Dict[str, Any]]) -> float:
+        return next(
+            score_dict['score']
+            for score_dict in score_for_both_labels
+            if score_dict['label'] == 'consistent'
+        )
+
+    def prompt_ids(self, premise_ids: List[int], hypothesis_ids: List[int]) -> List[int]:
+        """Token ids of the prompt for a tokenized premise and hypothesis, cut to ``max_tokens``."""
+        content = self.prefix_ids + premise_ids + self.middle_ids + hypothesis_ids
+        content = content[:self.max_tokens - len(self.leading_ids) - len(self.trailing_ids)]
+        return self.leading_ids + content + self.trailing_ids
+
+    def score_ids(self, rows: List[List[int]], timings: Optional[Dict[str, float]] = None,
+                  batch_size: int = 0) -> List[float]:
+        """'consistent' probability of each prompt given as token ids, like ``score_prompts``
+        but without tokenizing again: rows are only padded per length bucket.
+        """
+        scores: List[Any] = [None] * len(rows)
+        for bucket in length_buckets([len(row) for row in rows]):
+            step = batch_size or len(bucket)
+            for start in range(0, len(bucket), step):
+                indices = bucket[start:start + step]
+                with timed(timings, "tokenize"):
+                    inputs = self.tokenizer.pad({"input_ids": [rows[i] for i in indices]}, return_tensors="pt")
+                with timed(timings, "forward"), torch.inference_mode():
+                    logits = self.classifier.forward(dict(inputs))["logits"]
+                for position, index in enumerate(indices):
+                    # The pipeline's own postprocessing, so scores match score_prompts
+                    scores[index] = self.consistent_score(self.classifier.postprocess(
+                        {"logits": logits[position:position + 1]}, top_k=None
+                    ))
+        return scores
+
+    def combine_chunks(self, count: int, owners: List[int], scores: List[float], lengths: List[int]) -> List[float]:
+        """Per-input scores from per-window scores with ``chunk_aggregation``."""
+        chunk_scores: List[List[float]] = [[] for _ in range(count)]
+        chunk_lengths: List[List[int]] = [[] for _ in range(count)]
+        for owner, score, length in zip(owners, scores, lengths):
+            chunk_scores[owner].append(score)
+            chunk_lengths[owner].append(length)
+        return [
+            aggregate_chunks(values, weights, self.chunk_aggregation)
+            for values, weights in zip(chunk_scores, chunk_lengths)
+        ]
+
+    def predict_batch(self, pairs: List[Tuple[str, str]], timings: Optional[Dict[str, float]] = None) -> List[float]:
+        """Score a list of (premise, hypothesis) pairs, one padded forward pass per length bucket.
+
+        Chunked premises are scored window by window and combined with ``chunk_aggregation``.
+        When ``timings`` is given, per-stage milliseconds are added to it; the pipeline
+        tokenizes the final prompts itself, so that part is counted under ``forward``.
+        """
         try:
-            full_scores = self.classifier(input_pairs, top_k=None)
-            consistent_score = next(
-                score_dict['score'] 
-                for score_for_both_labels in full_scores 
-                for score_dict in score_for_both_labels 
-                if score_dict['label'] == 'consistent'
-            )
-            processing_time = int((time.time() - start_time) * 1000)
-            return consistent_score, processing_time
+            with timed(timings, "tokenize"):
+                prompts, owners, lengths = [], [], []
+                for index, (input_1, input_2) in enumerate(pairs):
+                    for window, length in self.premise_windows(input_1, input_2):
+                        prompts.append(self.PROMPT.format(text1=window, text2=input_2))
+                        owners.append(index)
+                        lengths.append(length)
+
+            scores = self.score_prompts(prompts, lengths, timings)
+
+            with timed(timings, "postprocess"):
+                return self.combine_chunks(len(pairs), owners, scores, lengths)
         except Exception as e:
             raise RuntimeError(f"Prediction error: {e}")
 
-class GibberishService:
-    def __init__(self):
-        self.model = AutoModelForSequenceClassification.from_pretrained(
-            "madhurjindal/autonlp-Gibberish-Detector-492513457"
-        )
-        self.tokenizer = AutoTokenizer.from_pretrained(
-            "madhurjindal/autonlp-Gibberish-Detector-492513457"
+    def predict_premise(self, premise: str, hypotheses: List[str], batch_size: int = 32,
+                        timings: Optional[Dict[str, float]] = None) -> Tuple[List[float], int]:
+        """Score many hypotheses against one premise; returns (scores in input order, premise chunks).
+
+        The premise and each hypothesis are tokenized once. For each hypothesis the premise ids
+        are cut or windowed by ``long_input_mode`` to the budget that hypothesis leaves, as
+        ``predict_batch`` does, so a hypothesis scores the same whichever others come with it.
+        Every (window, hypothesis) prompt is assembled from those ids and the template's, so
+        no prompt text is built or tokenized again. Prompts are scored in length buckets of at
+        most ``batch_size`` and each hypothesis's window scores are combined with
+        ``chunk_aggregation``. Premise chunks is the most windows any hypothesis used.
+        """
+        try:
+            with timed(timings, "tokenize"):
+                premise_ids = self.tokenizer(premise, add_special_tokens=False)["input_ids"]
+                hypothesis_ids = self.tokenizer(hypotheses, add_special_tokens=False)["input_ids"]
+                # Hypotheses of the same length share a budget, hence a set of windows
+                windows_by_budget: Dict[int, List[List[int]]] = {}
+                rows, owners = [], []
+                for index, ids in enumerate(hypothesis_ids):
+                    budget = max(self.max_tokens - self.prompt_tokens - len(ids), MIN_PREMISE_TOKENS)
+                    if budget not in windows_by_budget:
+                        windows_by_budget[budget] = self.premise_id_windows(premise_ids, budget, self.long_input_mode)
+                    for window in windows_by_budget[budget]:
+                        rows.append(self.prompt_ids(window, ids))
+                        owners.append(index)
+
+            scores = self.score_ids(rows, timings, batch_size)
+
+            with timed(timings, "postprocess"):
+                lengths = [len(row) for row in rows]
+                premise_chunks = max(len(windows) for windows in windows_by_budget.values())
+                return self.combine_chunks(len(hypotheses), owners, scores, lengths), premise_chunks
+        except Exception as e:
+            raise RuntimeError(f"Prediction error: {e}")
+
+    def predict_bulk(self, pairs: List[Tuple[str, str]], batch_size: int = 32) -> List[Tuple[float, int, Dict[str, float]]]:
+        """Score many pairs in length-sorted batches.
+
+        Returns (score, batch processing_time_ms, batch stage timings) in input order.
+        """
+        results: List[Any] = [None] * len(pairs)
+        for indices, batch in length_sorted_batches(pairs, lambda pair: len(pair[0]) + len(pair[1]), batch_size):
+            timings: Dict[str, float] = {}
+            start_time = time.perf_counter()
+            scores = self.predict_batch(batch, timings)
+            processing_time = int((time.perf_counter() - start_time) * 1000)
+            for index, score in zip(indices, scores):
+                results[index] = (score, processing_time, timings)
+        return results
+
+class TorchGibberishBackend:
+    """PyTorch forward pass: eager, TorchScript-traced or torch.compile'd."""
+    tensor_type = "pt"
+
+    def __init__(self, model, tokenizer, compile_mode: str = 'none'):
+        if compile_mode not in COMPILE_MODES:
+            raise ValueError(f"compile_mode must be one of {', '.join(COMPILE_MODES)}, got '{compile_mode}'")
+        self.model = model
+        if compile_mode == 'torchscript':
+            example = tokenizer(["warm up", "a slightly longer warm up text"], return_tensors="pt", padding=True)
+            with torch.inference_mode():
+                self.forward_model = torch.jit.trace(
+                    model,
+                    example_kwarg_inputs={k: example[k] for k in ("input_ids", "attention_mask")},
+                    strict=False
+                )
+        elif compile_mode == 'compile':
+            self.forward_model = torch.compile(model, dynamic=True)
+        else:
+            self.forward_model = model
+
+    def logits(self, inputs) -> torch.Tensor:
+        with torch.inference_mode():
+            outputs = self.forward_model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"])
+            return outputs["logits"].float()
+
+    def probabilities(self, inputs) -> List[List[float]]:
+        # One device-to-host conversion per batch
+        return F.softmax(self.logits(inputs), dim=-1).tolist()
+
+class OnnxGibberishBackend:
+    """ONNX Runtime session over a graph produced by ``onnx_export.py export``."""
+    tensor_type = "np"
+
+    def __init__(self, onnx_dir: str, num_threads: int = 0):
+        try:
+            import numpy as np
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("The onnx backend requires the onnxruntime package")
+        self.np = np
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            os.path.join(onnx_dir, ONNX_MODEL_FILENAME), options, providers=["CPUExecutionProvider"]
         )
 
+    def logits(self, inputs):
+        return self.session.run(
+            ["logits"],
+            {"input_ids": inputs["input_ids"].astype("int64"), "attention_mask": inputs["attention_mask"].astype("int64")}
+        )[0]
+
+    def probabilities(self, inputs) -> List[List[float]]:
+        logits = self.logits(inputs)
+        exp = self.np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return (exp / exp.sum(axis=-1, keepdims=True)).tolist()
+
+class GibberishService:
+    MODEL_ID = "madhurjindal/autonlp-Gibberish-Detector-492513457"
+    PROB_KEYS = ('prob_clean', 'prob_mild_gibberish', 'prob_noise', 'prob_word_salad')
+
+    def __init__(self, revision: str = 'main', cache_dir: str = None, local_files_only: bool = False,
+                 precision: str = 'fp32', model_id: str = None, compile_mode: str = 'none',
+                 backend: str = 'torch', onnx_dir: str = None, onnx_num_threads: int = 0,
+                 max_tokens: int = 0, long_input_mode: str = 'truncate', chunk_stride: int = 64,
+                 chunk_aggregation: str = 'weighted'):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {', '.join(BACKENDS)}, got '{backend}'")
+        self.model_id = model_id or self.MODEL_ID
+        self.revision = revision
+        self.precision = precision
+        self.backend_name = backend
+
+        if backend == 'onnx':
+            if not onnx_dir:
+                raise ValueError("The onnx backend needs onnx_dir (see onnx_export.py)")
+            if precision != 'fp32':
+                raise ValueError("precision only applies to the torch backend; export a quantized graph instead")
+            # The export directory carries its own tokenizer and config, so nothing is fetched
+            self.model = None
+            self.config = AutoConfig.from_pretrained(onnx_dir)
+            self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+            self.backend = OnnxGibberishBackend(onnx_dir, num_threads=onnx_num_threads)
+        else:
+            self.model = AutoModelForSequenceClassification.from_pretrained(
+                self.model_id, revision=revision, cache_dir=cache_dir, local_files_only=local_files_only
+            )
+            self.model = apply_precision(self.model, precision)
+            self.config = self.model.config
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                self.model_id, revision=revision, cache_dir=cache_dir, local_files_only=local_files_only
+            )
+            self.backend = TorchGibberishBackend(self.model, self.tokenizer, compile_mode)
+
+        self.max_tokens = max_input_tokens(self.tokenizer, self.config, max_tokens)
+        check_long_input_options(long_input_mode, chunk_aggregation, chunk_stride, self.max_tokens)
+        if long_input_mode == 'chunk' and not self.tokenizer.is_fast:
+            raise ValueError("chunk mode needs a fast tokenizer (overflowing token windows)")
+        self.long_input_mode = long_input_mode
+        self.chunk_stride = chunk_stride
+        self.chunk_aggregation = chunk_aggregation
+
+    def warmup(self, lengths: Tuple[int, ...] = WARMUP_LENGTHS):
+        """Run representative sequence lengths once so the first real request doesn't pay allocator warm-up."""
+        for length in lengths:
+            self.predict_batch([warmup_text(self.tokenizer, min(length, self.max_tokens - 2))])
+
     def predict(self, input_text: str) -> Tuple[Dict[str, float], str, int]:
-        start_time = time.time()
+        start_time = time.perf_counter()
+        probabilities, predicted_label = self.predict_batch([input_text])[0]
+        processing_time = int((time.perf_counter() - start_time) * 1000)
+        return probabilities, predicted_label, processing_time
+
+    def encode(self, input_texts: List[str]) -> Tuple[List[List[int]], List[int]]:
+        """Token ids of at most ``max_tokens`` per row, and the index of the text each row came from.
+
+        ``truncate`` yields one row per text; ``chunk`` yields overlapping windows covering it.
+        """
+        if self.long_input_mode == 'chunk':
+            encoded = self.tokenizer(
+                input_texts, truncation=True, max_length=self.max_tokens,
+                stride=self.chunk_stride, return_overflowing_tokens=True
+            )
+            return encoded["input_ids"], list(encoded["overflow_to_sample_mapping"])
+        encoded = self.tokenizer(input_texts, truncation=True, max_length=self.max_tokens)
+        return encoded["input_ids"], list(range(len(input_texts)))
+
+    def aggregate(self, rows: List[List[float]], weights: List[int]) -> List[float]:
+        """Combine per-chunk probabilities; ``max`` keeps the chunk least likely to be clean."""
+        if len(rows) == 1:
+            return rows[0]
+        if self.chunk_aggregation == 'max':
+            return min(rows, key=lambda row: row[0])
+        return [
+            aggregate_chunks([row[label] for row in rows], weights, self.chunk_aggregation)
+            for label in range(len(rows[0]))
+        ]
+
+    def predict_batch(self, input_texts: List[str],
+                      timings: Optional[Dict[str, float]] = None) -> List[Tuple[Dict[str, float], str]]:
+        """Classify several texts, one padded forward pass per length bucket.
+
+        When ``timings`` is given, per-stage milliseconds are added to it.
+        """
         try:
-            inputs = self.tokenizer(input_text, return_tensors="pt")
-            outputs = self.model(**inputs)
-            probs = F.softmax(outputs.logits, dim=-1)
-            
-            predicted_index = torch.argmax(probs, dim=1).item()
-            labels = self.model.config.id2label
-            predicted_label = labels[predicted_index]
-            
-            probabilities = {
-            'prob_clean': probs[0][0].item(),  
-            'prob_mild_gibberish': probs[0][1].item(), 
-            'prob_noise': probs[0][2].item(), 
-            'prob_word_salad': probs[0][3].item()
-        }
-            
-            processing_time = int((time.time() - start_time) * 1000)
-            return probabilities, predicted_label, processing_time
+            with timed(timings, "tokenize"):
+                input_ids, owners = self.encode(input_texts)
+            rows: List[Any] = [None] * len(input_ids)
+            for bucket in length_buckets([len(ids) for ids in input_ids]):
+                with timed(timings, "tokenize"):
+                    inputs = self.tokenizer.pad(
+                        {"input_ids": [input_ids[i] for i in bucket]}, return_tensors=self.backend.tensor_type
+                    )
+                with timed(timings, "forward"):
+                    bucket_rows = self.backend.probabilities(inputs)
+                for index, row in zip(bucket, bucket_rows):
+                    rows[index] = row
+
+            with timed(timings, "postprocess"):
+                chunk_rows: List[List[List[float]]] = [[] for _ in input_texts]
+                chunk_lengths: List[List[int]] = [[] for _ in input_texts]
+                for owner, ids, row in zip(owners, input_ids, rows):
+                    chunk_rows[owner].append(row)
+                    chunk_lengths[owner].append(len(ids))
+                labels = self.config.id2label
+
+                predictions = []
+                for text_rows, weights in zip(chunk_rows, chunk_lengths):
+                    row = self.aggregate(text_rows, weights)
+                    predictions.append(
+                        (dict(zip(self.PROB_KEYS, row)), labels[max(range(len(row)), key=row.__getitem__)])
+                    )
+                return predictions
         except Exception as e:
             raise RuntimeError(f"Prediction error: {e}")
+
+    def predict_bulk(self, input_texts: List[str],
+                     batch_size: int = 32) -> List[Tuple[Dict[str, float], str, int, Dict[str, float]]]:
+        """Classify many texts in length-sorted batches; results come back in input order.
+
+        Each result carries its batch's processing_time_ms and stage timings.
+        """
+        results: List[Any] = [None] * len(input_texts)
+        for indices, batch in length_sorted_batches(input_texts, len, batch_size):
+            timings: Dict[str, float] = {}
+            start_time = time.perf_counter()
+            predictions = self.predict_batch(batch, timings)
+            processing_time = int((time.perf_counter() - start_time) * 1000)
+            for index, (probabilities, predicted_label) in zip(indices, predictions):
+                results[index] = (probabilities, predicted_label, processing_time, timings)
+        return results
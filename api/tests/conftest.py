@@ -0,0 +1,77 @@
+import os
+import sys
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import psycopg2
+import pytest
+
+# The service modules import each other as top-level modules, as they do when run from api/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def tiny_models(tmp_path_factory):
+    """Paths of tiny random-weight stand-ins for both served models, built once per run."""
+    from benchmark import build_tiny_models
+
+    return build_tiny_models(str(tmp_path_factory.mktemp("tiny-models")))
+
+
+def database_url_or_skip() -> str:
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    return url
+
+
+@pytest.fixture
+def pg_cursor():
+    """Cursor on ``TEST_DATABASE_URL`` in a transaction rolled back afterwards; skips without one."""
+    url = database_url_or_skip()
+    conn = psycopg2.connect(url)
+    try:
+        with conn.cursor() as cursor:
+            yield cursor
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+@pytest.fixture
+def scratch_schema():
+    """URL of ``TEST_DATABASE_URL`` with a fresh schema as its search_path, dropped afterwards.
+
+    For tests that need committed rows or several connections; a lock_timeout turns a test
+    that would wait on a lock forever into a failure.
+    """
+    url = database_url_or_skip()
+    schema = f"test_{uuid4().hex[:12]}"
+    admin = psycopg2.connect(url)
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA {schema}")
+    try:
+        yield f"{url}{'&' if '?' in url else '?'}options=-csearch_path%3D{schema}%20-clock_timeout%3D5s"
+    finally:
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+
+@pytest.fixture
+def results_db(scratch_schema):
+    """Connected ``DatabaseManager`` on a scratch schema initialised by ``db_init``."""
+    import db_init
+    from database import DatabaseManager
+
+    conn = psycopg2.connect(scratch_schema)
+    with conn, conn.cursor() as cursor:
+        db_init.init_schema(cursor, datetime.now(timezone.utc))
+    conn.close()
+    db = DatabaseManager(scratch_schema, max_size=4)
+    db.connect()
+    try:
+        yield db
+    finally:
+        db.disconnect()
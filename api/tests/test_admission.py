@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, DeadlineExceeded, QueueFull, deadline_after
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def hold(controller, priority, order, release, deadline=None):
+    async with controller.admit(priority, deadline):
+        order.append(priority)
+        await release.wait()
+
+
+def test_interactive_waiters_go_first():
+    async def main():
+        controller = AdmissionController("test", max_concurrency=1)
+        order = []
+        release = asyncio.Event()
+        first = asyncio.create_task(hold(controller, "bulk", order, release))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(hold(controller, priority, order, release))
+                   for priority in ("bulk", "interactive", "bulk", "interactive")]
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == {"interactive": 2, "bulk": 2}
+        release.set()
+        await asyncio.gather(first, *waiting)
+        return controller, order
+
+    controller, order = run(main())
+
+    assert order == ["bulk", "interactive", "interactive", "bulk", "bulk"]
+    assert controller.active == 0
+    assert controller.admitted == 5
+
+
+def test_full_queue_is_rejected():
+    async def main():
+        controller = AdmissionController("test", max_concurrency=1, max_queue=1, retry_after=7)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, "bulk", [], release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull) as rejected:
+            async with controller.admit("bulk"):
+                pass
+        # The other class has its own queue
+        interactive = asyncio.create_task(hold(controller, "interactive", [], release))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks, interactive)
+        return controller, rejected.value
+
+    controller, error = run(main())
+
+    assert error.status_code == 429
+    assert error.retry_after == 7
+    assert controller.rejected == {"queue_full": 1, "deadline": 0}
+    assert controller.active == 0
+
+
+def test_waiter_past_its_deadline_gives_up_its_place():
+    async def main():
+        controller = AdmissionController("test", max_concurrency=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, "interactive", [], release))
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded):
+            async with controller.admit("interactive", deadline_after(20)):
+                pass
+        assert controller.waiters == []
+        assert controller.stats()["queued"]["interactive"] == 0
+        release.set()
+        await holder
+        return controller
+
+    controller = run(main())
+
+    assert controller.rejected["deadline"] == 1
+    assert controller.active == 0
+
+
+def test_expired_deadline_is_rejected_before_waiting():
+    async def main():
+        controller = AdmissionController("test")
+        with pytest.raises(DeadlineExceeded):
+            async with controller.admit("bulk", time.perf_counter() - 1):
+                pass
+        return controller
+
+    controller = run(main())
+
+    assert controller.rejected["deadline"] == 1
+    assert controller.admitted == 0
+
+
+def test_deadline_inside_the_block_is_counted():
+    async def main():
+        controller = AdmissionController("test")
+        with pytest.raises(DeadlineExceeded):
+            async with controller.admit("interactive"):
+                raise DeadlineExceeded("expired in the batch queue")
+        return controller
+
+    controller = run(main())
+
+    assert controller.rejected["deadline"] == 1
+    assert controller.active == 0
+
+
+def test_cancelled_waiter_is_cleaned_up():
+    async def main():
+        controller = AdmissionController("test", max_concurrency=1)
+        release = asyncio.Event()
+        order = []
+        holder = asyncio.create_task(hold(controller, "interactive", order, release))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(hold(controller, "interactive", order, release))
+        later = asyncio.create_task(hold(controller, "bulk", order, release))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert len(controller.waiters) == 1
+        assert controller.stats()["queued"] == {"interactive": 0, "bulk": 1}
+        release.set()
+        await asyncio.gather(holder, later)
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return controller, order
+
+    controller, order = run(main())
+
+    # The slot went to the next waiter, not to the cancelled one
+    assert order == ["interactive", "bulk"]
+    assert controller.active == 0
+
+
+def test_unknown_priority_is_refused():
+    async def main():
+        async with AdmissionController("test").admit("urgent"):
+            pass
+
+    with pytest.raises(ValueError):
+        run(main())
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+from admission import DeadlineExceeded
+from batching import MicroBatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_fans_out_one_batch_call():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item.upper() for item in items]
+
+    async def main():
+        batcher = MicroBatcher("test", batch_fn, max_batch_size=8, max_wait_ms=20)
+        try:
+            results = await asyncio.gather(*(batcher.submit(item) for item in ["a", "b", "c"]))
+        finally:
+            await batcher.stop()
+        return results
+
+    results = run(main())
+
+    assert [result for result, _, _ in results] == ["A", "B", "C"]
+    assert calls == [["a", "b", "c"]]
+
+
+def test_splits_at_max_batch_size():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(len(items))
+        return list(items)
+
+    async def main():
+        batcher = MicroBatcher("test", batch_fn, max_batch_size=2, max_wait_ms=20)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        finally:
+            await batcher.stop()
+
+    results = run(main())
+
+    assert [result for result, _, _ in results] == list(range(5))
+    assert calls == [2, 2, 1]
+
+
+def test_failure_fails_only_the_bad_item():
+    def batch_fn(items):
+        if "bad" in items:
+            raise RuntimeError("boom")
+        return [item.upper() for item in items]
+
+    async def main():
+        batcher = MicroBatcher("test", batch_fn, max_batch_size=8, max_wait_ms=20)
+        try:
+            return await asyncio.gather(*(batcher.submit(item) for item in ["a", "bad", "c", "d"]),
+                                        return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    a, bad, c, d = run(main())
+
+    assert isinstance(bad, RuntimeError)
+    assert [a[0], c[0], d[0]] == ["A", "C", "D"]
+
+
+def test_expired_deadline_is_not_computed():
+    computed = []
+
+    def batch_fn(items):
+        computed.extend(items)
+        return list(items)
+
+    async def main():
+        batcher = MicroBatcher("test", batch_fn, max_batch_size=8, max_wait_ms=20)
+        try:
+            expired = batcher.submit("late", deadline=time.perf_counter() - 1)
+            live = batcher.submit("ok", deadline=time.perf_counter() + 10)
+            return await asyncio.gather(expired, live, return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    late, ok = run(main())
+
+    assert isinstance(late, DeadlineExceeded)
+    assert ok[0] == "ok"
+    assert computed == ["ok"]
+
+
+def test_missing_results_fail_instead_of_hanging():
+    async def main():
+        batcher = MicroBatcher("test", lambda items: list(items)[:1], max_batch_size=8, max_wait_ms=20)
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*(batcher.submit(item) for item in ["a", "b", "c"]), return_exceptions=True), 5
+            )
+        finally:
+            await batcher.stop()
+
+    a, b, c = run(main())
+
+    assert a[0] == "a"
+    assert isinstance(b, RuntimeError)
+    assert isinstance(c, RuntimeError)
@@ -0,0 +1,153 @@
+import threading
+
+import psycopg2
+import pytest
+from psycopg2.pool import PoolError
+
+from database import DatabaseManager
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if not self.conn.alive:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+
+class FakeConnection:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = 0
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def commit(self):
+        self.commits += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakePool:
+    """Hands out the ``idle`` connections first, then opens new live ones."""
+
+    def __init__(self, idle=()):
+        self.idle = list(idle)
+        self.opened = 0
+        self.closed = []
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop(0)
+        self.opened += 1
+        return FakeConnection()
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.closed = 1
+            self.closed.append(conn)
+        else:
+            self.idle.append(conn)
+
+
+def make_manager(pool, max_size=3, acquire_timeout=0.05):
+    db = DatabaseManager("postgresql://unused", max_size=max_size, acquire_timeout=acquire_timeout,
+                         health_check_interval=0)
+    db.pool = pool
+    db._slots = threading.BoundedSemaphore(max_size)
+    return db
+
+
+def test_replaces_every_dead_connection_after_a_restart():
+    dead = [FakeConnection(alive=False) for _ in range(3)]
+    pool = FakePool(dead)
+    db = make_manager(pool)
+
+    with db.connection() as conn:
+        assert conn.alive
+
+    assert pool.closed == dead
+    assert pool.opened == 1
+
+
+def test_gives_up_after_a_bounded_number_of_attempts():
+    class DeadPool(FakePool):
+        def getconn(self):
+            return FakeConnection(alive=False)
+
+    db = make_manager(DeadPool(), max_size=2)
+
+    with pytest.raises(psycopg2.OperationalError):
+        with db.connection():
+            pass
+    # The slot is released even though no connection was found
+    assert db._slots.acquire(blocking=False)
+
+
+def test_recently_used_connection_skips_the_health_check():
+    db = make_manager(FakePool())
+    db.health_check_interval = 60
+
+    with db.connection() as first:
+        pass
+    first.alive = False
+    with db.connection() as second:
+        pass
+
+    assert second is first
+
+
+def test_waits_for_a_slot_at_most_acquire_timeout():
+    db = make_manager(FakePool(), max_size=1)
+
+    with db.connection():
+        with pytest.raises(PoolError, match="Timed out"):
+            with db.connection():
+                pass
+
+    with db.connection():
+        pass
+
+
+def test_uninitialized_pool_is_an_error():
+    with pytest.raises(PoolError):
+        with DatabaseManager("postgresql://unused").connection():
+            pass
+
+
+def test_transaction_commits_or_rolls_back():
+    pool = FakePool()
+    db = make_manager(pool)
+    db.health_check_interval = 60
+
+    with db.transaction(cursor_factory=None) as cursor:
+        cursor.execute("SELECT 1")
+    [conn] = pool.idle
+    rollbacks = conn.rollbacks
+    with pytest.raises(RuntimeError):
+        with db.transaction(cursor_factory=None) as cursor:
+            cursor.execute("SELECT 1")
+            raise RuntimeError("boom")
+
+    assert pool.idle == [conn]
+    assert conn.commits == 1
+    assert conn.rollbacks == rollbacks + 1
+    assert conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
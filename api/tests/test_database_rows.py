@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pytest
+
+import database
+from database import DatabaseManager, text_hash
+
+PROBABILITIES = {"prob_clean": 0.7, "prob_mild_gibberish": 0.1, "prob_noise": 0.1, "prob_word_salad": 0.1}
+
+
+@pytest.fixture
+def inserts(monkeypatch):
+    """``DatabaseManager`` whose multi-row inserts are captured as (query, rows) instead of run."""
+    calls = []
+    db = DatabaseManager("postgresql://unused")
+
+    @contextmanager
+    def transaction(cursor_factory=None):
+        yield object()
+
+    monkeypatch.setattr(db, "transaction", transaction)
+    monkeypatch.setattr(database, "execute_values",
+                        lambda cursor, query, rows, page_size=100: calls.append((query, list(rows))))
+    return db, calls
+
+
+def test_vectara_rows(inserts):
+    db, calls = inserts
+    queued = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    prediction_ids = db.save_vectara_results([
+        {"prediction_id": "7d2b8c1e-0d1f-4d2a-9a55-0e8a3c3b1f10", "input_1": "p", "input_2": "h",
+         "output_score": 0.9, "processing_time_ms": 12, "status": "success", "timestamp": queued.isoformat(),
+         "stage_timings_ms": {"forward": 3.5}, "model_variant": "vectara@main/fp32"},
+        {"input_1": "p", "input_2": "other", "output_score": 0.1, "processing_time_ms": 4, "status": "success"},
+    ])
+
+    (texts_query, texts), (query, rows) = calls
+    assert "input_texts" in texts_query
+    # Each distinct text once, in key order
+    assert texts == sorted({text_hash(t): t for t in ("p", "h", "other")}.items())
+    assert "ON CONFLICT DO NOTHING" in query
+    assert prediction_ids[0] == "7d2b8c1e-0d1f-4d2a-9a55-0e8a3c3b1f10"
+    first, second = rows
+    assert first[:6] == (prediction_ids[0], text_hash("p"), text_hash("h"), 0.9, queued, 12)
+    assert first[6] == "success"
+    assert first[7].adapted == {"forward": 3.5}
+    assert second[0] == prediction_ids[1]
+    assert second[4].tzinfo is not None
+    assert first[8] == "vectara@main/fp32"
+    # No timings is SQL NULL, not JSON null
+    assert second[7] is None
+    assert second[8] is None
+
+
+def test_gibberish_rows(inserts):
+    db, calls = inserts
+
+    prediction_ids = db.save_gibberish_results([
+        {"input_text": "hello", "predicted_label": "clean", "probabilities": PROBABILITIES,
+         "processing_time_ms": 3, "status": "success", "decided_by": "prefilter"},
+        {"input_text": "hello", "predicted_label": "clean", "probabilities": PROBABILITIES,
+         "processing_time_ms": 5, "status": "success"},
+    ])
+
+    (_, texts), (_, rows) = calls
+    assert texts == [(text_hash("hello"), "hello")]
+    assert len(set(prediction_ids)) == 2
+    first, second = rows
+    assert first[:7] == (prediction_ids[0], text_hash("hello"), "clean", 0.7, 0.1, 0.1, 0.1)
+    assert first[8:] == (3, "success", None, "prefilter", None)
+    assert second[11] is None
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timezone
+
+from events import EventBroadcaster, prediction_event
+
+
+def vectara_event(score, processing_time_ms=10):
+    return {"model": "vectara", "output_score": score, "processing_time_ms": processing_time_ms}
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+def test_subscribers_receive_published_events():
+    async def main():
+        broadcaster = EventBroadcaster()
+        async with broadcaster.subscribe() as first, broadcaster.subscribe() as second:
+            broadcaster.publish(vectara_event(0.9))
+            return drain(first), drain(second), broadcaster
+
+    first, second, broadcaster = asyncio.run(main())
+
+    assert first == second == [("prediction", vectara_event(0.9))]
+    assert broadcaster.subscribers == set()
+    assert broadcaster.published == 1
+
+
+def test_slow_subscriber_drops_newest_events_without_blocking_others():
+    async def main():
+        broadcaster = EventBroadcaster(subscriber_buffer=2)
+        async with broadcaster.subscribe() as slow, broadcaster.subscribe() as fast:
+            received = []
+            for score in (0.1, 0.2, 0.3, 0.4):
+                broadcaster.publish(vectara_event(score))
+                received.extend(drain(fast))
+            return drain(slow), received, broadcaster
+
+    slow, fast, broadcaster = asyncio.run(main())
+
+    assert [event["output_score"] for _, event in slow] == [0.1, 0.2]
+    assert [event["output_score"] for _, event in fast] == [0.1, 0.2, 0.3, 0.4]
+    assert broadcaster.stats() == {"subscribers": 0, "published": 4, "dropped": 2}
+
+
+def test_publish_threadsafe_delivers_on_the_loop():
+    async def main():
+        broadcaster = EventBroadcaster(aggregate_interval_ms=60000)
+        broadcaster.start()
+        try:
+            async with broadcaster.subscribe() as queue:
+                thread = threading.Thread(target=broadcaster.publish_threadsafe,
+                                          args=([vectara_event(0.3), vectara_event(0.7)],))
+                thread.start()
+                thread.join()
+                received = [await asyncio.wait_for(queue.get(), 5) for _ in range(2)]
+        finally:
+            await broadcaster.stop()
+        return received
+
+    received = asyncio.run(main())
+
+    assert [event["output_score"] for _, event in received] == [0.3, 0.7]
+
+
+def test_publish_threadsafe_before_start_is_a_no_op():
+    broadcaster = EventBroadcaster()
+
+    broadcaster.publish_threadsafe([vectara_event(0.5)])
+
+    assert broadcaster.published == 0
+
+
+def test_aggregates_summarise_the_interval_per_model():
+    async def main():
+        broadcaster = EventBroadcaster(aggregate_interval_ms=20)
+        broadcaster.start()
+        try:
+            async with broadcaster.subscribe() as queue:
+                broadcaster.publish(vectara_event(0.2, 10))
+                broadcaster.publish(vectara_event(0.8, 30))
+                broadcaster.publish({"model": "gibberish", "prob_clean": 0.9, "predicted_label": "clean"})
+                while True:
+                    kind, event = await asyncio.wait_for(queue.get(), 5)
+                    if kind == "aggregate":
+                        return [event] + [event for kind, event in drain(queue) if kind == "aggregate"]
+        finally:
+            await broadcaster.stop()
+
+    aggregates = {event["model"]: event for event in asyncio.run(main())}
+
+    vectara = aggregates["vectara"]
+    assert vectara["count"] == 2
+    assert vectara["mean_score"] == 0.5
+    assert (vectara["min_score"], vectara["max_score"]) == (0.2, 0.8)
+    assert vectara["mean_processing_time_ms"] == 20
+    assert vectara["labels"] == {"hallucinated": 1, "consistent": 1}
+    assert aggregates["gibberish"]["labels"] == {"clean": 1}
+
+
+def test_prediction_event_cuts_texts_and_flattens_probabilities():
+    timestamp = datetime(2026, 1, 2, tzinfo=timezone.utc)
+    row = {"prediction_id": "id", "input_text": "x" * 50, "predicted_label": "clean", "timestamp": timestamp,
+           "probabilities": {"prob_clean": 0.9}, "stage_timings_ms": {"forward": 1.0}}
+
+    event = prediction_event("gibberish", row, preview_chars=10)
+
+    assert event["input_text"] == "x" * 10
+    assert event["prob_clean"] == 0.9
+    assert "probabilities" not in event and "stage_timings_ms" not in event
+    # The stored timestamp, serialisable as it is
+    assert json.loads(json.dumps(event))["timestamp"] == timestamp.isoformat()
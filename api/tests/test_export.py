@@ -0,0 +1,152 @@
+import asyncio
+import csv
+import io
+import json
+import threading
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+
+import routes
+from routes import ExportResponse, csv_lines, ndjson_lines
+
+COLUMNS = ("prediction_id", "output_score", "timestamp", "stage_timings_ms")
+BATCHES = [
+    [("a", 0.5, datetime(2026, 1, 1, tzinfo=timezone.utc), {"inference": 1.5})],
+    [("b", 0.25, datetime(2026, 1, 2, tzinfo=timezone.utc), None)],
+]
+
+
+class Source:
+    """Database generator stand-in that records whether it was closed."""
+
+    def __init__(self, batches=None):
+        self.closed = False
+        self.batches = batches
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.batches is None:
+            return [("x", 0.5, None, None)]
+        if not self.batches:
+            raise StopIteration
+        return self.batches.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def test_ndjson_lines_write_one_object_per_row():
+    lines = "".join(ndjson_lines(COLUMNS, iter(BATCHES))).splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {"prediction_id": "a", "output_score": 0.5, "timestamp": "2026-01-01 00:00:00+00:00",
+         "stage_timings_ms": {"inference": 1.5}},
+        {"prediction_id": "b", "output_score": 0.25, "timestamp": "2026-01-02 00:00:00+00:00",
+         "stage_timings_ms": None},
+    ]
+
+
+def test_csv_lines_write_a_header_and_json_columns():
+    chunks = list(csv_lines(COLUMNS, iter(BATCHES)))
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+
+    # One chunk per batch, the header going out with the first
+    assert len(chunks) == 2
+    assert rows == [
+        list(COLUMNS),
+        ["a", "0.5", "2026-01-01 00:00:00+00:00", '{"inference": 1.5}'],
+        ["b", "0.25", "2026-01-02 00:00:00+00:00", ""],
+    ]
+
+
+def stream(response, spec_version="2.0"):
+    """Run ``response`` against a client that goes away after the first body chunk."""
+    sent = []
+
+    async def main():
+        gone = asyncio.Event()
+
+        async def receive():
+            await gone.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and sent:
+                if spec_version == "2.4":
+                    raise OSError("connection reset")
+            sent.append(message)
+            if message["type"] == "http.response.body":
+                gone.set()
+
+        scope = {"type": "http", "asgi": {"spec_version": spec_version}}
+        await response(scope, receive, send)
+
+    asyncio.run(main())
+    return sent
+
+
+@pytest.mark.parametrize("spec_version", ["2.0", "2.4"])
+def test_disconnect_closes_the_source_and_frees_the_slot(spec_version):
+    source = Source()
+    slot = threading.BoundedSemaphore(1)
+    slot.acquire()
+    response = ExportResponse(ndjson_lines(COLUMNS, source), source, slot, media_type="application/x-ndjson")
+
+    if spec_version == "2.4":
+        with pytest.raises(ClientDisconnect):
+            stream(response, spec_version)
+    else:
+        stream(response, spec_version)
+
+    assert source.closed
+    assert slot.acquire(blocking=False)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.sources = []
+
+    def iter_result_batches(self, table, columns, start, end, batch_size):
+        source = Source([[("a",) + (None,) * (len(columns) - 1)]])
+        self.sources.append(source)
+        return source
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(routes, "db", FakeDatabase())
+    monkeypatch.setattr(routes, "export_slots", threading.BoundedSemaphore(1))
+    app = FastAPI()
+    app.include_router(routes.router)
+    return TestClient(app)
+
+
+def test_export_streams_and_releases_its_slot(client):
+    first = client.get("/export/vectara")
+    second = client.get("/export/gibberish", params={"format": "csv"})
+
+    assert first.status_code == second.status_code == 200
+    assert json.loads(first.text)["prediction_id"] == "a"
+    assert second.text.splitlines()[0].startswith("prediction_id,input_text")
+    assert all(source.closed for source in routes.db.sources)
+
+
+def test_export_over_the_limit_is_refused(client):
+    routes.export_slots.acquire()
+
+    response = client.get("/export/vectara")
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(routes.EXPORT_RETRY_AFTER_SECONDS)
+    assert routes.db.sources == []
+
+
+def test_bad_format_does_not_take_a_slot(client):
+    assert client.get("/export/vectara", params={"format": "xml"}).status_code == 400
+    assert routes.export_slots.acquire(blocking=False)
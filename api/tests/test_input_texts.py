@@ -0,0 +1,141 @@
+import threading
+from datetime import datetime, timezone
+
+import psycopg2
+import pytest
+
+import db_init
+from database import text_hash
+
+
+def stored_texts(db):
+    with db.transaction() as cursor:
+        cursor.execute("SELECT text FROM input_texts ORDER BY text")
+        return [row["text"] for row in cursor.fetchall()]
+
+
+def save_pair(db, input_1, input_2):
+    return db.save_vectara_result(input_1=input_1, input_2=input_2, output_score=0.5,
+                                  processing_time_ms=1, status="success")
+
+
+def test_each_text_is_stored_once(results_db):
+    save_pair(results_db, "premise", "first")
+    save_pair(results_db, "premise", "first")
+    results_db.save_vectara_results([
+        {"input_1": "premise", "input_2": "second", "output_score": 0.1, "processing_time_ms": 1,
+         "status": "success"},
+        {"input_1": "second", "input_2": "premise", "output_score": 0.2, "processing_time_ms": 1,
+         "status": "success"},
+    ])
+    results_db.save_gibberish_result(input_text="first", predicted_label="clean",
+                                     probabilities={"prob_clean": 1.0, "prob_mild_gibberish": 0.0,
+                                                    "prob_noise": 0.0, "prob_word_salad": 0.0},
+                                     processing_time_ms=1, status="success")
+
+    assert stored_texts(results_db) == ["first", "premise", "second"]
+    rows = results_db.get_vectara_results(limit=10)
+    assert len(rows) == 4
+    assert {(row["input_1"], row["input_2"]) for row in rows} == {
+        ("premise", "first"), ("premise", "second"), ("second", "premise")
+    }
+
+
+def test_prune_deletes_only_unreferenced_texts(results_db):
+    save_pair(results_db, "kept", "also kept")
+    with results_db.transaction() as cursor:
+        cursor.executemany("INSERT INTO input_texts (text_hash, text) VALUES (%s, %s)",
+                           [(text_hash(text), text) for text in ("orphan 1", "orphan 2", "orphan 3")])
+
+    # A batch size below the table size walks it in several transactions
+    assert results_db._prune_input_texts(batch_size=2) == 3
+    assert stored_texts(results_db) == ["also kept", "kept"]
+    assert results_db._prune_input_texts() == 0
+
+
+def test_prune_skips_a_text_a_writer_is_about_to_reference(results_db, scratch_schema):
+    with results_db.transaction() as cursor:
+        cursor.execute("INSERT INTO input_texts (text_hash, text) VALUES (%s, %s)", (text_hash("reused"), "reused"))
+    writer = psycopg2.connect(scratch_schema)
+    try:
+        with writer.cursor() as cursor:
+            # What save_* does before inserting its result row: the existing text is now locked
+            results_db._save_texts(cursor, ["reused", "new"])
+            pruned = []
+            prune = threading.Thread(target=lambda: pruned.append(results_db._prune_input_texts()))
+            prune.start()
+            prune.join(timeout=10)
+            assert not prune.is_alive()
+            # Neither text is touched: one is locked, the other not yet committed
+            assert pruned == [0]
+            cursor.execute("INSERT INTO vectara_results (prediction_id, input_1_hash, input_2_hash) "
+                           "VALUES (gen_random_uuid(), %s, %s)", (text_hash("reused"), text_hash("new")))
+        writer.commit()
+    finally:
+        writer.close()
+
+    assert results_db._prune_input_texts() == 0
+    assert stored_texts(results_db) == ["new", "reused"]
+
+
+def test_baseline_tables_are_migrated_to_hashed_texts(scratch_schema):
+    conn = psycopg2.connect(scratch_schema)
+    try:
+        with conn, conn.cursor() as cursor:
+            # The tables as the first version of db_init created them
+            cursor.execute("""
+                CREATE TABLE vectara_results (
+                    prediction_id VARCHAR(36) PRIMARY KEY, input_1 TEXT, input_2 TEXT, output_score FLOAT,
+                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT now(), processing_time_ms INTEGER,
+                    status VARCHAR(20)
+                );
+                CREATE TABLE gibberish_results (
+                    prediction_id VARCHAR(36) PRIMARY KEY, input_text TEXT, predicted_label VARCHAR(50),
+                    prob_clean FLOAT, prob_mild_gibberish FLOAT, prob_noise FLOAT, prob_word_salad FLOAT,
+                    timestamp TIMESTAMP WITH TIME ZONE DEFAULT now(), processing_time_ms INTEGER,
+                    status VARCHAR(20)
+                );
+                INSERT INTO vectara_results (prediction_id, input_1, input_2, output_score, timestamp)
+                VALUES ('8f0c6a4e-3b51-4f7e-9d1c-2a6b7c8d9e01', 'premise', 'hypothesis', 0.9, NULL),
+                       ('8f0c6a4e-3b51-4f7e-9d1c-2a6b7c8d9e02', 'premise', NULL, 0.1, now());
+                INSERT INTO gibberish_results (prediction_id, input_text, predicted_label)
+                VALUES ('8f0c6a4e-3b51-4f7e-9d1c-2a6b7c8d9e03', 'hypothesis', 'clean');
+            """)
+            db_init.init_schema(cursor, datetime.now(timezone.utc))
+
+        with conn, conn.cursor() as cursor:
+            for table in db_init.RESULTS_TABLES:
+                for column in db_init.TEXT_COLUMNS[table]:
+                    assert db_init.column_type(cursor, table, column) is None
+                    assert db_init.column_type(cursor, table, f"{column}_hash") == "bytea"
+                assert db_init.column_type(cursor, table, "prediction_id") == "uuid"
+            cursor.execute("SELECT text FROM input_texts ORDER BY text")
+            assert cursor.fetchall() == [("hypothesis",), ("premise",)]
+            cursor.execute("""
+                SELECT p.text, h.text, r.timestamp IS NOT NULL FROM vectara_results r
+                JOIN input_texts p ON p.text_hash = r.input_1_hash
+                LEFT JOIN input_texts h ON h.text_hash = r.input_2_hash
+                ORDER BY r.prediction_id
+            """)
+            assert cursor.fetchall() == [("premise", "hypothesis", True), ("premise", None, True)]
+            cursor.execute("SELECT input_text_hash FROM gibberish_results")
+            assert bytes(cursor.fetchone()[0]) == text_hash("hypothesis")
+
+            # Running it again finds nothing left to move
+            db_init.init_schema(cursor, datetime.now(timezone.utc))
+            cursor.execute("SELECT count(*) FROM input_texts")
+            assert cursor.fetchone()[0] == 2
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("table", list(db_init.TEXT_COLUMNS))
+def test_migrate_text_columns_skips_tables_already_migrated(results_db, scratch_schema, table):
+    conn = psycopg2.connect(scratch_schema)
+    try:
+        with conn, conn.cursor() as cursor:
+            db_init.migrate_text_columns(cursor, table)
+            cursor.execute("SELECT count(*) FROM input_texts")
+            assert cursor.fetchone()[0] == 0
+    finally:
+        conn.close()
@@ -0,0 +1,176 @@
+import asyncio
+import importlib.util
+import os
+
+import pytest
+
+import routes
+from lifecycle import EAGER, LAZY, ModelManager
+from services import fork_safe
+
+
+class StubModel:
+    def __init__(self):
+        self.warmups = 0
+
+    def warmup(self):
+        self.warmups += 1
+
+
+class StubLoader:
+    """Model factory counting its calls; fails while ``failing`` is set."""
+
+    def __init__(self, failing=False):
+        self.calls = 0
+        self.failing = failing
+
+    def __call__(self):
+        self.calls += 1
+        if self.failing:
+            raise RuntimeError("weights not found")
+        return StubModel()
+
+
+def make_manager(**slots):
+    manager = ModelManager()
+    loaders = {}
+    for name, options in slots.items():
+        loaders[name] = StubLoader(options.pop("failing", False))
+        manager.register(name, loaders[name], **options)
+    return manager, loaders
+
+
+def test_eager_models_load_at_startup_and_lazy_ones_on_first_use():
+    manager, loaders = make_manager(eager={"load_mode": EAGER}, lazy={"load_mode": LAZY})
+
+    asyncio.run(manager.load_eager())
+
+    assert loaders["eager"].calls == 1
+    assert loaders["lazy"].calls == 0
+    assert manager.status()["lazy"]["state"] == "not_loaded"
+    assert manager.ready()
+
+    model = manager.get("lazy")
+
+    assert model.warmups == 1
+    assert manager.get("lazy") is model
+    assert loaders["lazy"].calls == 1
+    assert manager.status()["lazy"]["state"] == "ready"
+
+
+def test_not_ready_until_eager_models_are_loaded():
+    manager, _ = make_manager(eager={"load_mode": EAGER})
+
+    assert not manager.ready()
+    manager.load_all()
+    assert manager.ready()
+
+
+def test_failed_models_are_reported():
+    manager, loaders = make_manager(eager={"load_mode": EAGER, "failing": True},
+                                    lazy={"load_mode": LAZY, "failing": True})
+
+    asyncio.run(manager.load_eager())
+
+    status = manager.status()
+    assert status["eager"]["state"] == "failed"
+    assert status["eager"]["error"] == "weights not found"
+    assert not manager.ready()
+
+    loaders["eager"].failing = False
+    manager.load_all()
+    assert manager.status()["eager"]["error"] is None
+    # A lazy model counts against readiness only once it has failed
+    assert manager.ready()
+    with pytest.raises(RuntimeError):
+        manager.get("lazy")
+    assert not manager.ready()
+
+
+def test_warmup_can_be_turned_off():
+    manager, _ = make_manager(eager={"load_mode": EAGER, "warmup": False})
+
+    manager.load_all()
+
+    assert manager.get("eager").warmups == 0
+    assert manager.status()["eager"]["state"] == "ready"
+
+
+def test_unknown_load_mode_is_refused():
+    with pytest.raises(ValueError):
+        ModelManager().register("model", StubLoader(), load_mode="sometimes")
+
+
+@pytest.mark.parametrize("backend, precision, compile_mode, expected", [
+    ("torch", "fp32", "none", True),
+    ("torch", "fp32", "compile", True),
+    ("torch", "int8", "none", False),
+    ("torch", "bf16", "none", False),
+    ("torch", "fp32", "trace", False),
+    ("onnx", "fp32", "none", False),
+])
+def test_fork_safe(backend, precision, compile_mode, expected):
+    assert fork_safe(backend, precision, compile_mode) is expected
+
+
+def test_preload_loads_fork_safe_eager_models_without_warmup():
+    manager, loaders = make_manager(
+        fp32={"load_mode": EAGER, "fork_safe": fork_safe(precision="fp32")},
+        int8={"load_mode": EAGER, "fork_safe": fork_safe(precision="int8")},
+        bf16={"load_mode": EAGER, "fork_safe": fork_safe(precision="bf16")},
+        lazy={"load_mode": LAZY},
+    )
+
+    manager.preload()
+
+    status = manager.status()
+    assert status["fp32"]["state"] == "loaded"
+    assert status["fp32"]["preloaded"]
+    assert manager.slots["fp32"].instance.warmups == 0
+    for name in ("int8", "bf16", "lazy"):
+        assert status[name]["state"] == "not_loaded"
+        assert not status[name]["preloaded"]
+    assert not manager.ready()
+
+    # In the worker: the preloaded model is warmed up, not loaded again
+    asyncio.run(manager.load_eager())
+
+    assert loaders["fp32"].calls == 1
+    assert manager.slots["fp32"].instance.warmups == 1
+    assert loaders["int8"].calls == loaders["bf16"].calls == 1
+    assert manager.ready()
+
+
+class FakeServer:
+    num_workers = 2
+
+    class log:
+        messages = []
+
+        @classmethod
+        def info(cls, message):
+            cls.messages.append(message)
+
+
+def test_gunicorn_preloads_before_forking(monkeypatch, tmp_path):
+    # The config sets these when missing; set them here so they are restored afterwards
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setenv("INFERENCE_TORCH_THREADS", "1")
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", path)
+    config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(config)
+    manager, loaders = make_manager(
+        vectara={"load_mode": EAGER, "fork_safe": fork_safe(precision="int8")},
+        gibberish={"load_mode": EAGER, "fork_safe": fork_safe(precision="fp32")},
+    )
+    monkeypatch.setattr(routes, "model_manager", manager)
+    monkeypatch.setattr(config.gc, "freeze", lambda: None)
+
+    config.when_ready(FakeServer())
+
+    assert config.preload_app
+    assert loaders["vectara"].calls == 0
+    assert loaders["gibberish"].calls == 1
+    assert manager.status()["gibberish"]["preloaded"]
+    assert "forking 2 workers" in FakeServer.log.messages[-1]
@@ -0,0 +1,44 @@
+import pytest
+
+from services import aggregate_chunks, length_buckets, token_windows
+
+
+def test_short_input_is_one_window():
+    assert token_windows([1, 2, 3], size=8, stride=2) == [[1, 2, 3]]
+
+
+def test_empty_input_is_one_empty_window():
+    assert token_windows([], size=8, stride=2) == [[]]
+
+
+def test_windows_overlap_by_stride_and_cover_every_token():
+    ids = list(range(10))
+
+    windows = token_windows(ids, size=4, stride=1)
+
+    assert windows == [[0, 1, 2, 3], [3, 4, 5, 6], [6, 7, 8, 9]]
+    assert all(len(window) <= 4 for window in windows)
+
+
+def test_stride_is_capped_at_half_a_window():
+    windows = token_windows(list(range(8)), size=4, stride=10)
+
+    assert windows == [[0, 1, 2, 3], [2, 3, 4, 5], [4, 5, 6, 7]]
+
+
+def test_length_buckets_round_up_to_powers_of_two():
+    lengths = [3, 40, 17, 64, 65, 16]
+
+    buckets = length_buckets(lengths)
+
+    assert buckets == [[0, 5], [2], [1, 3], [4]]
+    assert sorted(index for bucket in buckets for index in bucket) == list(range(len(lengths)))
+
+
+@pytest.mark.parametrize("aggregation, expected", [
+    ("max", 0.9),
+    ("mean", 0.5),
+    ("weighted", (0.1 * 3 + 0.9 * 1) / 4),
+])
+def test_aggregate_chunks(aggregation, expected):
+    assert aggregate_chunks([0.1, 0.9], [3, 1], aggregation) == pytest.approx(expected)
@@ -0,0 +1,53 @@
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import main
+from metrics import observe_stages
+
+
+def requests_counted(method, endpoint, status):
+    value = REGISTRY.get_sample_value("api_requests_total", {"method": method, "endpoint": endpoint, "status": status})
+    return value or 0.0
+
+
+def test_requests_are_labelled_by_route_template():
+    client = TestClient(main.app)
+    before = requests_counted("GET", "/export/{model}", "404")
+
+    for model in ("first", "second", "third"):
+        assert client.get(f"/api/export/{model}").status_code == 404
+
+    # The template of the matched route, without the /api prefix the router is mounted under
+    assert requests_counted("GET", "/export/{model}", "404") == before + 3
+    assert requests_counted("GET", "/api/export/first", "404") == 0
+
+
+def test_unmatched_paths_share_one_label():
+    client = TestClient(main.app)
+    before = requests_counted("GET", "unmatched", "404")
+
+    client.get("/api/no-such-endpoint/1")
+    client.get("/api/no-such-endpoint/2")
+
+    assert requests_counted("GET", "unmatched", "404") == before + 2
+
+
+def test_rejected_bodies_are_counted():
+    client = TestClient(main.app)
+    before = requests_counted("POST", "unmatched", "413")
+
+    response = client.post("/api/predict/gibberish", content=b"x" * (main.MAX_REQUEST_BYTES + 1))
+
+    assert response.status_code == 413
+    # Refused before routing, so there is no route template to label it with
+    assert requests_counted("POST", "unmatched", "413") == before + 1
+
+
+def test_stage_timings_are_observed_in_seconds():
+    labels = {"model": "test-model", "stage": "forward"}
+    before = REGISTRY.get_sample_value("inference_stage_duration_seconds_sum", labels) or 0.0
+
+    observe_stages("test-model", {"forward": 250.0})
+
+    assert REGISTRY.get_sample_value("inference_stage_duration_seconds_sum", labels) == before + 0.25
+    assert REGISTRY.get_sample_value("inference_stage_duration_seconds_bucket", {**labels, "le": "0.25"}) >= 1
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+
+from onnx_export import check, export
+from precision_check import GIBBERISH_CORPUS
+from services import GibberishService, OnnxGibberishBackend, TorchGibberishBackend
+
+TOLERANCE = 1e-4
+
+
+@pytest.fixture(scope="module")
+def onnx_dir(tiny_models, tmp_path_factory):
+    output_dir = str(tmp_path_factory.mktemp("gibberish-onnx"))
+    export(output_dir, model_id=tiny_models["gibberish"])
+    return output_dir
+
+
+def test_onnx_logits_match_torch(tiny_models, onnx_dir):
+    service = GibberishService(model_id=tiny_models["gibberish"])
+    torch_backend = TorchGibberishBackend(service.model, service.tokenizer)
+    onnx_backend = OnnxGibberishBackend(onnx_dir)
+    batch = GIBBERISH_CORPUS[:8]
+
+    expected = torch_backend.logits(service.tokenizer(batch, return_tensors="pt", padding=True)).numpy()
+    actual = onnx_backend.logits(service.tokenizer(batch, return_tensors="np", padding=True))
+
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, atol=TOLERANCE, rtol=0)
+    assert (actual.argmax(axis=-1) == expected.argmax(axis=-1)).all()
+
+
+def test_check_reports_parity(tiny_models, onnx_dir):
+    report = check(onnx_dir, model_id=tiny_models["gibberish"])
+
+    assert report["samples"] == len(GIBBERISH_CORPUS)
+    assert report["max_abs_deviation"] <= TOLERANCE
+    assert report["label_agreement"] == 1.0
@@ -0,0 +1,39 @@
+import base64
+from datetime import datetime, timezone
+from uuid import UUID
+
+import pytest
+
+from database import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    row = {
+        "timestamp": datetime(2026, 3, 4, 5, 6, 7, 891011, tzinfo=timezone.utc),
+        "prediction_id": UUID("7d2b8c1e-0d1f-4d2a-9a55-0e8a3c3b1f10"),
+    }
+
+    assert decode_cursor(encode_cursor(row)) == (row["timestamp"], str(row["prediction_id"]))
+
+
+def test_cursor_is_url_safe():
+    row = {
+        "timestamp": datetime(2026, 3, 4, tzinfo=timezone.utc),
+        "prediction_id": "7d2b8c1e-0d1f-4d2a-9a55-0e8a3c3b1f10",
+    }
+
+    token = encode_cursor(row)
+
+    assert set(token) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "not a cursor",
+    base64.urlsafe_b64encode(b'{"timestamp": 1}').decode(),
+    base64.urlsafe_b64encode(b'["2026-03-04T00:00:00", "not-a-uuid"]').decode(),
+    base64.urlsafe_b64encode(b'["yesterday", "7d2b8c1e-0d1f-4d2a-9a55-0e8a3c3b1f10"]').decode(),
+])
+def test_bad_cursor_is_rejected(token):
+    with pytest.raises(ValueError, match="Invalid pagination cursor"):
+        decode_cursor(token)
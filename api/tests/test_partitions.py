@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import partitions
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("interval, moment, start", [
+    ("day", utc(2026, 3, 4, 23, 59, 59), utc(2026, 3, 4)),
+    # Sunday belongs to the week that started on Monday
+    ("week", utc(2026, 3, 8, 12), utc(2026, 3, 2)),
+    ("week", utc(2026, 3, 9), utc(2026, 3, 9)),
+    ("week", utc(2026, 1, 1), utc(2025, 12, 29)),
+    ("month", utc(2026, 2, 28, 23), utc(2026, 2, 1)),
+    ("month", utc(2026, 12, 31, 23, 59), utc(2026, 12, 1)),
+])
+def test_partition_start(interval, moment, start):
+    assert partitions.partition_start(interval, moment) == start
+
+
+def test_partition_start_is_taken_in_utc():
+    moment = datetime(2026, 3, 1, 1, 0, tzinfo=timezone(timedelta(hours=2)))
+
+    assert partitions.partition_start("month", moment) == utc(2026, 2, 1)
+    assert partitions.partition_start("day", moment) == utc(2026, 2, 28)
+
+
+@pytest.mark.parametrize("interval, start, following", [
+    ("day", utc(2026, 2, 28), utc(2026, 3, 1)),
+    ("day", utc(2028, 2, 28), utc(2028, 2, 29)),
+    ("week", utc(2025, 12, 29), utc(2026, 1, 5)),
+    ("month", utc(2026, 1, 1), utc(2026, 2, 1)),
+    ("month", utc(2026, 2, 1), utc(2026, 3, 1)),
+    ("month", utc(2026, 12, 1), utc(2027, 1, 1)),
+])
+def test_next_start(interval, start, following):
+    assert partitions.next_start(interval, start) == following
+
+
+def test_partition_name_sorts_by_age():
+    assert partitions.partition_name("vectara_results", utc(2026, 3, 2)) == "vectara_results_p20260302"
+
+
+class CatalogCursor:
+    """Cursor answering the partition catalog query with ``names`` and recording other statements."""
+
+    def __init__(self, names):
+        self.names = names
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+
+    def fetchall(self):
+        return [(name,) for name in self.names]
+
+
+@pytest.mark.parametrize("interval, names, now, retention_days, dropped", [
+    # A day partition goes once its whole day is older than the retention
+    ("day", ["t_p20260301", "t_p20260302", "t_p20260303"], utc(2026, 3, 10), 8, ["t_p20260301"]),
+    ("day", ["t_p20260301", "t_p20260302"], utc(2026, 3, 10, 0, 0, 1), 8, ["t_p20260301"]),
+    # The week of 2026-03-02 ends 2026-03-09; a cutoff inside it keeps it
+    ("week", ["t_p20260223", "t_p20260302"], utc(2026, 3, 15), 7, ["t_p20260223"]),
+    ("week", ["t_p20260223", "t_p20260302"], utc(2026, 3, 16), 7, ["t_p20260223", "t_p20260302"]),
+    ("month", ["t_p20260101", "t_p20260201"], utc(2026, 3, 30), 30, ["t_p20260101"]),
+    ("month", ["t_p20260101", "t_p20260201"], utc(2026, 3, 31), 30, ["t_p20260101", "t_p20260201"]),
+])
+def test_drop_expired_partitions_cutoff(interval, names, now, retention_days, dropped):
+    # The default partition is listed by the catalog query but never dropped
+    cursor = CatalogCursor(names + ["t_default"])
+
+    assert partitions.drop_expired_partitions(cursor, "t", interval, retention_days, now) == dropped
+    assert len(cursor.statements) == 1 + len(dropped)
+
+
+def test_unknown_interval_is_refused():
+    with pytest.raises(ValueError):
+        partitions.drop_expired_partitions(CatalogCursor([]), "t", "year", 30)
+
+
+@pytest.fixture
+def partitioned_table(pg_cursor):
+    pg_cursor.execute("""
+        CREATE TABLE partition_test (id INTEGER NOT NULL, timestamp TIMESTAMP WITH TIME ZONE NOT NULL)
+        PARTITION BY RANGE (timestamp)
+    """)
+    pg_cursor.execute("CREATE TABLE partition_test_default PARTITION OF partition_test DEFAULT")
+    return pg_cursor
+
+
+def rows_of(cursor, table):
+    cursor.execute(f"SELECT id FROM {table} ORDER BY id")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def test_creating_a_partition_moves_its_rows_out_of_the_default(partitioned_table):
+    cursor = partitioned_table
+    cursor.execute("""
+        INSERT INTO partition_test VALUES
+            (1, '2026-02-28 23:59:59+00'), (2, '2026-03-01 00:00:00+00'), (3, '2026-03-31 23:00:00+00'),
+            (4, '2026-04-01 00:00:00+00')
+    """)
+
+    created = partitions.create_partitions(cursor, "partition_test", "month", utc(2026, 3, 15), utc(2026, 3, 15))
+
+    assert created == ["partition_test_p20260301"]
+    assert rows_of(cursor, "partition_test_p20260301") == [2, 3]
+    assert rows_of(cursor, "partition_test_default") == [1, 4]
+    assert rows_of(cursor, "partition_test") == [1, 2, 3, 4]
+    assert partitions.list_partitions(cursor, "partition_test") == [("partition_test_p20260301", utc(2026, 3, 1))]
+
+
+def test_maintain_creates_ahead_and_drops_expired(partitioned_table):
+    cursor = partitioned_table
+    now = utc(2026, 3, 4, 12)
+    partitions.create_partitions(cursor, "partition_test", "week", utc(2026, 2, 16), utc(2026, 2, 23))
+
+    # The cutoff, 2026-02-23 12:00, is past the end of the first week only
+    created, dropped = partitions.maintain(cursor, "partition_test", "week", premake=2, retention_days=9, now=now)
+
+    assert created == ["partition_test_p20260302", "partition_test_p20260309", "partition_test_p20260316"]
+    assert dropped == ["partition_test_p20260216"]
+    cursor.execute("INSERT INTO partition_test VALUES (1, '2026-03-08 23:59:59+00'), (2, '2026-03-09 00:00:00+00')")
+    assert rows_of(cursor, "partition_test_p20260302") == [1]
+    assert rows_of(cursor, "partition_test_p20260309") == [2]
@@ -0,0 +1,77 @@
+import json
+import random
+
+import pytest
+
+from prefilter import Prefilter, evaluate, keyboard_noise, train
+
+LABELS = ["clean", "mild gibberish", "noise", "word salad"]
+CLEAN = [
+    "The weather is nice today and we are going for a walk in the park.",
+    "Please send me the report before the meeting on Friday.",
+    "She bought fresh bread and milk at the store this morning.",
+    "We are going to the park with the children after lunch.",
+    "The meeting was moved to Friday morning because of the holiday.",
+    "He reads the news every morning before he goes to work.",
+    "The children are playing in the garden with their new ball.",
+    "Could you please send the report to the whole team today?",
+    "The store on the corner sells fresh bread every morning.",
+    "They walked home through the park after the long meeting.",
+]
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = random.Random(0)
+    noise = [keyboard_noise(rng) for _ in range(len(CLEAN) * 2)]
+    texts = CLEAN * 2 + noise
+    labels = ["clean"] * len(CLEAN) * 2 + ["noise"] * len(noise)
+    return train(texts, labels, LABELS)
+
+
+def test_model_is_json_serializable(model):
+    assert Prefilter(json.loads(json.dumps(model))).vocabulary == Prefilter(model).vocabulary
+
+
+def test_decides_plainly_clean_and_noisy_text(model):
+    prefilter = Prefilter(model, clean_threshold=0.9, noise_threshold=0.9)
+
+    clean = prefilter.decide("We are going to the store for fresh bread this morning.")
+    noise = prefilter.decide("asdfgh jklasd qwrtpz xcvbnm")
+
+    assert clean is not None and clean[1] == "clean"
+    assert noise is not None and noise[1] == "noise"
+    for probabilities, label in (clean, noise):
+        assert set(probabilities) == {"prob_clean", "prob_mild_gibberish", "prob_noise", "prob_word_salad"}
+        assert sum(probabilities.values()) == pytest.approx(1.0)
+        assert max(probabilities, key=probabilities.get) == f"prob_{label}"
+
+
+def test_unsure_and_blank_text_go_to_the_transformer(model):
+    prefilter = Prefilter(model, clean_threshold=1.01, noise_threshold=1.01)
+
+    assert prefilter.decide("We are going to the store for fresh bread this morning.") is None
+    assert Prefilter(model).decide("   ") is None
+
+
+def test_training_needs_clean_examples():
+    with pytest.raises(ValueError):
+        train(["qwerty asdf"], ["noise"], LABELS)
+
+
+def test_unknown_model_version_is_refused(model):
+    with pytest.raises(ValueError):
+        Prefilter({**model, "version": 0})
+
+
+def test_evaluate_reports_each_threshold(model):
+    texts = ["The children read the report in the park.", "zxcvbn qwerty poiuy"]
+
+    report = evaluate(model, texts, ["clean", "noise"], thresholds=(0.5, 1.01))
+
+    assert report["samples"] == 2
+    by_threshold = {row["threshold"]: row for row in report["thresholds"]}
+    assert by_threshold[0.5]["skipped_fraction"] == 1.0
+    assert by_threshold[0.5]["decided_agreement"] == 1.0
+    assert by_threshold[1.01]["skipped_fraction"] == 0.0
+    assert by_threshold[1.01]["overall_agreement"] == 1.0
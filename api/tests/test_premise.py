@@ -0,0 +1,90 @@
+import pytest
+
+from services import VectaraService
+
+MAX_TOKENS = 64
+# The stand-in tokenizer splits words into characters, so this is several hundred tokens
+PREMISE = " ".join(["the quick brown fox jumps over the lazy dog"] * 8)
+HYPOTHESES = ["a fox jumps", "the dog sleeps all day long in the warm sun"]
+
+
+@pytest.fixture(scope="module")
+def make_service(tiny_models):
+    def make(long_input_mode, chunk_aggregation="max"):
+        path = tiny_models["vectara"]
+        return VectaraService(model_id=path, tokenizer_id=path, max_tokens=MAX_TOKENS, long_input_mode=long_input_mode,
+                              chunk_stride=8, chunk_aggregation=chunk_aggregation)
+    return make
+
+
+def scored_rows(service, monkeypatch):
+    rows = []
+    score_ids = service.score_ids
+
+    def spy(batch, timings=None, batch_size=0):
+        rows.extend(batch)
+        return score_ids(batch, timings, batch_size)
+
+    monkeypatch.setattr(service, "score_ids", spy)
+    return rows
+
+
+def test_truncate_mode_scores_one_window_per_hypothesis(make_service, monkeypatch):
+    service = make_service("truncate")
+    rows = scored_rows(service, monkeypatch)
+
+    scores, premise_chunks = service.predict_premise(PREMISE, HYPOTHESES)
+
+    assert premise_chunks == 1
+    assert len(rows) == len(HYPOTHESES)
+    assert all(len(row) <= MAX_TOKENS for row in rows)
+    assert len(scores) == len(HYPOTHESES)
+
+
+def test_chunk_mode_windows_the_premise(make_service, monkeypatch):
+    service = make_service("chunk")
+    rows = scored_rows(service, monkeypatch)
+
+    scores, premise_chunks = service.predict_premise(PREMISE, HYPOTHESES)
+
+    assert premise_chunks > 1
+    assert len(rows) > len(HYPOTHESES)
+    assert all(len(row) <= MAX_TOKENS for row in rows)
+    assert all(0.0 <= score <= 1.0 for score in scores)
+
+
+def test_short_premise_is_one_chunk(make_service):
+    scores, premise_chunks = make_service("chunk").predict_premise("a fox", HYPOTHESES)
+
+    assert premise_chunks == 1
+    assert len(scores) == len(HYPOTHESES)
+
+
+@pytest.mark.parametrize("long_input_mode", ["truncate", "chunk"])
+def test_score_does_not_depend_on_the_other_hypotheses(make_service, long_input_mode):
+    service = make_service(long_input_mode)
+
+    [alone], _ = service.predict_premise(PREMISE, HYPOTHESES[:1])
+    together, _ = service.predict_premise(PREMISE, HYPOTHESES)
+
+    assert together[0] == pytest.approx(alone, abs=1e-5)
+
+
+def test_chunk_scores_are_combined_with_chunk_aggregation(make_service):
+    scores = {}
+    for aggregation in ("max", "mean"):
+        [score], _ = make_service("chunk", aggregation).predict_premise(PREMISE, HYPOTHESES[:1])
+        scores[aggregation] = score
+
+    assert scores["max"] >= scores["mean"]
+
+
+def test_score_ids_matches_scoring_the_prompt_text(make_service):
+    service = make_service("truncate")
+    prompts = [service.PROMPT.format(text1="the fox", text2=hypothesis) for hypothesis in HYPOTHESES]
+    rows = [service.tokenizer(prompt)["input_ids"] for prompt in prompts]
+
+    from_ids = service.score_ids(rows, batch_size=1)
+    from_text = service.score_prompts(prompts, [len(row) for row in rows])
+
+    assert from_ids == pytest.approx(from_text, abs=1e-5)
@@ -0,0 +1,47 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from main import LimitRequestSize
+
+MAX_BYTES = 100
+
+
+def make_client():
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"received": len(await request.body())}
+
+    app.add_middleware(LimitRequestSize, max_bytes=MAX_BYTES)
+    return TestClient(app)
+
+
+def chunks(total, size=10):
+    for start in range(0, total, size):
+        yield b"x" * min(size, total - start)
+
+
+def test_small_bodies_pass():
+    client = make_client()
+
+    assert client.post("/echo", content=b"x" * MAX_BYTES).json() == {"received": MAX_BYTES}
+    assert client.post("/echo", content=chunks(50)).json() == {"received": 50}
+
+
+def test_declared_length_over_the_limit_is_refused():
+    response = make_client().post("/echo", content=b"x" * (MAX_BYTES + 1))
+
+    assert response.status_code == 413
+
+
+def test_chunked_body_over_the_limit_is_refused():
+    response = make_client().post("/echo", content=chunks(MAX_BYTES * 3))
+
+    assert response.status_code == 413
+
+
+def test_invalid_content_length_is_a_bad_request():
+    response = make_client().post("/echo", content=b"x", headers={"Content-Length": "abc"})
+
+    assert response.status_code == 400
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database import ROLLUP_DELTAS
+
+HOUR = datetime(2026, 3, 2, 10, tzinfo=timezone.utc)
+
+
+def vectara_rows(*rows):
+    return [
+        {"input_1": "premise", "input_2": f"hypothesis {index}", "output_score": score,
+         "timestamp": HOUR + offset, "processing_time_ms": processing_time, "status": "success"}
+        for index, (offset, score, processing_time) in enumerate(rows)
+    ]
+
+
+def gibberish_rows(*rows):
+    return [
+        {"input_text": f"text {index}", "predicted_label": label,
+         "probabilities": {"prob_clean": clean, "prob_mild_gibberish": 0.0, "prob_noise": 1 - clean,
+                           "prob_word_salad": 0.0},
+         "timestamp": HOUR + offset, "processing_time_ms": processing_time, "status": "success"}
+        for index, (offset, label, clean, processing_time) in enumerate(rows)
+    ]
+
+
+def comparable(stats):
+    """The statistics both sources report, as plain numbers (raw averages come back as Decimal)."""
+    def number(value):
+        return None if value is None else pytest.approx(float(value))
+
+    def summary(values):
+        return {key: number(values[key]) for key in ("mean", "min", "max")}
+
+    return {
+        "total": stats["total"],
+        "score": summary(stats["score"]),
+        "processing_time_ms": summary(stats["processing_time_ms"]),
+        "labels": {label: int(count) for label, count in stats["labels"].items()},
+        "histogram": [
+            (row["bucket"], int(row["count"]), number(row["mean_score"]), number(row["mean_processing_time_ms"]))
+            for row in stats["histogram"]
+        ],
+    }
+
+
+def assert_rollup_matches_raw(get_stats, **filters):
+    raw = get_stats(source="raw", **filters)
+    rollup = get_stats(source="rollup", **filters)
+    assert comparable(rollup) == comparable(raw)
+    return raw
+
+
+def pending_deltas(db):
+    with db.transaction() as cursor:
+        cursor.execute(" UNION ALL ".join(f"SELECT count(*) AS count FROM {delta}" for delta in ROLLUP_DELTAS.values()))
+        return sum(row["count"] for row in cursor.fetchall())
+
+
+def test_vectara_rollup_matches_raw_stats(results_db):
+    stats = results_db.get_vectara_stats
+    results_db.save_vectara_results(vectara_rows(
+        (timedelta(minutes=5), 0.9, 40), (timedelta(minutes=50), 0.2, 10), (timedelta(hours=1), 0.5, 25),
+    ))
+    results_db.save_vectara_result(input_1="premise", input_2="single", output_score=0.05, processing_time_ms=70,
+                                   status="success", timestamp=HOUR + timedelta(minutes=30))
+
+    # Before the fold the rollup side is all pending deltas
+    assert pending_deltas(results_db) > 0
+    raw = assert_rollup_matches_raw(stats)
+    assert raw["total"] == 4
+    assert raw["labels"] == {"consistent": 2, "hallucinated": 2}
+
+    assert results_db.fold_rollups() > 0
+    assert pending_deltas(results_db) == 0
+    assert_rollup_matches_raw(stats)
+
+    # Later inserts into an hour that is already folded are merged into its rollup row
+    results_db.save_vectara_results(vectara_rows((timedelta(minutes=10), 1.0, 5), (timedelta(minutes=20), 0.3, 90)))
+    raw = assert_rollup_matches_raw(stats)
+    results_db.fold_rollups()
+    assert_rollup_matches_raw(stats)
+    assert raw["total"] == 6
+    assert raw["score"]["min"] == pytest.approx(0.05)
+    assert raw["processing_time_ms"]["max"] == 90
+
+    # Time filters and day buckets line up as long as they fall on hour boundaries
+    assert_rollup_matches_raw(stats, start=HOUR, end=HOUR + timedelta(hours=1))
+    assert_rollup_matches_raw(stats, start=HOUR + timedelta(hours=1))
+    assert_rollup_matches_raw(stats, bucket="day")
+
+
+def test_gibberish_rollup_matches_raw_stats(results_db):
+    stats = results_db.get_gibberish_stats
+    results_db.save_gibberish_results(gibberish_rows(
+        (timedelta(minutes=1), "clean", 0.95, 3), (timedelta(minutes=2), "noise", 0.1, 8),
+        (timedelta(hours=2), "word_salad", 0.2, 12),
+    ))
+    assert_rollup_matches_raw(stats)
+
+    results_db.fold_rollups()
+    results_db.save_gibberish_results(gibberish_rows((timedelta(minutes=3), "clean", 0.8, 4)))
+    raw = assert_rollup_matches_raw(stats)
+    results_db.fold_rollups()
+    assert_rollup_matches_raw(stats)
+
+    assert raw["labels"] == {"clean": 2, "noise": 1, "word_salad": 1}
+    assert len(raw["histogram"]) == 2
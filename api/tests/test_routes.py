@@ -0,0 +1,226 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes
+from cache import PredictionCache
+
+
+class FakeWriter:
+    def __init__(self):
+        self.rows = []
+
+    async def enqueue(self, row):
+        self.rows.append(row)
+
+
+def test_direct_insert_stores_the_returned_timestamp():
+    saved = {}
+    timestamp = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    def save(**kwargs):
+        saved.update(kwargs)
+        return "id-1"
+
+    prediction_id = asyncio.run(routes.persist_result(None, save, {"output_score": 0.5, "timestamp": timestamp}))
+
+    assert prediction_id == "id-1"
+    assert saved["timestamp"] is timestamp
+
+
+def test_write_behind_row_carries_the_returned_timestamp():
+    writer = FakeWriter()
+    timestamp = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    prediction_id = asyncio.run(routes.persist_result(writer, None, {"output_score": 0.5, "timestamp": timestamp}))
+
+    [row] = writer.rows
+    assert row["prediction_id"] == prediction_id
+    # Spill files are JSON, so the queued row holds the ISO form of the same instant
+    assert datetime.fromisoformat(row["timestamp"]) == timestamp
+
+
+class FakeResultsTable:
+    def __init__(self, vectara_row=None, gibberish_row=None):
+        self.vectara_row = vectara_row
+        self.gibberish_row = gibberish_row
+        self.lookups = []
+
+    def find_vectara_result(self, input_1, input_2, model_variant):
+        self.lookups.append((input_1, input_2, model_variant))
+        return self.vectara_row
+
+    def find_gibberish_result(self, input_text, model_variant):
+        self.lookups.append((input_text, model_variant))
+        return self.gibberish_row
+
+
+@pytest.fixture
+def results_lookup(monkeypatch):
+    monkeypatch.setattr(routes, "PREDICTION_CACHE_DB_LOOKUP", True)
+    monkeypatch.setattr(routes, "vectara_cache", PredictionCache("vectara", 100))
+    monkeypatch.setattr(routes, "gibberish_cache", PredictionCache("gibberish", 100))
+    monkeypatch.setattr(routes, "gibberish_prefilter", None)
+
+
+def test_results_table_lookup_is_restricted_to_the_model_variant(results_lookup, monkeypatch):
+    table = FakeResultsTable(vectara_row={"output_score": 0.3})
+    monkeypatch.setattr(routes, "db", table)
+
+    first = asyncio.run(routes.score_vectara("p", "h"))
+    second = asyncio.run(routes.score_vectara("p", "h"))
+
+    assert first == second == (0.3, 0, 0, True, None)
+    # The variant covers model id, revision, precision and long-input settings
+    assert table.lookups == [("p", "h", routes.VECTARA_RESULT_VARIANT)]
+    assert routes.VECTARA_RESULT_VARIANT.startswith(f"{routes.VECTARA_MODEL_ID}@{routes.VECTARA_MODEL_REVISION}/")
+    assert routes.LONG_INPUT_MODE in routes.VECTARA_RESULT_VARIANT
+
+
+def test_gibberish_results_table_hit_is_a_cache_hit(results_lookup, monkeypatch):
+    row = {"predicted_label": "noise", "prob_clean": 0.1, "prob_mild_gibberish": 0.0, "prob_noise": 0.9,
+           "prob_word_salad": 0.0}
+    table = FakeResultsTable(gibberish_row=row)
+    monkeypatch.setattr(routes, "db", table)
+
+    (probabilities, label), _, _, cache_hit, timings, decided_by = asyncio.run(routes.score_gibberish("xqzv"))
+
+    assert table.lookups == [("xqzv", routes.GIBBERISH_RESULT_VARIANT)]
+    assert (label, probabilities["prob_noise"], cache_hit, timings, decided_by) == (
+        "noise", 0.9, True, None, "transformer"
+    )
+
+
+def test_results_table_miss_goes_to_the_model(results_lookup, monkeypatch):
+    table = FakeResultsTable()
+    monkeypatch.setattr(routes, "db", table)
+
+    async def submit(pair, deadline=None):
+        return (0.7, {"forward": 1.0}), 2, 3
+
+    monkeypatch.setattr(routes.vectara_batcher, "submit", submit)
+
+    score, queue_time, compute_time, cache_hit, _ = asyncio.run(routes.score_vectara("p", "h"))
+
+    assert (score, queue_time, compute_time, cache_hit) == (0.7, 2, 3, False)
+    assert len(table.lookups) == 1
+
+
+class FakeVectaraService:
+    def __init__(self, scores):
+        self.scores = scores
+        self.calls = []
+
+    def predict_premise(self, premise, hypotheses, batch_size=32, timings=None):
+        self.calls.append(list(hypotheses))
+        return [self.scores[hypothesis] for hypothesis in hypotheses], 2
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Client for the API routes with the models and database replaced by stand-ins."""
+    saved = []
+
+    def save_many(results):
+        saved.extend(results)
+        return [f"id-{len(saved) - len(results) + index}" for index in range(len(results))]
+
+    monkeypatch.setattr(routes, "save_vectara_results", save_many)
+    monkeypatch.setattr(routes, "save_gibberish_results", save_many)
+    monkeypatch.setattr(routes, "vectara_cache", PredictionCache("vectara", 100))
+    monkeypatch.setattr(routes, "gibberish_cache", PredictionCache("gibberish", 100))
+    app = FastAPI()
+    app.include_router(routes.router)
+    client = TestClient(app)
+    client.saved = saved
+    return client
+
+
+@pytest.mark.parametrize("aggregation, expected", [("min", 0.2), ("mean", 0.5)])
+def test_premise_aggregates_hypothesis_scores(api, monkeypatch, aggregation, expected):
+    service = FakeVectaraService({"a": 0.8, "b": 0.2})
+    monkeypatch.setattr(routes, "vectara_service", lambda: service)
+
+    body = api.post("/predict/vectara/premise",
+                    json={"premise": "p", "hypotheses": ["a", "b"], "aggregation": aggregation}).json()
+
+    assert body["aggregate_score"] == pytest.approx(expected)
+    assert body["premise_chunks"] == 2
+    assert [result["output_score"] for result in body["results"]] == [0.8, 0.2]
+    assert [row["input_2"] for row in api.saved] == ["a", "b"]
+    assert {row["model_variant"] for row in api.saved} == {routes.VECTARA_RESULT_VARIANT}
+
+
+def test_premise_reuses_cached_hypothesis_scores(api, monkeypatch):
+    service = FakeVectaraService({"a": 0.8, "b": 0.2, "c": 0.5})
+    monkeypatch.setattr(routes, "vectara_service", lambda: service)
+
+    api.post("/predict/vectara/premise", json={"premise": "p", "hypotheses": ["a", "b"]})
+    body = api.post("/predict/vectara/premise", json={"premise": "p", "hypotheses": ["b", "c", "a"]}).json()
+
+    assert service.calls == [["a", "b"], ["c"]]
+    assert [result["output_score"] for result in body["results"]] == [0.2, 0.5, 0.8]
+    assert [result["cache_hit"] for result in body["results"]] == [True, False, True]
+
+    repeat = api.post("/predict/vectara/premise", json={"premise": "p", "hypotheses": ["c"]}).json()
+
+    assert len(service.calls) == 2
+    assert repeat["premise_chunks"] == 0
+
+
+class FakeBulkService:
+    def __init__(self, predict):
+        self.predict = predict
+        self.calls = []
+
+    def predict_bulk(self, inputs, batch_size=32):
+        self.calls.append(list(inputs))
+        return [self.predict(item) for item in inputs]
+
+
+@pytest.mark.parametrize("path", ["/predict/vectara/batch", "/predict/gibberish/batch"])
+def test_empty_batch_is_rejected(api, path):
+    assert api.post(path, json={"inputs": []}).status_code == 422
+    assert api.saved == []
+
+
+def test_vectara_batch_scores_misses_and_reuses_the_cache(api, monkeypatch):
+    service = FakeBulkService(lambda pair: (len(pair[1]) / 10, 7, {"forward": 5.0}))
+    monkeypatch.setattr(routes, "vectara_service", lambda: service)
+    pairs = [{"input_1": "p", "input_2": "ab"}, {"input_1": "p", "input_2": "abcd"}]
+
+    first = api.post("/predict/vectara/batch", json={"inputs": pairs[:1]}).json()
+    body = api.post("/predict/vectara/batch", json={"inputs": pairs}).json()
+
+    assert service.calls == [[("p", "ab")], [("p", "abcd")]]
+    assert [row["output_score"] for row in body] == [0.2, 0.4]
+    assert [row["cache_hit"] for row in body] == [True, False]
+    assert [row["processing_time_ms"] for row in body] == [0, 7]
+    # The stored rows carry the timestamp the response returns
+    assert datetime.fromisoformat(body[1]["timestamp"]) == api.saved[-1]["timestamp"]
+    assert first[0]["prediction_id"] == "id-0"
+    assert [row["prediction_id"] for row in body] == ["id-1", "id-2"]
+
+
+def test_gibberish_batch_returns_probabilities_in_input_order(api, monkeypatch):
+    def predict(text):
+        clean = 0.9 if text == "hello" else 0.1
+        probabilities = {"prob_clean": clean, "prob_mild_gibberish": 0.0, "prob_noise": 1 - clean,
+                         "prob_word_salad": 0.0}
+        return probabilities, "clean" if text == "hello" else "noise", 3, {"forward": 2.0}
+
+    service = FakeBulkService(predict)
+    monkeypatch.setattr(routes, "gibberish_service", lambda: service)
+    monkeypatch.setattr(routes, "gibberish_prefilter", None)
+
+    body = api.post("/predict/gibberish/batch", json={"inputs": ["hello", "xqzv", "hello"]}).json()
+
+    assert [row["predicted_label"] for row in body] == ["clean", "noise", "clean"]
+    assert [row["prob_clean"] for row in body] == [0.9, 0.1, 0.9]
+    assert all(row["decided_by"] == "transformer" for row in body)
+    assert [row["input_text"] for row in api.saved] == ["hello", "xqzv", "hello"]
+    assert api.saved[0]["probabilities"]["prob_noise"] == pytest.approx(0.1)
+    assert api.saved[0]["model_variant"] == routes.GIBBERISH_RESULT_VARIANT
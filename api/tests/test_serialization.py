@@ -0,0 +1,83 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+import serialization
+from serialization import encode_rows, encoded_page, etag, etag_matches, negotiate_encoding
+
+BODY = encode_rows(
+    ("prediction_id", "timestamp", "output_score"),
+    [("a", datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc), 0.5)] * 100
+)
+
+
+def test_encode_rows_writes_objects_with_utc_z():
+    assert json.loads(encode_rows(("id", "timestamp"), [(1, datetime(2026, 1, 2, tzinfo=timezone.utc))])) == [
+        {"id": 1, "timestamp": "2026-01-02T00:00:00Z"}
+    ]
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    (None, False),
+    ("", False),
+    ('"other"', False),
+    ("*", True),
+    ('"other", {tag}', True),
+    ("{strong}", True),
+])
+def test_etag_matches_weakly(if_none_match, matches):
+    tag = etag(BODY)
+    if if_none_match:
+        if_none_match = if_none_match.format(tag=tag, strong=tag.removeprefix("W/"))
+
+    assert etag_matches(if_none_match, tag) is matches
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("*", "br"),
+    ("gzip;q=bogus", None),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_negotiate_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", None)
+
+    assert negotiate_encoding("br, gzip;q=0.1") == "gzip"
+    assert negotiate_encoding("br") is None
+
+
+def test_encoded_page_compresses_large_bodies():
+    status, body, headers = encoded_page(BODY, {"X-Next-Cursor": "c"}, "gzip", None, min_compress_bytes=10)
+
+    assert status == 200
+    assert gzip.decompress(body) == BODY
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["Vary"] == "Accept-Encoding"
+    assert headers["X-Next-Cursor"] == "c"
+
+
+def test_encoded_page_leaves_small_bodies_alone():
+    status, body, headers = encoded_page(BODY, {}, "gzip", None, min_compress_bytes=len(BODY) + 1)
+
+    assert (status, body) == (200, BODY)
+    assert "Content-Encoding" not in headers
+
+
+def test_encoded_page_revalidates_to_304():
+    _, _, headers = encoded_page(BODY, {}, "br", None, min_compress_bytes=10)
+
+    status, body, revalidated = encoded_page(BODY, {}, "gzip", headers["ETag"], min_compress_bytes=10)
+
+    assert (status, body) == (304, None)
+    # Same validator whatever the content coding of the first response
+    assert revalidated["ETag"] == headers["ETag"]
@@ -0,0 +1,121 @@
+import asyncio
+import glob
+import json
+import os
+
+import psycopg2
+
+import writer as writer_module
+from writer import ResultWriter
+
+
+class FakeStore:
+    """``flush_fn`` stand-in: stores rows by prediction_id and fails on demand."""
+
+    def __init__(self, transient_failures=0, refused=()):
+        self.rows = {}
+        self.calls = 0
+        self.transient_failures = transient_failures
+        self.refused = set(refused)
+
+    def __call__(self, rows):
+        self.calls += 1
+        if self.transient_failures:
+            self.transient_failures -= 1
+            raise psycopg2.OperationalError("connection lost")
+        if any(row["prediction_id"] in self.refused for row in rows):
+            raise psycopg2.DataError("value out of range")
+        for row in rows:
+            self.rows.setdefault(row["prediction_id"], row)
+
+
+def rows(*ids):
+    return [{"prediction_id": i, "timestamp": "2026-01-01T00:00:00+00:00"} for i in ids]
+
+
+def make_writer(store, tmp_path, **kwargs):
+    return ResultWriter("test", store, batch_size=10, flush_interval_ms=5, max_retries=2,
+                        spill_dir=str(tmp_path), **kwargs)
+
+
+def test_flushes_enqueued_rows(tmp_path):
+    store = FakeStore()
+
+    async def main():
+        writer = make_writer(store, tmp_path)
+        for row in rows("a", "b", "c"):
+            await writer.enqueue(row)
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(main())
+
+    assert set(store.rows) == {"a", "b", "c"}
+    assert writer.written == 3
+
+
+def test_retries_transient_failures(tmp_path, monkeypatch):
+    monkeypatch.setattr(writer_module, "MAX_RETRY_DELAY_SECONDS", 0)
+    store = FakeStore(transient_failures=3)
+
+    async def main():
+        writer = make_writer(store, tmp_path)
+        await writer.enqueue(rows("a")[0])
+        await asyncio.sleep(0.1)
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(main())
+
+    assert store.calls == 4
+    assert set(store.rows) == {"a"}
+    assert writer.spilled == 0
+
+
+def test_refused_rows_are_isolated_and_set_aside(tmp_path):
+    store = FakeStore(refused={"bad"})
+
+    async def main():
+        writer = make_writer(store, tmp_path)
+        await writer._flush(rows("a", "bad", "c", "d"))
+        return writer
+
+    writer = asyncio.run(main())
+
+    assert set(store.rows) == {"a", "c", "d"}
+    assert writer.rejected == 1
+    [rejected] = glob.glob(os.path.join(str(tmp_path), "test-*.rejected"))
+    with open(rejected) as f:
+        assert [json.loads(line)["prediction_id"] for line in f] == ["bad"]
+    # Rejected files are not replayed
+    assert not glob.glob(os.path.join(str(tmp_path), "test-*.jsonl"))
+
+
+def test_spills_on_stop_and_replays_on_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(writer_module, "MAX_RETRY_DELAY_SECONDS", 0)
+    failing = FakeStore(transient_failures=1000)
+
+    async def first_run():
+        writer = make_writer(failing, tmp_path)
+        writer.stopping = True
+        await writer._flush(rows("a", "b"))
+        return writer
+
+    writer = asyncio.run(first_run())
+
+    assert writer.spilled == 2
+    assert failing.rows == {}
+    assert len(glob.glob(os.path.join(str(tmp_path), "test-*.jsonl"))) == 1
+
+    store = FakeStore()
+
+    async def second_run():
+        writer = make_writer(store, tmp_path)
+        writer.start()
+        await writer.stop()
+
+    asyncio.run(second_run())
+
+    assert set(store.rows) == {"a", "b"}
+    assert store.rows["a"]["timestamp"] == "2026-01-01T00:00:00+00:00"
+    assert not os.listdir(str(tmp_path))
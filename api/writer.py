@@ -0,0 +1,221 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.pool import PoolError
+
+from metrics import QUEUE_DEPTH
+
+_STOP = object()
+# Longest pause between two attempts at a batch that keeps failing
+MAX_RETRY_DELAY_SECONDS = 5.0
+# Failures that a later attempt at the same rows can get past: lost connections, an
+# unreachable server, no free pooled connection. Anything else is a problem with the rows
+TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError)
+
+
+class WriteBufferFull(Exception):
+    """Raised when the write-behind buffer stays full for longer than the enqueue timeout."""
+
+
+class ResultWriter:
+    """Write-behind buffer for prediction results.
+
+    Rows are enqueued into a bounded in-memory queue and flushed by a
+    background task through ``flush_fn`` (a bulk insert) once ``batch_size``
+    rows are pending or ``flush_interval_ms`` has passed since the first one.
+    ``enqueue`` blocks while the buffer is full, up to ``enqueue_timeout``
+    seconds, which gives callers backpressure instead of unbounded memory.
+
+    Clients already hold the prediction_id of every buffered row, so a batch is never
+    discarded: a flush failing with one of ``transient_errors`` is retried, with backoff,
+    until it succeeds, and the buffer filling up behind it turns into ``WriteBufferFull``
+    for new requests. ``flush_fn`` must therefore be idempotent (rows carry their
+    prediction_id and timestamp, and the insert skips rows already stored). Any other
+    error is split down to the offending rows, which are set aside in a ``.rejected``
+    file in ``spill_dir`` for inspection instead of blocking the writer.
+    ``stop`` flushes everything still buffered; batches still failing after
+    ``max_retries`` attempts then are spilled as JSON lines to ``spill_dir``, and
+    spilled files are written to the database by the next writer that starts.
+    """
+
+    def __init__(self, name: str, flush_fn: Callable[[List[Dict[str, Any]]], Any],
+                 max_buffer: int = 10000, batch_size: int = 500, flush_interval_ms: float = 200.0,
+                 enqueue_timeout: float = 1.0, max_retries: int = 3, executor=None,
+                 spill_dir: str = "write_behind_spill",
+                 transient_errors: Tuple[type, ...] = TRANSIENT_ERRORS):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval_ms = flush_interval_ms
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retries = max_retries
+        self.executor = executor
+        self.spill_dir = spill_dir
+        self.transient_errors = transient_errors
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.stopping = False
+        self.depth = QUEUE_DEPTH.labels(f"writer_{name}")
+        self.written = 0
+        self.spilled = 0
+        # Rows the database refused outright, set aside in .rejected files
+        self.rejected = 0
+        # Rows that could be neither written nor spilled
+        self.dropped = 0
+
+    def start(self):
+        if self.worker is None:
+            self.queue = asyncio.Queue(maxsize=self.max_buffer)
+            self.stopping = False
+            self.worker = asyncio.create_task(self._run())
+            logging.info(f"Result writer '{self.name}' started (max_buffer={self.max_buffer}, "
+                         f"batch_size={self.batch_size}, flush_interval_ms={self.flush_interval_ms}).")
+
+    async def stop(self):
+        if self.worker is None:
+            return
+        self.stopping = True
+        await self.queue.put(_STOP)
+        await self.worker
+        self.worker = None
+        if self.spilled or self.rejected or self.dropped:
+            logging.error(f"Result writer '{self.name}' stopped without writing every row "
+                          f"(written={self.written}, spilled={self.spilled}, rejected={self.rejected}, "
+                          f"dropped={self.dropped}).")
+        else:
+            logging.info(f"Result writer '{self.name}' drained and stopped (written={self.written}).")
+
+    def pending(self) -> int:
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def enqueue(self, row: Dict[str, Any]):
+        if self.stopping:
+            raise WriteBufferFull(f"Result writer '{self.name}' is shutting down")
+        self.start()
+        try:
+            await asyncio.wait_for(self.queue.put(row), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            raise WriteBufferFull(
+                f"Result writer '{self.name}' buffer full ({self.max_buffer} rows)"
+            )
+        self.depth.set(self.queue.qsize())
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        if self.executor is not None:
+            await self.executor.run(self.flush_fn, rows)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, self.flush_fn, rows)
+
+    async def _flush(self, rows: List[Dict[str, Any]]):
+        """Write ``rows``, retrying transient failures until it works; only once stopping are
+        they spilled instead. Rows failing otherwise are bisected and the bad ones rejected."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self._write(rows)
+                self.written += len(rows)
+                return
+            except self.transient_errors as e:
+                logging.error(f"Result writer '{self.name}' flush of {len(rows)} rows failed "
+                              f"(attempt {attempt}): {e}")
+                if self.stopping and attempt >= self.max_retries:
+                    self._spill(rows)
+                    return
+                await asyncio.sleep(min(0.1 * 2 ** attempt, MAX_RETRY_DELAY_SECONDS))
+            except Exception as e:
+                if len(rows) == 1:
+                    logging.error(f"Result writer '{self.name}' row {rows[0].get('prediction_id')} "
+                                  f"was refused: {e}")
+                    self._spill(rows, rejected=True)
+                    return
+                logging.warning(f"Result writer '{self.name}' flush of {len(rows)} rows was refused ({e}); "
+                                f"retrying in halves to find the bad rows.")
+                middle = len(rows) // 2
+                await self._flush(rows[:middle])
+                await self._flush(rows[middle:])
+                return
+
+    def _spill(self, rows: List[Dict[str, Any]], rejected: bool = False):
+        """Save ``rows`` as JSON lines: ``.jsonl`` files are replayed on the next start,
+        ``.rejected`` ones, refused by the database, are only kept for inspection."""
+        extension = "rejected" if rejected else "jsonl"
+        path = os.path.join(self.spill_dir, f"{self.name}-{os.getpid()}-{time.time_ns()}.{extension}")
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            # Complete files only, so a replay never sees half a spill
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            self.dropped += len(rows)
+            logging.error(f"Result writer '{self.name}' lost {len(rows)} rows: could not spill them to {path}: {e}")
+            return
+        if rejected:
+            self.rejected += len(rows)
+            logging.error(f"Result writer '{self.name}' set {len(rows)} refused rows aside in {path}.")
+            return
+        self.spilled += len(rows)
+        logging.error(f"Result writer '{self.name}' spilled {len(rows)} unwritten rows to {path}; "
+                      f"they are written when the writer next starts.")
+
+    async def _replay_spilled(self):
+        """Write the rows of spill files left by earlier runs, then delete the files."""
+        for path in sorted(glob.glob(os.path.join(self.spill_dir, f"{self.name}-*.jsonl"))):
+            claimed = f"{path}.{os.getpid()}.replay"
+            try:
+                # Several workers start together; the rename lets exactly one of them take a file
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(claimed) as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            logging.info(f"Result writer '{self.name}' replaying {len(rows)} spilled rows from {path}.")
+            for start in range(0, len(rows), self.batch_size):
+                await self._flush(rows[start:start + self.batch_size])
+            os.remove(claimed)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        await self._replay_spilled()
+        stopped = False
+        while not stopped:
+            first = await self.queue.get()
+            if first is _STOP:
+                break
+            rows = [first]
+            deadline = loop.time() + self.flush_interval_ms / 1000
+            while len(rows) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stopped = True
+                    break
+                rows.append(row)
+            self.depth.set(self.queue.qsize())
+            await self._flush(rows)
+
+        # Rows whose enqueue was already blocked on a full buffer when stop() ran
+        leftover = []
+        while not self.queue.empty():
+            row = self.queue.get_nowait()
+            if row is not _STOP:
+                leftover.append(row)
+        self.depth.set(0)
+        for start in range(0, len(leftover), self.batch_size):
+            await self._flush(leftover[start:start + self.batch_size])
@@ -16,4 +16,34 @@ export interface GibberishResult {
     timestamp: Date;
     processing_time_ms: number;
     status: string;
-} 
\ No newline at end of file
+} 
+
+export interface MetricSummary {
+    mean: number | null;
+    min: number | null;
+    max: number | null;
+    p50: number | null;
+    p90: number | null;
+    p95: number | null;
+    p99: number | null;
+}
+
+export interface ResultStats {
+    total: number;
+    score: MetricSummary;
+    processing_time_ms: MetricSummary;
+    labels: Record<string, number>;
+    histogram: { bucket: string; count: number; mean_score: number | null; mean_processing_time_ms: number | null }[];
+}
+
+export interface AggregateEvent {
+    model: string;
+    timestamp: string;
+    interval_ms: number;
+    count: number;
+    mean_score: number;
+    min_score: number | null;
+    max_score: number | null;
+    mean_processing_time_ms: number;
+    labels: Record<string, number>;
+}
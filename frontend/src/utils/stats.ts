@@ -1,16 +1,18 @@
 // frontend\src\utils\stats.ts
-import { VectaraResult, GibberishResult } from '@/types'
+import axios from 'axios'
+import { ResultStats } from '@/types'
 
-export const calculateStats = (data: VectaraResult[] | GibberishResult[]) => {
-    const total = data.length
-    const score = data[0] && 'output_score' in data[0]
-        ? data.map(d => (d as VectaraResult).output_score)
-        : data.map(d => (d as GibberishResult).prob_clean)
+// Aggregates are computed server-side over the whole table, not just the rows on screen
+export const fetchStats = async (modelType: string) => {
+    const url = `http://localhost:8000/api/stats/${modelType.toLowerCase()}`
+    const response = await axios.get<ResultStats>(url)
+    const stats = response.data
 
     return {
-        total,
-        average: score.reduce((a, b) => a + b, 0) / total,
-        min: Math.min(...score),
-        max: Math.max(...score)
+        total: stats.total,
+        average: stats.score.mean ?? 0,
+        min: stats.score.min ?? 0,
+        max: stats.score.max ?? 0,
+        p95_processing_time_ms: stats.processing_time_ms.p95 ?? 0
     }
-} 
\ No newline at end of file
+}